@@ -0,0 +1,445 @@
+import argparse
+import asyncio
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+import intervals
+import uplift
+
+from data_store import file_signature, shared, shared_csv, shared_table, snapshot, table_signature
+from forecast import forecast_arrays, horizon_dates
+from ingest import ingest
+from model_serving import load_models, predict_horizon
+
+# JSON forecast service with the Quick Prediction page's numbers:
+#   GET  /forecast?product=TV&store=Chicago, IL&months=3&multiplier=1.2&method=model&intervals=true
+#        &promotion=Percentage Discount&holiday=Holiday&weather=Rainy&calibrated_weekend=true
+#   POST /forecast/batch  {"requests": [{"product": "TV", "months": 6}, ...]}
+#   POST /ingest          {"transactions": [{...cleaned_data.csv columns...}, ...]}
+#   GET  /health
+# intervals=true adds P10/P50/P90 of the totals and of each day from the
+# residual bootstrap of intervals.py; all interval requests of a grid share
+# one draw and each gets the same numbers it would get alone.
+# promotion, holiday and weather pick a level of uplift.py's condition
+# factors (omitted: the usual mix) and calibrated_weekend replaces the fixed
+# weekend uplift with the pair's own weekday and weekend factors, as on the
+# Quick Prediction page; unknown levels are a 400.
+# Results are cached (LRU with TTL) by (data version, product, store, months,
+# multiplier, method, intervals, conditions). Identical requests that arrive while one
+# is being computed wait for it instead of computing again, and all misses
+# waiting at the same time (a batch, or concurrent requests) are computed
+# together as one forecast grid.
+MAX_MONTHS = 9
+MULTIPLIER_RANGE = (0.5, 2.0)
+METHODS = ("model", "trailing")
+MAX_BATCH = 1000
+CACHE_SIZE = 4096
+CACHE_TTL = 300.0
+CONDITIONS = ("promotion", "holiday", "weather")
+FLAGS = {"true": True, "1": True, "yes": True, "false": False, "0": False, "no": False}
+
+
+class ResultCache:
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < self.clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = (self.clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+def data_version():
+    # Changes whenever an input file does, which retires every cached result
+    # built from the old data: cleaned_data feeds the model baseline's
+    # moving averages and the interval residuals. A few stat calls, cheap
+    # enough per request, but a stale Arrow copy is rebuilt on the way, so
+    # it runs in the thread pool.
+    try:
+        stores = file_signature("store_ratios.csv")
+    except FileNotFoundError:
+        stores = None
+    try:
+        factors = file_signature(uplift.UPLIFT_PATH)
+    except FileNotFoundError:
+        factors = None
+    return (table_signature("daily_sales"), table_signature("cleaned_data"), file_signature("product_ratios.csv"),
+            stores, factors)
+
+
+def load_inputs():
+    try:
+        store_ratios = shared_csv("store_ratios.csv")
+    except FileNotFoundError:
+        store_ratios = None
+    return {
+        "daily_sales": shared_table("daily_sales"),
+        "product_ratios": shared_csv("product_ratios.csv"),
+        "store_ratios": store_ratios
+    }
+
+
+def load_residuals():
+    return shared(("api_residuals",), intervals.signature(), intervals.load)
+
+
+def load_uplift():
+    return shared(("api_uplift",), file_signature(uplift.UPLIFT_PATH), uplift.load)
+
+
+def model_baseline(daily_sales):
+    return shared(
+        ("api_baseline", MAX_MONTHS), (table_signature("daily_sales"), table_signature("cleaned_data")),
+        lambda: predict_horizon(load_models(), daily_sales, horizon_dates(MAX_MONTHS))
+    )
+
+
+def parse_flag(params, name, default):
+    # true/false, 1/0 or yes/no from a query string, or a JSON boolean.
+    value = params.get(name, default)
+    if isinstance(value, bool):
+        return value
+    flag = FLAGS.get(str(value).strip().lower())
+    if flag is None:
+        raise ValueError(f"{name} must be true or false")
+    return flag
+
+
+def parse_request(params):
+    # (product, store, months, multiplier, method, intervals, conditions)
+    # from query or JSON values; conditions is (promotion, holiday, weather,
+    # calibrated_weekend), a level or None for each effect.
+    product = params.get("product")
+    if not product:
+        raise ValueError("product is required")
+    store = params.get("store") or None
+    if not isinstance(product, str) or not isinstance(store, (str, type(None))):
+        raise ValueError("product and store must be strings")
+    try:
+        months = int(params.get("months", 3))
+        multiplier = round(float(params.get("multiplier", 1.0)), 4)
+    except (TypeError, ValueError):
+        raise ValueError("months must be an integer and multiplier a number")
+    if not 1 <= months <= MAX_MONTHS:
+        raise ValueError(f"months must be between 1 and {MAX_MONTHS}")
+    if not MULTIPLIER_RANGE[0] <= multiplier <= MULTIPLIER_RANGE[1]:
+        raise ValueError(f"multiplier must be between {MULTIPLIER_RANGE[0]} and {MULTIPLIER_RANGE[1]}")
+    method = params.get("method", "model")
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {sorted(METHODS)}")
+    intervals = parse_flag(params, "intervals", False)
+    levels = tuple(params.get(c) or None for c in CONDITIONS)
+    if not all(isinstance(level, (str, type(None))) for level in levels):
+        raise ValueError(f"{', '.join(CONDITIONS)} must be strings")
+    conditions = levels + (parse_flag(params, "calibrated_weekend", False),)
+    return product, store, months, multiplier, method, intervals, conditions
+
+
+def compute(requests):
+    # requests: list of parsed tuples. One forecast grid per baseline method
+    # covers every product/store/multiplier in the list at the longest
+    # horizon; each request takes its slice.
+    # Inputs and the model baseline come from one data version: an ingest
+    # swaps the files in under the exclusive side of the same lock.
+    baseline, warning, residuals, factors = None, None, None, None
+    with snapshot():
+        inputs = load_inputs()
+        if any(req[5] for req in requests):
+            try:
+                residuals = load_residuals()
+            except FileNotFoundError as e:
+                residuals = e
+        if any(any(req[6]) for req in requests):
+            try:
+                factors = load_uplift()
+            except FileNotFoundError as e:
+                factors = e
+        if any(req[4] == "model" for req in requests):
+            try:
+                baseline = model_baseline(inputs["daily_sales"])
+            except Exception as e:
+                warning = f"model unavailable, used trailing average: {e}"
+    product_ratios, store_ratios = inputs["product_ratios"], inputs["store_ratios"]
+    known_products = set(product_ratios["product_name"])
+    known_stores = set() if store_ratios is None else set(store_ratios["store_location"])
+    results = {}
+    for req in requests:
+        product, store = req[0], req[1]
+        if product not in known_products:
+            results[req] = LookupError(f"unknown product: {product}")
+        elif store is not None and store not in known_stores:
+            results[req] = LookupError(f"unknown store: {store}")
+        elif any(req[6]) and isinstance(factors, Exception):
+            results[req] = RuntimeError(f"condition factors unavailable: {factors}")
+        elif req[5] and isinstance(residuals, Exception):
+            results[req] = RuntimeError(f"prediction intervals unavailable: {residuals}")
+        elif req[5] and product not in residuals.products:
+            results[req] = LookupError(f"no interval history for product: {product}")
+        else:
+            for effect, level in zip(CONDITIONS, req[6]):
+                if level is not None and level not in factors.levels[effect]:
+                    results[req] = ValueError(f"{effect} must be one of {factors.levels[effect]}")
+                    break
+
+    todo = [req for req in requests if req not in results]
+    for method in METHODS:
+        group = [req for req in todo if req[4] == method]
+        if not group:
+            continue
+        method_baseline, method_warning = (baseline, warning) if method == "model" else (None, None)
+        products = sorted({req[0] for req in group})
+        stores = sorted({req[1] for req in group}, key=lambda s: (s is not None, s or ""))
+        multipliers = sorted({req[3] for req in group})
+        grid = forecast_arrays(product_ratios, store_ratios, inputs["daily_sales"], products, stores,
+                               max(req[2] for req in group), multipliers, method_baseline)
+        dates = grid["dates"].strftime("%Y-%m-%d").tolist()
+        is_weekend = grid["dates"].dayofweek >= 5
+        points = {}
+        for req in group:
+            product, store, months, multiplier, _, _, conditions = req
+            days = len(horizon_dates(months))
+            index = (products.index(product), stores.index(store), multipliers.index(multiplier))
+            qty = grid["predicted_quantity"][index][:days]
+            rev = grid["predicted_revenue"][index][:days]
+            if any(conditions):
+                # The page's uplift: one factor, or one per day for the
+                # calibrated weekend.
+                scenario = dict(zip(CONDITIONS, conditions[:-1]))
+                scale = factors.scale(product, store, scenario, is_weekend[:days], conditions[-1])
+                qty, rev = qty * scale, rev * scale
+            points[req] = qty, rev
+        bands = interval_bands([req for req in group if req[5]], points, residuals, is_weekend,
+                               method if method_warning is None else "trailing")
+        for req in group:
+            product, store, months, multiplier, _, with_intervals, conditions = req
+            qty, rev = points[req]
+            days = len(qty)
+            result = {
+                "product": product,
+                "store": store,
+                "months": months,
+                "multiplier": multiplier,
+                "method": method if method_warning is None else "trailing",
+                **{c: level for c, level in zip(CONDITIONS, conditions) if level is not None},
+                **({"calibrated_weekend": True} if conditions[-1] else {}),
+                "total_quantity": float(qty.sum()),
+                "total_revenue": float(rev.sum()),
+                "daily_avg_revenue": float(rev.mean()),
+                "daily": [
+                    {"date": d, "predicted_quantity": q, "predicted_revenue": r}
+                    for d, q, r in zip(dates[:days], qty.tolist(), rev.tolist())
+                ]
+            }
+            if with_intervals:
+                add_intervals(result, bands[req])
+            if method_warning:
+                result["warning"] = method_warning
+            results[req] = result
+    return results
+
+
+def interval_bands(requests, points, residuals, is_weekend, method):
+    # One bootstrap for every interval request of a grid: each request is a
+    # row of the point forecast, zero past its own horizon so its totals
+    # cover only its months.
+    if not requests:
+        return {}
+    days = max(len(points[req][0]) for req in requests)
+    qty, rev = np.zeros((2, len(requests), days))
+    for i, req in enumerate(requests):
+        n = len(points[req][0])
+        qty[i, :n], rev[i, :n] = points[req]
+    out = residuals.intervals([(req[0], req[1]) for req in requests], qty, rev, is_weekend[:days], method)
+    return {
+        req: {name: {k: v[:, i] for k, v in out[name].items()} for name in ("quantity", "revenue")}
+        for i, req in enumerate(requests)
+    }
+
+
+def add_intervals(result, bands):
+    labels = [f"p{round(q * 100)}" for q in intervals.QUANTILES]
+    days = len(result["daily"])
+    for name in ("quantity", "revenue"):
+        for label, total, daily in zip(labels, bands[name]["total"].tolist(), bands[name]["daily"][:, :days].tolist()):
+            result[f"total_{name}_{label}"] = total
+            for entry, value in zip(result["daily"], daily):
+                entry[f"predicted_{name}_{label}"] = value
+
+
+class ForecastService:
+    def __init__(self, cache_size=CACHE_SIZE, ttl=CACHE_TTL):
+        self.cache = ResultCache(cache_size, ttl)
+        self.in_flight = {}  # key -> future, from queueing until computed
+        self.queue = {}  # key -> request, not yet handed to compute()
+        self.draining = False
+        self.stats = {"requests": 0, "hits": 0, "coalesced": 0, "computed": 0, "batches": 0}
+
+    async def get_many(self, requests):
+        # Runs on the event loop only, so the cache, queue and in-flight
+        # table need no locks; the data version and the forecast itself run
+        # in the thread pool.
+        version = await run_in_threadpool(data_version)
+        results, waiting = {}, {}
+        self.stats["requests"] += len(requests)
+        for req in dict.fromkeys(requests):
+            key = (version,) + req
+            value = self.cache.get(key)
+            if value is not None:
+                self.stats["hits"] += 1
+                results[req] = value
+            elif key in self.in_flight:
+                self.stats["coalesced"] += 1
+                waiting[req] = self.in_flight[key]
+            else:
+                waiting[req] = self.in_flight[key] = asyncio.get_running_loop().create_future()
+                self.queue[key] = req
+
+        if self.queue and not self.draining:
+            self.draining = True
+            asyncio.create_task(self._drain())
+        for req, future in waiting.items():
+            results[req] = await future
+        return results
+
+    async def _drain(self):
+        # Misses that queue up while a grid is being computed go into the
+        # next grid together, so under load one compute() serves many
+        # distinct requests.
+        try:
+            while self.queue:
+                batch, self.queue = self.queue, {}
+                self.stats["computed"] += len(batch)
+                self.stats["batches"] += 1
+                try:
+                    computed = await run_in_threadpool(compute, list(dict.fromkeys(batch.values())))
+                except Exception as e:
+                    computed = {req: e for req in batch.values()}
+                for key, req in batch.items():
+                    value = computed[req]
+                    if not isinstance(value, Exception):
+                        self.cache.put(key, value)
+                    self.in_flight.pop(key).set_result(value)
+        finally:
+            self.draining = False
+
+
+service = ForecastService()
+
+
+def error_response(error):
+    status = 404 if isinstance(error, LookupError) else 400 if isinstance(error, ValueError) else 500
+    message = error.args[0] if isinstance(error, LookupError) and error.args else str(error)
+    return JSONResponse({"error": message}, status_code=status)
+
+
+def shape(result, daily):
+    if daily or "daily" not in result:
+        return result
+    return {k: v for k, v in result.items() if k != "daily"}
+
+
+async def forecast(request):
+    try:
+        req = parse_request(request.query_params)
+        daily = parse_flag(request.query_params, "daily", True)
+    except ValueError as e:
+        return error_response(e)
+    result = (await service.get_many([req]))[req]
+    if isinstance(result, Exception):
+        return error_response(result)
+    return JSONResponse(shape(result, daily))
+
+
+async def forecast_batch(request):
+    try:
+        body = await request.json()
+        items = body["requests"]
+        if not isinstance(items, list):
+            raise ValueError
+    except Exception:
+        return error_response(ValueError('body must be JSON like {"requests": [{"product": ...}, ...]}'))
+    if len(items) > MAX_BATCH:
+        return error_response(ValueError(f"at most {MAX_BATCH} requests per batch"))
+    try:
+        daily = parse_flag(body, "daily", True)
+    except ValueError as e:
+        return error_response(e)
+
+    parsed = []
+    for item in items:
+        try:
+            parsed.append(parse_request(item if isinstance(item, dict) else {}))
+        except ValueError as e:
+            parsed.append(e)
+    results = await service.get_many([p for p in parsed if not isinstance(p, Exception)])
+
+    out = []
+    for p in parsed:
+        value = p if isinstance(p, Exception) else results[p]
+        if isinstance(value, Exception):
+            out.append({"error": value.args[0] if isinstance(value, LookupError) else str(value)})
+        else:
+            out.append(shape(value, daily))
+    return JSONResponse({"results": out})
+
+
+async def ingest_batch(request):
+    # Appends new transactions; the next forecast request sees the new data
+    # version, which retires the cached results.
+    try:
+        body = await request.json()
+        batch = pd.DataFrame.from_records(body["transactions"])
+    except Exception:
+        return error_response(ValueError('body must be JSON like {"transactions": [{"transaction_date": ...}, ...]}'))
+    try:
+        version = await run_in_threadpool(ingest, batch, lambda _: None)
+    except ValueError as e:
+        return error_response(e)
+    return JSONResponse({"ingested": len(batch), "version": version})
+
+
+async def health(request):
+    return JSONResponse({"status": "ok", "cache_entries": len(service.cache), **service.stats})
+
+
+app = Starlette(routes=[
+    Route("/forecast", forecast),
+    Route("/forecast/batch", forecast_batch, methods=["POST"]),
+    Route("/ingest", ingest_batch, methods=["POST"]),
+    Route("/health", health)
+])
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve 2025 forecasts as JSON")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,299 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data_store import read_table
+from forecast import WEEKEND_UPLIFT
+from model_serving import FEATURES, MA_WINDOWS, load_models, moving_averages_before, predict_horizon
+from train_series import (ORDER, SEASONAL_ORDER, SERIES_COLUMNS, _init_worker, _model, daily_series, fit_series,
+                          series_key)
+
+# Rolling-origin backtest on the daily product x store series. Every fold
+# trains on the days before its origin and forecasts the next --horizon
+# days for all 40 series.
+#   - Served Model is what the prediction tool serves: best_qty_model.pkl
+#     predicts the daily total from model_serving's features (moving
+#     averages over the last transactions before the origin), split over
+#     the series by product and store shares of the training days, with
+#     the weekend uplift
+#   - the other four are the notebook's model types refit per series
+#     panel on model_serving's calendar columns, the series' own moving
+#     averages (held at their value on the origin day across the horizon)
+#     and a one-hot series indicator
+#   - features are built once for the whole panel; a fold only slices them
+#   - Linear/Ridge: per-day X'X and X'y are summed cumulatively, so every
+#     fold's expanding-window fit is one batched solve
+#   - Gradient Boosting and SARIMA are refit every --refit-every folds and
+#     applied as they are in between. SARIMA starts cold on the first
+#     window and each later fit from the previous one, which saw only
+#     earlier days of the same training window; it runs one series per
+#     process and forecasts every origin from a single Kalman filter pass
+#     per fit
+#   - metrics for all models, folds and horizons are one array expression
+MODELS = ["Linear Regression", "Ridge Regression", "Gradient Boosting", "SARIMA", "Served Model"]
+RIDGE_ALPHA = 1.0
+HORIZON = 28
+MIN_TRAIN = 120
+FOLDS = 50
+REFIT_EVERY = 5
+COMPARISON_PATH = "model_comparison.csv"
+FOLDS_PATH = "model_backtest.csv"
+METRICS = ["MAE", "MAPE", "R2"]
+
+
+def moving_averages(units):
+    # (days, series, windows): mean of the `w` days before each day (fewer
+    # at the start), so a day's features never include its own sales.
+    padded = np.concatenate([np.zeros((1,) + units.shape[1:]), np.cumsum(units, axis=0)])
+    out = np.empty(units.shape + (len(MA_WINDOWS),))
+    days = np.arange(len(units))
+    for k, w in enumerate(MA_WINDOWS):
+        lo = np.maximum(days - w, 0)
+        n = np.maximum(days - lo, 1)[:, None]
+        out[:, :, k] = (padded[days] - padded[lo]) / n
+    return out
+
+
+N_CALENDAR = len(FEATURES) - len(MA_WINDOWS)
+
+
+def panel_features(dates, n_series, ma):
+    # (days, series, FEATURES + one indicator per series). Calendar columns
+    # repeat across series; the moving-average columns are the per-series
+    # ones.
+    dates = pd.DatetimeIndex(dates)
+    calendar = np.column_stack([
+        (dates - dates[0]).days, dates.month, dates.isocalendar().week.to_numpy(),
+        dates.dayofweek, dates.dayofyear, dates.dayofweek >= 5
+    ]).astype(float)
+    X = np.zeros((len(dates), n_series, len(FEATURES) + n_series))
+    X[:, :, :N_CALENDAR] = calendar[:, None, :]
+    X[:, :, N_CALENDAR:len(FEATURES)] = ma
+    X[:, :, len(FEATURES):] = np.eye(n_series)
+    return X
+
+
+def fold_origins(n_days, folds=FOLDS, horizon=HORIZON, min_train=MIN_TRAIN):
+    # First forecast day of each fold; spaced evenly over the days that
+    # leave min_train days before and a full horizon after.
+    last = n_days - horizon
+    if last < min_train:
+        raise ValueError(f"{n_days} days cannot hold {min_train} training days and a {horizon}-day horizon")
+    return np.unique(np.linspace(min_train, last, folds).round().astype(int))
+
+
+def horizon_features(X, ma, origins, horizon):
+    # (folds, horizon, series, features): calendar of the forecast days with
+    # the moving averages frozen at the origin, as predict_horizon does.
+    steps = origins[:, None] + np.arange(horizon)
+    Xh = X[steps].copy()
+    Xh[:, :, :, N_CALENDAR:len(FEATURES)] = ma[origins][:, None, :, :]
+    return Xh
+
+
+def linear_forecasts(X, y, origins, Xh, alpha=0.0):
+    # Expanding-window least squares for every fold at once. The intercept
+    # is not penalized, as in sklearn's Ridge.
+    days, series, n_feat = X.shape
+    A = np.concatenate([X, np.ones((days, series, 1))], axis=2)
+    mean, scale = A[:origins[0]].reshape(-1, n_feat + 1).mean(0), A[:origins[0]].reshape(-1, n_feat + 1).std(0)
+    scale[scale == 0] = 1
+    mean[-1], scale[-1] = 0, 1
+    A = (A - mean) / scale
+    xtx = np.cumsum(np.einsum("dsi,dsj->dij", A, A), axis=0)
+    xty = np.cumsum(np.einsum("dsi,ds->di", A, y), axis=0)
+    # alpha applies to the coefficients of the unscaled features.
+    penalty = np.diag(np.r_[alpha / scale[:-1] ** 2, 0.0])
+    # Pseudo-inverse: days_since_start and day_of_year are collinear within
+    # a year, as are the series indicators with the intercept, and the
+    # minimum-norm fit is what LinearRegression's lstsq gives.
+    coef = np.einsum("fij,fj->fi", np.linalg.pinv(xtx[origins - 1] + penalty), xty[origins - 1])
+    Ah = (np.concatenate([Xh, np.ones(Xh.shape[:3] + (1,))], axis=3) - mean) / scale
+    return np.einsum("fhsi,fi->fhs", Ah, coef)
+
+
+def _boosting_fit(task):
+    from sklearn.ensemble import GradientBoostingRegressor
+
+    X_train, y_train, X_test = task
+    model = GradientBoostingRegressor(random_state=42).fit(X_train, y_train)
+    return [model.predict(x) for x in X_test]
+
+
+def boosting_forecasts(X, y, origins, Xh, refit_every, pool):
+    # One fit per refit_every folds, trained up to its first origin and
+    # used for the folds after it.
+    folds, horizon, series, n_feat = Xh.shape
+    groups = [range(i, min(i + refit_every, folds)) for i in range(0, folds, refit_every)]
+    tasks = [(X[:origins[g[0]]].reshape(-1, n_feat), y[:origins[g[0]]].reshape(-1),
+              [Xh[f].reshape(-1, n_feat) for f in g]) for g in groups]
+    out = np.empty((folds, horizon, series))
+    for g, predictions in zip(groups, pool.map(_boosting_fit, tasks)):
+        for f, p in zip(g, predictions):
+            out[f] = p.reshape(horizon, series)
+    return out
+
+
+def _sarima_series(task):
+    # All folds of one series. Per group of refit_every folds: refit (warm)
+    # on the days before the group's first origin, filter the whole series
+    # once with those parameters, and roll the predicted state at each
+    # origin (built from the days before it only) through the transition
+    # matrix for the horizon, all origins of the group at once.
+    key, y, start, origins, horizon, refit_every, params = task
+    out = np.empty((len(origins), horizon))
+    for g in range(0, len(origins), refit_every):
+        group = origins[g:g + refit_every]
+        params = fit_series((key, y[:group[0]], start, params))[1]["params"]
+        ssm = _model(y, start, ORDER, SEASONAL_ORDER).filter(np.asarray(params)).filter_results
+        design, transition = ssm.design[:, :, 0], ssm.transition[:, :, 0]
+        state = ssm.predicted_state[:, group]
+        for h in range(horizon):
+            out[g:g + len(group), h] = (design @ state)[0] + ssm.obs_intercept[0, 0]
+            state = transition @ state + ssm.state_intercept[:, :1]
+    return out
+
+
+def sarima_forecasts(units, keys, start, origins, horizon, refit_every, pool):
+    # Not seeded from the train_series.py registry: those parameters were
+    # fitted on the whole history, test days included.
+    tasks = [(key, units[:, s], start, origins, horizon, refit_every, None) for s, key in enumerate(keys)]
+    return np.stack(list(pool.map(_sarima_series, tasks)), axis=2)
+
+
+def served_forecasts(transactions, units_df, cost_df, origins, horizon, models):
+    # (units, cost) of the serving path (forecast.forecast_arrays with the
+    # predict_horizon baseline) for every fold, from the days before its
+    # origin: the model's daily total, priced at the training unit price,
+    # times the product's share of units (cost for revenue), the store's
+    # share of cost and the weekend uplift.
+    days = units_df.index
+    units, cost = units_df.to_numpy(), cost_df.to_numpy()
+    products = units_df.columns.get_level_values(0)
+    stores = units_df.columns.get_level_values(1)
+    moving_averages = moving_averages_before(transactions, days[origins])
+    qty = np.empty((len(origins), horizon, units.shape[1]))
+    cog = np.empty_like(qty)
+    for f, origin in enumerate(origins):
+        dates = days[origin:origin + horizon]
+        train_units, train_cost = units[:origin].sum(axis=0), cost[:origin].sum(axis=0)
+        history = {"start": days[0], "moving_averages": moving_averages[f],
+                   "unit_price": train_cost.sum() / train_units.sum()}
+        base = predict_horizon(models, None, dates, history)
+        product_units = pd.Series(train_units).groupby(products).transform("sum").to_numpy() / train_units.sum()
+        product_cost = pd.Series(train_cost).groupby(products).transform("sum").to_numpy() / train_cost.sum()
+        store_cost = pd.Series(train_cost).groupby(stores).transform("sum").to_numpy() / train_cost.sum()
+        weekend = np.where(dates.dayofweek >= 5, WEEKEND_UPLIFT, 1.0)[:, None]
+        qty[f] = base["predicted_quantity"].to_numpy()[:, None] * product_units * store_cost * weekend
+        cog[f] = base["predicted_cog"].to_numpy()[:, None] * product_cost * store_cost * weekend
+    return qty, cog
+
+
+def fold_metrics(pred, actual):
+    # pred (models, folds, horizon, series), actual (folds, horizon, series).
+    # Per model, fold and horizon step, over the series: MAE, MAPE over the
+    # non-zero actuals (series-days without sales have no percentage error)
+    # and R2.
+    err = pred - actual
+    mae = np.abs(err).mean(axis=3)
+    nonzero = actual != 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ape = np.where(nonzero, np.abs(err) / np.abs(np.where(nonzero, actual, 1)), 0)
+        mape = 100 * ape.sum(axis=3) / nonzero.sum(axis=2)
+        sst = ((actual - actual.mean(axis=2, keepdims=True)) ** 2).sum(axis=2)
+        r2 = 1 - (err ** 2).sum(axis=3) / sst
+    return {"MAE": mae, "MAPE": mape, "R2": r2}
+
+
+def run(transactions, folds=FOLDS, horizon=HORIZON, min_train=MIN_TRAIN, refit_every=REFIT_EVERY,
+        workers=None, comparison_path=COMPARISON_PATH, folds_path=FOLDS_PATH, log=print):
+    t0 = time.perf_counter()
+    units_df, cost_df = daily_series(transactions)
+    units, cost = units_df.to_numpy(), cost_df.to_numpy()
+    unit_price = cost.sum(axis=0) / np.maximum(units.sum(axis=0), 1)
+    origins = fold_origins(len(units), folds, horizon, min_train)
+
+    ma = moving_averages(units)
+    X = panel_features(units_df.index, units.shape[1], ma)
+    Xh = horizon_features(X, ma, origins, horizon)
+    steps = origins[:, None] + np.arange(horizon)
+    actual_qty, actual_cog = units[steps], cost[steps]
+
+    timings = {}
+    mark = time.perf_counter()
+    pred = np.empty((len(MODELS),) + actual_qty.shape)
+    pred[0] = linear_forecasts(X, units, origins, Xh)
+    pred[1] = linear_forecasts(X, units, origins, Xh, RIDGE_ALPHA)
+    timings["linear"] = time.perf_counter() - mark
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        mark = time.perf_counter()
+        pred[2] = boosting_forecasts(X, units, origins, Xh, refit_every, pool)
+        timings["boosting"] = time.perf_counter() - mark
+        mark = time.perf_counter()
+        keys = [series_key(product, store) for product, store in units_df.columns]
+        pred[3] = sarima_forecasts(units, keys, units_df.index[0], origins, horizon, refit_every, pool)
+        timings["sarima"] = time.perf_counter() - mark
+    pred_cog = pred * unit_price
+    pred[4], pred_cog[4] = served_forecasts(transactions, units_df, cost_df, origins, horizon, load_models())
+    pred, pred_cog = np.clip(pred, 0, None), np.clip(pred_cog, 0, None)
+
+    # Cost of goods of the refit models is priced from units at each
+    # series' historical price; the served model's comes from its own path.
+    metrics = {"Quantity": fold_metrics(pred, actual_qty), "COG": fold_metrics(pred_cog, actual_cog)}
+
+    # One row per model, fold and horizon day, in that order.
+    shape = (len(MODELS), len(origins), horizon)
+    per_fold = pd.DataFrame({
+        "Model": np.repeat(MODELS, len(origins) * horizon),
+        "fold": np.tile(np.repeat(np.arange(len(origins)), horizon), len(MODELS)),
+        "origin": np.tile(np.repeat(units_df.index[origins], horizon), len(MODELS)),
+        "horizon_day": np.tile(np.arange(1, horizon + 1), len(MODELS) * len(origins)),
+        **{f"{metric}_{target}": np.broadcast_to(values[metric], shape).reshape(-1)
+           for target, values in metrics.items() for metric in METRICS}
+    })
+
+    # Summary: means over folds and horizon steps, with the spread of the
+    # per-fold means.
+    fold_means = per_fold.groupby(["Model", "fold"], sort=False).mean(numeric_only=True)
+    summary = pd.DataFrame({"Model": MODELS})
+    for target in metrics:
+        for metric in METRICS:
+            col = f"{metric}_{target}"
+            by_model = fold_means[col].groupby(level="Model", sort=False)
+            summary[col] = by_model.mean().reindex(MODELS).to_numpy()
+            summary[f"{col}_p10"] = by_model.quantile(0.1).reindex(MODELS).to_numpy()
+            summary[f"{col}_p90"] = by_model.quantile(0.9).reindex(MODELS).to_numpy()
+    summary["Folds"] = len(origins)
+    summary["Horizon_Days"] = horizon
+
+    summary.to_csv(comparison_path, index=False)
+    per_fold.drop(columns=["horizon_day"]).groupby(["Model", "fold", "origin"], sort=False).mean() \
+        .reset_index().to_csv(folds_path, index=False)
+    log(f"{len(origins)} folds x {horizon} days x {units.shape[1]} series x {len(MODELS)} models in "
+        f"{time.perf_counter() - t0:.1f}s (linear {timings['linear']:.2f}s, boosting {timings['boosting']:.1f}s, "
+        f"sarima {timings['sarima']:.1f}s) -> {comparison_path}, {folds_path}")
+    return summary, per_fold
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest; regenerates model_comparison.csv")
+    parser.add_argument("--folds", type=int, default=FOLDS)
+    parser.add_argument("--horizon", type=int, default=HORIZON)
+    parser.add_argument("--min-train", type=int, default=MIN_TRAIN)
+    parser.add_argument("--refit-every", type=int, default=REFIT_EVERY)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", default=COMPARISON_PATH)
+    parser.add_argument("--folds-output", default=FOLDS_PATH)
+    args = parser.parse_args()
+
+    try:
+        transactions = read_table("cleaned_data", SERIES_COLUMNS)
+    except FileNotFoundError as e:
+        sys.exit(f"Missing file: {e.filename}")
+    run(transactions, args.folds, args.horizon, args.min_train, args.refit_every, args.workers,
+        args.output, args.folds_output)
@@ -0,0 +1,160 @@
+"""Load test for the forecast API (api.py): p50/p99 latency and requests/s.
+
+Starts api.py in a fresh process per scenario and drives it from
+--connections keep-alive HTTP/1.1 connections for --seconds:
+  hot       every request asks for the same forecast (cache hits)
+  mixed     uniform over products x stores x months x multipliers x methods
+  coalesce  cold cache, every connection sends the same request at once
+  batch     POST /forecast/batch with --batch random requests each
+Each server answers one warm-up request (model load) before timing.
+
+    python benchmarks/bench_api.py --connections 32 --seconds 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PRODUCTS = ["Camera", "Fridge", "Headphones", "Laptop", "Smartphone", "TV", "Tablet", "Washing Machine"]
+STORES = [None, "Chicago, IL", "Dallas, TX", "Los Angeles, CA", "Miami, FL", "New York, NY"]
+MULTIPLIERS = [m / 10 for m in range(5, 21)]
+
+
+def random_request(rng):
+    return {
+        "product": rng.choice(PRODUCTS),
+        "store": rng.choice(STORES),
+        "months": rng.randint(1, 9),
+        "multiplier": rng.choice(MULTIPLIERS),
+        "method": rng.choice(["model", "trailing"])
+    }
+
+
+def query(params):
+    return "/forecast?" + urllib.parse.urlencode({k: v for k, v in params.items() if v is not None})
+
+
+def start_server(port):
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, "api.py"), "--port", str(port)],
+                              cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1)
+            # Warm-up: loads the models with a key no scenario asks for.
+            urllib.request.urlopen(f"http://127.0.0.1:{port}" + query({"product": "TV", "multiplier": 1.05}))
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise SystemExit("api.py did not start")
+
+
+async def send(reader, writer, method, path, body=b""):
+    head = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n"
+    if body:
+        head += "Content-Type: application/json\r\n"
+    writer.write(head.encode() + b"\r\n" + body)
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def connection(port, next_request, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        while time.perf_counter() < deadline:
+            method, path, body = next_request()
+            t0 = time.perf_counter()
+            status = await send(reader, writer, method, path, body)
+            latencies.append(time.perf_counter() - t0)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def drive(port, connections, seconds, next_request):
+    latencies, errors = [], []
+    start = time.perf_counter()
+    deadline = start + seconds
+    await asyncio.gather(*[connection(port, next_request, deadline, latencies, errors)
+                           for _ in range(connections)])
+    return latencies, errors, time.perf_counter() - start
+
+
+async def coalesce(port, connections):
+    # One burst of identical requests against a cold cache.
+    params = {"product": "TV", "store": "Dallas, TX", "months": 9, "multiplier": 1.3}
+    streams = [await asyncio.open_connection("127.0.0.1", port) for _ in range(connections)]
+    latencies = []
+
+    async def one(reader, writer):
+        t0 = time.perf_counter()
+        status = await send(reader, writer, "GET", query(params))
+        latencies.append(time.perf_counter() - t0)
+        writer.close()
+        return status
+
+    start = time.perf_counter()
+    statuses = await asyncio.gather(*[one(r, w) for r, w in streams])
+    return latencies, [s for s in statuses if s != 200], time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--scenarios", nargs="+", default=["hot", "mixed", "coalesce", "batch"])
+    parser.add_argument("--port", type=int, default=8610)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    hot = ("GET", query({"product": "Camera", "store": "Chicago, IL", "months": 3}), b"")
+    makers = {
+        "hot": lambda: hot,
+        "mixed": lambda: ("GET", query(random_request(rng)), b""),
+        "batch": lambda: ("POST", "/forecast/batch", json.dumps(
+            {"requests": [random_request(rng) for _ in range(args.batch)], "daily": False}).encode())
+    }
+
+    print(f"{args.connections} connections, {os.cpu_count()} CPUs")
+    print(f"{'scenario':<10}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'computed':>10}{'batches':>9}{'coalesced':>11}")
+    for scenario in args.scenarios:
+        server = start_server(args.port)
+        try:
+            if scenario == "coalesce":
+                latencies, errors, elapsed = asyncio.run(coalesce(args.port, args.connections))
+            else:
+                latencies, errors, elapsed = asyncio.run(
+                    drive(args.port, args.connections, args.seconds, makers[scenario]))
+            stats = json.load(urllib.request.urlopen(f"http://127.0.0.1:{args.port}/health"))
+        finally:
+            server.terminate()
+            server.wait()
+        if errors:
+            raise SystemExit(f"{scenario}: {len(errors)} non-200 responses, e.g. {errors[0]}")
+        ms = np.array(latencies) * 1000
+        print(f"{scenario:<10}{len(ms):>10,}{len(ms) / elapsed:>10,.0f}{np.percentile(ms, 50):>10.1f}"
+              f"{np.percentile(ms, 99):>10.1f}{stats['computed']:>10,}{stats['batches']:>9,}{stats['coalesced']:>11,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Overview trend chart payload and build time, full series vs downsampled.
+
+Builds the Overview "Sales Trend" figure (two lines+markers subplots) from
+synthetic series of each --points length, once with every point and once
+per downsampling method at the chart's target width. Reported per series
+length and variant: points per trace, time to downsample (cold, then from
+the shared cache), time to build the figure and serialize it to the JSON
+Streamlit sends to the browser, and that payload's size.
+
+    python benchmarks/bench_downsample.py [--points 365 3650 100000 1000000] [--width 700]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from downsample import METHODS, shared_downsample, target_points
+
+
+def series(points, seed=0):
+    # Revenue and units at a fixed step, with a weekly cycle and noise.
+    rng = np.random.default_rng(seed)
+    t = np.arange(points)
+    units = np.maximum(rng.poisson(60, points) + 20 * np.sin(2 * np.pi * t / 7), 0)
+    return pd.DataFrame({
+        "transaction_date": pd.date_range("2020-01-01", periods=points, freq="min" if points > 10_000 else "D"),
+        "cost_of_goods": units * rng.uniform(800, 1200, points),
+        "quantity_sold": units
+    })
+
+
+def figure(revenue, units):
+    # Same construction as the Overview page.
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    fig = make_subplots(rows=1, cols=2, subplot_titles=("Revenue ($)", "Units Sold"))
+    fig.add_trace(go.Scatter(x=revenue["transaction_date"], y=revenue["cost_of_goods"], mode="lines+markers",
+                             name="Revenue", line=dict(color="#0071ce", width=2), marker=dict(size=6)),
+                  row=1, col=1)
+    fig.add_trace(go.Scatter(x=units["transaction_date"], y=units["quantity_sold"], mode="lines+markers",
+                             name="Units", line=dict(color="#ffc220", width=2), marker=dict(size=6)),
+                  row=1, col=2)
+    fig.update_layout(height=400, showlegend=False)
+    return fig
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    value = fn()
+    return value, (time.perf_counter() - t0) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, nargs="+", default=[365, 3650, 100_000, 1_000_000])
+    parser.add_argument("--width", type=int, default=700)
+    args = parser.parse_args()
+
+    target = target_points(args.width)
+    figure(series(10), series(10)).to_json()  # plotly's first-use imports
+    print(f"target {target} points per trace")
+    print(f"{'series':>10}  {'variant':<8}{'points':>8}{'cold ms':>9}{'cached ms':>10}"
+          f"{'figure ms':>10}{'json ms':>9}{'payload':>12}")
+    for n in args.points:
+        frame = series(n)
+        variants = [("full", None)] + [(m, m) for m in METHODS]
+        for name, method in variants:
+            cold = cached = 0.0
+            if method is None:
+                revenue = units = frame
+            else:
+                def sample():
+                    return [shared_downsample(("bench", n), n, frame, "transaction_date", col, target, method)
+                            for col in ["cost_of_goods", "quantity_sold"]]
+                (revenue, units), cold = timed(sample)
+                _, cached = timed(sample)
+            fig, build = timed(lambda: figure(revenue, units))
+            payload, serialize = timed(fig.to_json)
+            print(f"{n:>10,}  {name:<8}{len(revenue):>8,}{cold:>9.1f}{cached:>10.2f}"
+                  f"{build:>10.1f}{serialize:>9.1f}{len(payload) / 1e3:>10,.0f} kB")
+
+
+if __name__ == "__main__":
+    main()
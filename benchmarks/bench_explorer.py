@@ -0,0 +1,71 @@
+"""Data Explorer filter latency: boolean-mask chain vs query.TransactionIndex.
+
+For each size, times the old isin/compare/copy/sort/head(100) path against a
+cold index query (new signature) and a warm one (memoized signature), using
+a narrow one-week, two-product filter and the page's default everything
+filter.
+
+    python benchmarks/bench_explorer.py --rows 10000 100000 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from synthetic import PRODUCTS, cleaned_frame
+
+from query import TransactionIndex
+
+
+def old_filter(df, categories, products, start, end):
+    filtered = df[
+        (df["category"].isin(categories)) &
+        (df["product_name"].isin(products)) &
+        (df["transaction_date"] >= start) &
+        (df["transaction_date"] <= end)
+    ].copy()
+    filtered.sort_values("transaction_date", ascending=False).head(100)
+    return filtered["cost_of_goods"].sum()
+
+
+def new_filter(index, categories, products, start, end):
+    result = index.query(start=start, end=end, category=categories, product_name=products)
+    result.latest(100)
+    return result.totals()["cost_of_goods"]
+
+
+def best_ms(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    filters = {
+        "narrow": (["Electronics"], PRODUCTS[:2], pd.Timestamp("2024-05-01"), pd.Timestamp("2024-05-07")),
+        "all": (["Electronics", "Appliances"], PRODUCTS, pd.Timestamp("2024-01-01"), pd.Timestamp("2024-12-31"))
+    }
+    print(f"{'rows':>10}{'filter':>8}{'build ms':>10}{'mask ms':>10}{'cold ms':>10}{'warm ms':>10}")
+    for rows in args.rows:
+        df = cleaned_frame(rows, features=False)
+        t0 = time.perf_counter()
+        index = TransactionIndex(df)
+        build = (time.perf_counter() - t0) * 1000
+        for name, args_ in filters.items():
+            assert np.isclose(old_filter(df, *args_), new_filter(index, *args_))
+            mask = best_ms(lambda: old_filter(df, *args_))
+            cold = best_ms(lambda: (index._cache.clear(), new_filter(index, *args_)))
+            warm = best_ms(lambda: new_filter(index, *args_))
+            print(f"{rows:>10,}{name:>8}{build:>10.1f}{mask:>10.2f}{cold:>10.2f}{warm:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Download-button cost: eager to_csv().encode() vs the deferred, chunked export.
+
+The eager path runs on every rerun of the page; the deferred path costs
+nothing until a click, and a repeat click of the same slice reuses the file.
+With --memory, peak Python allocations are measured with tracemalloc
+(which slows everything down, so timings are taken without it).
+
+    python benchmarks/bench_export.py --rows 100000 1000000 [--memory]
+"""
+import argparse
+import os
+import time
+import tracemalloc
+
+from synthetic import cleaned_frame
+
+from export import FORMATS, ExportCache
+
+
+def measure(fn, memory=False):
+    t0 = time.perf_counter()
+    out = fn()
+    seconds = time.perf_counter() - t0
+    if not memory:
+        return out, seconds, float("nan")
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return out, seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--memory", action="store_true", help="also report peak allocations")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}  {'path':<26}{'seconds':>9}{'peak MB':>10}{'file MB':>10}")
+    for rows in args.rows:
+        df = cleaned_frame(rows)
+        _, seconds, peak = measure(lambda: df.to_csv(index=False).encode("utf-8"), args.memory)
+        print(f"{rows:>10,}  {'eager to_csv (per rerun)':<26}{seconds:>9.2f}{peak:>10.0f}{'':>10}")
+
+        cache = ExportCache()
+        for fmt in FORMATS:
+            # The traced rerun uses a fresh signature so it writes again.
+            runs = iter([("bench", rows), ("bench", rows, "traced")])
+            path, seconds, peak = measure(lambda: cache.get(next(runs), df, fmt), args.memory)
+            size = os.path.getsize(path) / 1e6
+            print(f"{rows:>10,}  {'deferred ' + fmt:<26}{seconds:>9.2f}{peak:>10.0f}{size:>10.0f}")
+        _, seconds, _ = measure(lambda: cache.get(("bench", rows), df, "CSV"))
+        print(f"{rows:>10,}  {'repeat click (cached)':<26}{seconds:>9.4f}")
+
+
+if __name__ == "__main__":
+    main()
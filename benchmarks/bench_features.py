@@ -0,0 +1,94 @@
+"""Feature-engineering throughput and scaling over worker processes.
+
+Writes a synthetic date-sorted extract in the cleaned_data.csv schema
+(without the feature columns), then times features.run for each worker
+count. Also compares the index-lookup encoder with LabelEncoder.transform.
+
+    python benchmarks/bench_features.py --rows 1000000 --workers 1 2 4 8 16 [--format arrow]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import warnings
+
+import joblib
+import numpy as np
+import pyarrow as pa
+
+from synthetic import ROOT, cleaned_frame
+
+import features
+
+warnings.filterwarnings("ignore", module="sklearn")
+
+
+def write_input(path, rows, fmt):
+    df = cleaned_frame(rows, features=False)
+    if fmt == "arrow":
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        with pa.ipc.new_file(path, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        df.to_csv(path, index=False)
+    return df
+
+
+def bench_encode(df, encoders, repeat=3):
+    tables = features.lookup_tables(encoders)
+    values = df["product_name"].astype(str)
+    best = {}
+    for name, fn in [
+        ("LabelEncoder.transform", lambda: encoders["product"].transform(values)),
+        ("index lookup", lambda: features.encode(values, tables["product"]))
+    ]:
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            codes = fn()
+            times.append(time.perf_counter() - t0)
+        best[name] = (min(times), codes)
+    (_, a), (_, b) = best.values()
+    assert np.array_equal(a, b)
+    return {name: t for name, (t, _) in best.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--format", choices=["csv", "arrow"], default="csv")
+    parser.add_argument("--workdir")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_features_", dir=args.workdir)
+    try:
+        source = os.path.join(workdir, f"input.{args.format}")
+        df = write_input(source, args.rows, args.format)
+        print(f"{args.rows:,} rows, {args.format}, {os.cpu_count()} CPUs")
+
+        encoders = joblib.load(os.path.join(ROOT, "encoders.pkl"))
+        for name, seconds in bench_encode(df, encoders).items():
+            print(f"  encode product_name with {name:<24}{seconds * 1000:>10.1f} ms")
+        del df
+
+        print(f"{'workers':>8}{'seconds':>10}{'rows/s':>14}{'speedup':>10}")
+        baseline = None
+        for workers in args.workers:
+            work = os.path.join(workdir, f"work.{args.format}")
+            shutil.copyfile(source, work)
+            t0 = time.perf_counter()
+            features.run(work, workers=workers, encoders_path=os.path.join(ROOT, "encoders.pkl"),
+                         log=lambda *a: None)
+            seconds = time.perf_counter() - t0
+            baseline = baseline or seconds
+            print(f"{workers:>8}{seconds:>10.2f}{args.rows / seconds:>14,.0f}{baseline / seconds:>9.2f}x")
+            os.remove(work)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Batch forecast throughput: the broadcast grid vs one forecast per click.
+
+Covers every product x store x 1-9 month horizon x scenario multiplier and
+reports combinations per second for each path.
+
+    python benchmarks/bench_forecast.py [--repeat 5] [--sample 200]
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from data_store import read_table
+from forecast import forecast_grid, forecast_product, horizon_totals
+
+MULTIPLIERS = np.arange(50, 201, 10) / 100.0
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--sample", type=int, default=200,
+                        help="per-click combinations to time (the loop is slow)")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    product_ratios = pd.read_csv("product_ratios.csv")
+    store_ratios = pd.read_csv("store_ratios.csv")
+    daily_sales = read_table("daily_sales")
+
+    combos = list(itertools.product(
+        product_ratios["product_name"], store_ratios["store_location"], range(1, 10), MULTIPLIERS
+    ))
+    sample = combos[::max(1, len(combos) // args.sample)]
+
+    def per_click():
+        for product, store, months, multiplier in sample:
+            forecast_product(product_ratios, store_ratios, daily_sales, product, store, months, multiplier)
+
+    totals = lambda: horizon_totals(product_ratios, store_ratios, daily_sales, months=9, multipliers=MULTIPLIERS)
+    daily = lambda: forecast_grid(product_ratios, store_ratios, daily_sales, months=9, multipliers=MULTIPLIERS)
+
+    t_click = best_of(per_click, 1)
+    t_totals = best_of(totals, args.repeat)
+    t_daily = best_of(daily, args.repeat)
+
+    print(f"grid: {len(product_ratios)} products x {len(store_ratios)} stores x 9 horizons "
+          f"x {len(MULTIPLIERS)} multipliers = {len(combos):,} combinations")
+    print(f"{'path':<34}{'seconds':>10}{'combos/s':>14}")
+    print(f"{'per-click (sampled)':<34}{t_click:>10.4f}{len(sample) / t_click:>14,.0f}")
+    print(f"{'batch horizon totals':<34}{t_totals:>10.4f}{len(combos) / t_totals:>14,.0f}")
+    print(f"{'batch daily frame (9 months)':<34}{t_daily:>10.4f}{len(combos) / t_daily:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
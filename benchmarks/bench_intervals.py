@@ -0,0 +1,91 @@
+"""Bootstrap prediction intervals: one batched draw vs a loop per series and sample.
+
+Random daily point forecasts and residuals shaped like the real ones
+(260 history days of product x store units, mostly zero or a few units a
+day, less their predicted level) for --series series. The vectorized
+intervals.bootstrap draws every day and sample at once, weekend days from
+weekend history days and weekdays from weekdays, and takes P10/P50/P90
+of each day and of the horizon total for all series; the reference builds
+the same paths one series and one sample at a time in Python, timed on a
+sample of series and scaled up, and must give the same totals. 48 series
+is every product x store plus each product over all stores. A size is
+within budget when the vectorized time is at most --budget-ms.
+
+    python benchmarks/bench_intervals.py [--series 48 240 480] [--days 273] [--samples 1000] [--budget-ms 500]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from intervals import QUANTILES, SEED, bootstrap, residuals
+
+HISTORY_DAYS = 260
+REFERENCE_SERIES = 4
+
+
+def random_series(series, days, seed=0):
+    rng = np.random.default_rng(seed)
+    level = rng.uniform(0.5, 8.0, (series, 1))
+    errors = residuals(rng.poisson(level, (series, HISTORY_DAYS)).astype(float), level)
+    is_weekend = np.arange(days) % 7 >= 5
+    history_weekend = np.arange(HISTORY_DAYS) % 7 >= 5
+    point = rng.uniform(1.0, 10.0, (series, 1)) * np.where(is_weekend, 1.2, 1.0)
+    return point, errors, is_weekend, history_weekend
+
+
+def bootstrap_one(point, errors, samples, seed, is_weekend, history_weekend):
+    # The same paths for one series, sample by sample; returns total quantiles.
+    pools = [np.flatnonzero(~history_weekend), np.flatnonzero(history_weekend)]
+    kind = is_weekend.astype(int)
+    sizes = np.array([len(pool) for pool in pools])
+    draw = np.random.default_rng(seed).integers(0, sizes[kind][:, None], size=(len(point), samples))
+    point = point.astype(np.float32)
+    totals = []
+    for s in range(samples):
+        path = [max(point[t] + errors[pools[kind[t]][draw[t, s]]], 0) for t in range(len(point))]
+        totals.append(np.sum(np.array(path, dtype=np.float32)))
+    return np.quantile(np.array(totals, dtype=np.float32), QUANTILES)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--series", type=int, nargs="+", default=[48, 240, 480])
+    parser.add_argument("--days", type=int, default=273)
+    parser.add_argument("--samples", type=int, default=1000)
+    parser.add_argument("--budget-ms", type=float, default=500.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'series':>8}{'days':>6}{'samples':>9}{'totals ms':>11}{'+daily ms':>11}{'loop ms':>11}{'speedup':>9}"
+          f"{'budget':>8}")
+    for series in args.series:
+        point, errors, is_weekend, history_weekend = random_series(series, args.days)
+        best = {}
+        for daily in (False, True):
+            best[daily] = float("inf")
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                out = bootstrap(point, errors, args.samples, daily=daily, is_weekend=is_weekend,
+                                history_weekend=history_weekend)
+                best[daily] = min(best[daily], time.perf_counter() - t0)
+
+        sample = min(series, REFERENCE_SERIES)
+        t0 = time.perf_counter()
+        for i in range(sample):
+            expected = bootstrap_one(point[i], errors[i], args.samples, SEED, is_weekend, history_weekend)
+            if not np.allclose(expected, out["total"][:, i], rtol=1e-4):
+                raise AssertionError(f"series {i}: vectorized totals differ from the loop")
+        loop = (time.perf_counter() - t0) / sample * series
+        within = "ok" if best[True] * 1000 <= args.budget_ms else "over"
+        print(f"{series:>8,}{args.days:>6}{args.samples:>9,}{best[False] * 1000:>11.1f}{best[True] * 1000:>11.1f}"
+              f"{loop * 1000:>11.0f}{loop / best[True]:>9.0f}{within:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Replenishment simulation: all SKUs as arrays vs one SKU at a time.
+
+Random SKUs with policies in the ranges of cleaned_data.csv (stock 0-500,
+reorder point 50-150, reorder quantity 100-300, lead time 1-10 days) and
+daily demand around their reorder points, over --days. The vectorized
+inventory.simulate runs every SKU at once; the reference is the same rules
+as a plain Python loop per SKU, timed on a sample and scaled up. Results
+of the two are checked to be identical on that sample.
+
+    python benchmarks/bench_inventory.py [--skus 40 1000 5000 20000] [--days 273]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from inventory import simulate
+
+REFERENCE_SKUS = 50
+
+
+def random_network(skus, days, seed=0):
+    rng = np.random.default_rng(seed)
+    reorder_point = rng.integers(50, 151, skus).astype(float)
+    return {
+        "demand": rng.gamma(2.0, reorder_point[:, None] / 20, (skus, days)),
+        "stock": rng.integers(0, 501, skus).astype(float),
+        "reorder_point": reorder_point,
+        "reorder_quantity": rng.integers(100, 301, skus).astype(float),
+        "lead_time": rng.integers(1, 11, skus)
+    }
+
+
+def simulate_one(demand, stock, reorder_point, reorder_quantity, lead_time):
+    # The same rules for one SKU, day by day.
+    lead = max(int(lead_time), 1)
+    due = [0.0] * (len(demand) + lead + 1)
+    on_hand, on_order = float(stock), 0.0
+    stock_out, ordered_out, lost_out = [], [], []
+    for t, wanted in enumerate(demand):
+        on_hand += due[t]
+        on_order -= due[t]
+        served = min(on_hand, wanted)
+        on_hand -= served
+        ordered = 0.0
+        if on_hand + on_order <= reorder_point:
+            ordered = ((reorder_point - on_hand - on_order) // reorder_quantity + 1) * reorder_quantity
+        on_order += ordered
+        due[t + lead] += ordered
+        stock_out.append(on_hand)
+        ordered_out.append(ordered)
+        lost_out.append(wanted - served)
+    return stock_out, ordered_out, lost_out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--skus", type=int, nargs="+", default=[40, 1000, 5000, 20000])
+    parser.add_argument("--days", type=int, default=273)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'SKUs':>8}{'days':>6}{'vectorized ms':>15}{'per-SKU loop ms':>17}{'speedup':>9}{'stockout days':>15}")
+    for skus in args.skus:
+        net = random_network(skus, args.days)
+        best = float("inf")
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            result = simulate(**net)
+            best = min(best, time.perf_counter() - t0)
+
+        sample = min(skus, REFERENCE_SKUS)
+        t0 = time.perf_counter()
+        for i in range(sample):
+            stock, ordered, lost = simulate_one(*(net[k][i] for k in net))
+            if not (np.allclose(stock, result["stock"][i], rtol=0, atol=1e-9)
+                    and np.array_equal(ordered, result["ordered"][i])
+                    and np.allclose(lost, result["lost"][i], rtol=0, atol=1e-9)):
+                raise AssertionError(f"SKU {i}: vectorized result differs from the per-SKU loop")
+        loop = (time.perf_counter() - t0) / sample * skus
+        stockout_days = int((result["lost"] > 1e-9).sum())
+        print(f"{skus:>8,}{args.days:>6}{best * 1000:>15.1f}{loop * 1000:>17.1f}{loop / best:>9.1f}"
+              f"{stockout_days:>15,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Cold-start load benchmark: CSV parsing vs the memory-mapped Arrow store.
+
+Each variant runs in a fresh interpreter so the timings include a real cold
+start and the resident memory is not shared between runs.
+
+    python benchmarks/bench_load.py [--repeat 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PRELUDE = """
+import json, os, resource, time
+import pandas as pd
+import data_store
+
+def rss_kb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+rss_before = rss_kb()
+t0 = time.perf_counter()
+"""
+
+VARIANTS = {
+    "csv": """
+frames = []
+for name in ["cleaned_data", "daily_sales", "forecast_2025"]:
+    frame = pd.read_csv(data_store.SOURCES[name])
+    frame["transaction_date"] = pd.to_datetime(frame["transaction_date"])
+    frames.append(frame)
+""",
+    "store (all columns)": """
+frames = [data_store.read_table(name) for name in ["cleaned_data", "daily_sales", "forecast_2025"]]
+""",
+    "store (Overview columns)": """
+frames = [
+    data_store.read_table("cleaned_data", ["transaction_date", "product_name", "store_location",
+                                           "category", "quantity_sold", "cost_of_goods"]),
+    data_store.read_table("daily_sales"),
+    data_store.read_table("forecast_2025"),
+]
+""",
+}
+
+EPILOGUE = """
+elapsed = time.perf_counter() - t0
+print(json.dumps({"seconds": elapsed, "rss_kb": rss_kb() - rss_before}))
+"""
+
+
+def run_variant(code):
+    out = subprocess.run(
+        [sys.executable, "-c", PRELUDE + code + EPILOGUE],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    import data_store
+    data_store.build_store()
+
+    print(f"{'variant':<28}{'median ms':>12}{'min ms':>10}{'RSS delta MB':>15}")
+    for name, code in VARIANTS.items():
+        runs = [run_variant(code) for _ in range(args.repeat)]
+        times = [r["seconds"] * 1000 for r in runs]
+        rss = statistics.median(r["rss_kb"] for r in runs) / 1024
+        print(f"{name:<28}{statistics.median(times):>12.1f}{min(times):>10.1f}{rss:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
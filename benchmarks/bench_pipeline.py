@@ -0,0 +1,120 @@
+"""Cleaning pipeline throughput and peak memory on synthetic raw extracts.
+
+Writes a raw file in the data/Walmart.csv schema (with ~1% duplicate rows and
+some missing numerics) for each size, runs pipeline.py on it in a fresh
+process and reports wall time and peak RSS. Flat peak RSS across sizes is
+the point of the chunked design.
+
+    python benchmarks/bench_pipeline.py --rows 1000000 10000000 [--workdir /big/disk]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PRODUCTS = ["Camera", "Fridge", "Headphones", "Laptop", "Smartphone", "TV", "Tablet", "Washing Machine"]
+STORES = ["Chicago, IL", "Dallas, TX", "Los Angeles, CA", "Miami, FL", "New York, NY"]
+LOYALTY = ["Bronze", "Silver", "Gold", "Platinum"]
+
+# ru_maxrss survives fork+exec on Linux (the child would report the
+# generator's peak), so prefer VmHWM, which is reset on exec.
+CHILD = """
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+import pipeline
+
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+t0 = time.perf_counter()
+pipeline.run({raw!r}, {out!r}, log=lambda *a: None, add_features=False)
+print(json.dumps({{"seconds": time.perf_counter() - t0, "peak_rss_mb": peak_rss_mb()}}))
+"""
+
+
+def raw_chunk(rng, start_id, n):
+    dates = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 366 * 24 * 60, n), unit="min")
+    promo = rng.random(n) < 0.3
+    chunk = pd.DataFrame({
+        "transaction_id": np.arange(start_id, start_id + n),
+        "customer_id": rng.integers(1, 100_000, n),
+        "product_id": rng.integers(100, 1000, n),
+        "product_name": rng.choice(PRODUCTS, n),
+        "category": rng.choice(["Electronics", "Appliances"], n),
+        "quantity_sold": rng.integers(1, 6, n),
+        "unit_price": np.round(rng.uniform(50, 2000, n), 2),
+        "transaction_date": dates.strftime("%Y-%m-%d %H:%M:%S"),
+        "store_id": rng.integers(1, 21, n),
+        "store_location": rng.choice(STORES, n),
+        "inventory_level": rng.integers(0, 500, n),
+        "reorder_point": rng.integers(50, 150, n),
+        "reorder_quantity": rng.integers(100, 250, n),
+        "supplier_id": rng.integers(100, 1000, n),
+        "supplier_lead_time": rng.integers(1, 11, n),
+        "customer_age": rng.integers(18, 71, n).astype(float),
+        "customer_gender": rng.choice(["Male", "Female", "Other"], n),
+        "customer_income": np.round(rng.uniform(20_000, 150_000, n), 2),
+        "customer_loyalty_level": rng.choice(LOYALTY, n),
+        "payment_method": rng.choice(["Cash", "Credit Card", "Debit Card", "Digital Wallet"], n),
+        "promotion_applied": np.where(promo, "TRUE", "FALSE"),
+        "promotion_type": np.where(promo, rng.choice(["BOGO", "Percentage Discount"], n), "None"),
+        "weather_conditions": rng.choice(["Sunny", "Rainy", "Cloudy", "Stormy"], n),
+        "holiday_indicator": np.where(rng.random(n) < 0.1, "TRUE", "FALSE"),
+        "weekday": dates.day_name(),
+        "stockout_indicator": np.where(rng.random(n) < 0.5, "TRUE", "FALSE"),
+        "forecasted_demand": rng.integers(50, 500, n),
+        "actual_demand": rng.integers(50, 500, n)
+    })
+    chunk.loc[rng.random(n) < 0.005, "customer_age"] = np.nan
+    dups = chunk.sample(frac=0.01, random_state=int(rng.integers(1 << 31)))
+    return pd.concat([chunk, dups], ignore_index=True)
+
+
+def write_raw(path, rows, chunk_rows=500_000, seed=0):
+    rng = np.random.default_rng(seed)
+    written = 0
+    while written < rows:
+        n = min(chunk_rows, rows - written)
+        raw_chunk(rng, written, n).to_csv(path, mode="a" if written else "w", header=not written, index=False)
+        written += n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--workdir", help="where to put the synthetic files (needs ~250 MB per million rows)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_", dir=args.workdir)
+    print(f"{'rows':>12}{'raw MB':>10}{'seconds':>10}{'rows/s':>12}{'peak RSS MB':>14}")
+    for rows in args.rows:
+        raw = os.path.join(workdir, f"raw_{rows}.csv")
+        out = os.path.join(workdir, f"clean_{rows}.csv")
+        write_raw(raw, rows)
+        size_mb = os.path.getsize(raw) / 1e6
+        code = CHILD.format(root=ROOT, raw=raw, out=out)
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        stats = json.loads(result.stdout.strip().splitlines()[-1])
+        print(f"{rows:>12,}{size_mb:>10.0f}{stats['seconds']:>10.1f}"
+              f"{rows / stats['seconds']:>12,.0f}{stats['peak_rss_mb']:>14.0f}")
+        os.remove(raw)
+        os.remove(out)
+    os.rmdir(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Model-serving latency for a 9-month forecast request.
+
+cold: fresh interpreter, unpickle the models, build features, predict.
+warm: models already cached, one batched predict per request.
+per-row: warm cache, but predict called once per forecast day (old style).
+
+    python benchmarks/bench_serving.py [--repeat 20]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+warnings.filterwarnings("ignore")
+
+from data_store import read_table
+from forecast import horizon_dates
+from model_serving import build_features, history_features, load_models, predict_horizon
+
+COLD = """
+import json, time, warnings
+warnings.filterwarnings("ignore")
+t0 = time.perf_counter()
+from data_store import read_table
+from forecast import horizon_dates
+from model_serving import load_models, predict_horizon
+daily_sales = read_table("daily_sales")
+predict_horizon(load_models(), daily_sales, horizon_dates(9))
+print(json.dumps({"seconds": time.perf_counter() - t0}))
+"""
+
+
+def cold_request():
+    out = subprocess.run([sys.executable, "-c", COLD], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])["seconds"]
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    daily_sales = read_table("daily_sales")
+    dates = horizon_dates(9)
+    models = load_models()
+    history = history_features(daily_sales)
+
+    def per_row():
+        X = build_features(dates, history)
+        for i in range(len(X)):
+            models["qty"].predict(X.iloc[[i]])
+
+    results = {
+        "cold (new process)": [cold_request() for _ in range(max(1, args.repeat // 5))],
+        "warm, batched": timed(lambda: predict_horizon(models, daily_sales, dates), args.repeat),
+        "warm, per-row predict": timed(per_row, max(1, args.repeat // 5)),
+    }
+
+    print(f"{len(dates)}-day horizon")
+    print(f"{'request':<26}{'p50 ms':>10}{'max ms':>10}")
+    for name, times in results.items():
+        ms = [t * 1000 for t in times]
+        print(f"{name:<26}{statistics.median(ms):>10.2f}{max(ms):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
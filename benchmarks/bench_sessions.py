@@ -0,0 +1,144 @@
+"""Load test: N concurrent dashboard sessions against one Streamlit server.
+
+Starts `streamlit run` headless, then opens N websocket sessions that speak
+Streamlit's own protocol: each selects a page and reruns it --reruns times,
+as widget interaction would. Reports per-rerun latency (send to
+script_finished) and the server's RSS after each level and at peak. Point
+--app at another copy of ui.py (kept in the repo root so its imports
+resolve) to compare versions. With --rows, the server runs in a scratch
+directory whose cleaned_data.csv is synthetic and that size; the other
+artifacts are linked from the repo.
+
+    python benchmarks/bench_sessions.py --sessions 1 8 32 --page Overview [--rows 1000000]
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import numpy as np
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ["Quick Prediction", "Overview", "Customer Analytics", "Model Performance", "Data Explorer"]
+
+
+def rss_mb(pid):
+    stats = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "VmHWM"):
+                stats[key] = int(value.split()[0]) / 1024
+    return stats["VmRSS"], stats["VmHWM"]
+
+
+def synthetic_workdir(rows):
+    from synthetic import cleaned_frame
+
+    workdir = tempfile.mkdtemp(prefix="bench_sessions_")
+    for name in os.listdir(ROOT):
+        if name.endswith((".csv", ".pkl")) and name != "cleaned_data.csv":
+            os.symlink(os.path.join(ROOT, name), os.path.join(workdir, name))
+    cleaned_frame(rows).to_csv(os.path.join(workdir, "cleaned_data.csv"), index=False)
+    return workdir
+
+
+def start_server(app, port, cwd):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", app, "--server.headless", "true",
+         "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+        cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    for _ in range(120):
+        try:
+            urllib.request.urlopen(f"http://localhost:{port}/_stcore/health", timeout=1)
+            return server
+        except OSError:
+            time.sleep(0.5)
+    server.kill()
+    raise SystemExit("streamlit server did not start")
+
+
+async def rerun(ws, widgets=()):
+    # Returns (seconds, page radio id) for one script run.
+    msg = BackMsg()
+    msg.rerun_script.query_string = ""
+    for widget_id, value in widgets:
+        state = msg.rerun_script.widget_states.widgets.add()
+        state.id = widget_id
+        state.string_value = value
+    t0 = time.perf_counter()
+    await ws.send(msg.SerializeToString())
+    radio_id = None
+    while True:
+        fm = ForwardMsg()
+        fm.ParseFromString(await ws.recv())
+        kind = fm.WhichOneof("type")
+        if kind == "delta" and fm.delta.WhichOneof("type") == "new_element":
+            element = fm.delta.new_element
+            if element.WhichOneof("type") == "radio" and element.radio.label == "Go to":
+                radio_id = element.radio.id
+        elif kind == "script_finished":
+            if fm.script_finished != ForwardMsg.FINISHED_SUCCESSFULLY:
+                raise RuntimeError(f"script finished with status {fm.script_finished}")
+            return time.perf_counter() - t0, radio_id
+
+
+async def session(url, page, reruns, ready, n, start):
+    async with websockets.connect(url, subprotocols=["streamlit"], max_size=None) as ws:
+        _, radio_id = await rerun(ws)
+        widgets = [(radio_id, page)]
+        await rerun(ws, widgets)
+        # Timed reruns start once every session has its page open.
+        ready.append(ws)
+        if len(ready) == n:
+            start.set()
+        await start.wait()
+        return [(await rerun(ws, widgets))[0] for _ in range(reruns)]
+
+
+async def level(url, n, page, reruns):
+    ready, start = [], asyncio.Event()
+    results = await asyncio.gather(*[session(url, page, reruns, ready, n, start) for _ in range(n)])
+    return [s for r in results for s in r]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--reruns", type=int, default=5)
+    parser.add_argument("--page", choices=PAGES, default="Overview")
+    parser.add_argument("--app", default=os.path.join(ROOT, "ui.py"))
+    parser.add_argument("--port", type=int, default=8599)
+    parser.add_argument("--rows", type=int, help="serve a synthetic cleaned_data.csv of this many rows")
+    args = parser.parse_args()
+
+    workdir = synthetic_workdir(args.rows) if args.rows else None
+    server = start_server(os.path.abspath(args.app), args.port, workdir or ROOT)
+    url = f"ws://localhost:{args.port}/_stcore/stream"
+    try:
+        print(f"{os.path.basename(args.app)}, page {args.page!r}, {args.reruns} reruns per session"
+              + (f", {args.rows:,} synthetic rows" if args.rows else ""))
+        print(f"{'sessions':>9}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'RSS MB':>10}{'peak MB':>10}")
+        for n in args.sessions:
+            ms = np.array(asyncio.run(level(url, n, args.page, args.reruns))) * 1000
+            rss, peak = rss_mb(server.pid)
+            print(f"{n:>9}{np.percentile(ms, 50):>10.0f}{np.percentile(ms, 95):>10.0f}{ms.max():>10.0f}"
+                  f"{rss:>10.0f}{peak:>10.0f}")
+    finally:
+        server.terminate()
+        server.wait()
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
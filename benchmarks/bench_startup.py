@@ -0,0 +1,122 @@
+"""Time to first render of each dashboard page, from a fresh process.
+
+Each sample is a new interpreter that has imported streamlit (as a server
+has before the first session connects) and then runs ui.py once with the
+page already selected in the sidebar: the app's imports, that page's data
+loads and its rendering, with nothing left over from an earlier run. The
+time is the script's own, from its first line to its last; AppTest's
+per-run setup is not included. Reported per page: median and best over
+--repeat processes, the part spent in the "Load data" section, resident
+memory added by the run and how many modules the script imported.
+
+With --rows the run uses a synthetic cleaned_data.csv of that size in a
+scratch directory (the other artifacts are the repo's), which shows what
+each page's loading costs as the transaction table grows.
+
+    python benchmarks/bench_startup.py [--repeat 5] [--pages Overview ...]
+    python benchmarks/bench_startup.py --rows 2000000
+    python benchmarks/bench_startup.py --ui old_ui.py   # another version
+"""
+import argparse
+import json
+import os
+import statistics
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from suite import prepare_workdir
+from synthetic import ROOT
+
+PAGES = ["Quick Prediction", "Overview", "Customer Analytics", "Model Performance", "Data Explorer",
+         "Inventory Planning"]
+
+# Runs in the child: page and ui path in argv. The wrapper script makes the
+# "Go to" radio start on the page, then executes ui.py unchanged and leaves
+# its timings in session state.
+CHILD = """
+import json, os, sys, time
+import streamlit
+from streamlit.testing.v1 import AppTest
+
+def rss_kb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+
+page, ui = sys.argv[1], sys.argv[2]
+wrapper = f'''
+import sys, time
+import streamlit as st
+t0, modules = time.perf_counter(), len(sys.modules)
+radio = st.sidebar.radio
+def pick(label, options, *args, **kwargs):
+    if label == "Go to":
+        kwargs["index"] = list(options).index({page!r})
+    return radio(label, options, *args, **kwargs)
+st.sidebar.radio = pick
+try:
+    with open({ui!r}) as f:
+        exec(compile(f.read(), {ui!r}, "exec"), {{"__name__": "__main__", "__file__": {ui!r}}})
+finally:
+    st.session_state["startup"] = {{"seconds": time.perf_counter() - t0, "modules": len(sys.modules) - modules}}
+'''
+at = AppTest.from_string(wrapper, default_timeout=600)
+rss = rss_kb()
+at.run()
+result = at.session_state["startup"]
+result["rss_kb"] = rss_kb() - rss
+result["errors"] = [e.value for e in at.exception]
+with open(os.environ["WALMART_DIAG_LOG"]) as f:
+    spans = json.loads(f.read().splitlines()[-1])["spans"]
+result["load_seconds"] = sum(s["ms"] for s in spans if s["name"] == "Load data") / 1000
+print(json.dumps(result))
+"""
+
+
+def run_page(page, ui, workdir):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, os.environ.get("PYTHONPATH", "")]),
+               WALMART_DIAG_LOG=os.path.join(workdir, "startup_diagnostics.jsonl"))
+    env.pop("WALMART_PROFILE", None)
+    out = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", CHILD, page, ui],
+        cwd=workdir, capture_output=True, text=True, check=True, env=env
+    )
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    if result["errors"]:
+        raise RuntimeError(f"{page}: {result['errors'][0]}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--pages", nargs="+", default=PAGES, choices=PAGES)
+    parser.add_argument("--ui", default=os.path.join(ROOT, "ui.py"))
+    parser.add_argument("--rows", type=int, help="synthetic cleaned_data rows (default: the repo's data)")
+    args = parser.parse_args()
+
+    ui = os.path.abspath(args.ui)
+    workdir = prepare_workdir(args.rows) if args.rows else tempfile.mkdtemp(prefix="startup_")
+    if not args.rows:
+        for name in os.listdir(ROOT):
+            if name.endswith((".csv", ".pkl")) or name == "store":
+                os.symlink(os.path.join(ROOT, name), os.path.join(workdir, name))
+    try:
+        for page in args.pages:
+            run_page(page, ui, workdir)  # builds stale store files and caches first
+        print(f"{'page':<22}{'median ms':>11}{'min ms':>9}{'load ms':>9}{'RSS MB':>9}{'modules':>9}")
+        for page in args.pages:
+            runs = [run_page(page, ui, workdir) for _ in range(args.repeat)]
+            times = [r["seconds"] * 1000 for r in runs]
+            load = statistics.median(r["load_seconds"] for r in runs) * 1000
+            rss = statistics.median(r["rss_kb"] for r in runs) / 1024
+            modules = statistics.median(r["modules"] for r in runs)
+            print(f"{page:<22}{statistics.median(times):>11.1f}{min(times):>9.1f}{load:>9.1f}"
+                  f"{rss:>9.1f}{modules:>9.0f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Per-series SARIMA training wall time vs worker count, cold and warm-started.
+
+For each --workers value: a cold fit of all 40 product x store series into
+a scratch registry, then a warm refit from it (what a nightly run does).
+Speedup is against the first --workers value; it can only follow the
+cores this machine has.
+
+    python benchmarks/bench_training.py --workers 1 2 4 8
+"""
+import argparse
+import os
+import tempfile
+
+from synthetic import ROOT
+
+from data_store import read_table
+from train_series import SERIES_COLUMNS, train
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    transactions = read_table("cleaned_data", SERIES_COLUMNS)
+    print(f"{os.cpu_count()} CPUs")
+    print(f"{'workers':>8}{'cold s':>9}{'speedup':>9}{'warm s':>9}{'speedup':>9}{'fit s':>9}")
+    base = None
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as tmp:
+            registry = os.path.join(tmp, "registry.json")
+            cold = train(transactions, registry, workers, warm=False, log=lambda _: None)
+            warm = train(transactions, registry, workers, warm=True, log=lambda _: None)
+        base = base or (cold["wall_seconds"], warm["wall_seconds"])
+        print(f"{workers:>8}{cold['wall_seconds']:>9.1f}{base[0] / cold['wall_seconds']:>9.2f}"
+              f"{warm['wall_seconds']:>9.1f}{base[1] / warm['wall_seconds']:>9.2f}{cold['fit_seconds']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""Benchmark suite: load, aggregation, forecast and render paths at several sizes.
+
+For each --rows size a scratch directory gets a synthetic cleaned_data.csv
+(benchmarks/synthetic.py, written in chunks so 10M rows fit) and links to
+the repo's other artifacts; the suite then runs there, the way the
+dashboard would:
+  load      CSV parse, Arrow store build, store reads (all / cube columns)
+  overview  cube build and the Overview page's rollups
+  explorer  index build, default-filter query cold and warm
+  forecast  daily aggregation, model baseline, per-product forecast
+            (trailing and model), monthly horizon rollup of the full grid,
+            forecast cube build and a Quick Prediction click served from it
+  render    warm AppTest rerun of each dashboard page
+Each case keeps the best and median of --repeat runs. Every size appends
+one JSON line to the history file (commit, host, rows, per-case seconds);
+`compare` diffs two runs from it and exits 1 when a case got slower than
+--threshold.
+
+    python benchmarks/suite.py run --rows 10000 100000 1000000 10000000 [--cases load overview]
+    python benchmarks/suite.py compare [OLD NEW] [--threshold 0.1]
+    python benchmarks/suite.py history
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+import warnings
+from datetime import datetime, timezone
+
+from synthetic import ROOT, write_cleaned
+
+HISTORY_PATH = os.path.join(ROOT, "benchmarks", "history.jsonl")
+GROUPS = ["load", "overview", "explorer", "forecast", "render"]
+PAGES = ["Quick Prediction", "Overview", "Customer Analytics", "Model Performance", "Data Explorer"]
+THRESHOLD = 0.10
+# Differences below this many seconds are noise, whatever the ratio.
+MIN_DELTA = 0.002
+
+# The pickled encoders predate the installed scikit-learn.
+warnings.filterwarnings("ignore", message="Trying to unpickle")
+
+
+def measure(fn, repeat, setup=None):
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return {"best": min(times), "median": statistics.median(times)}
+
+
+def prepare_workdir(rows, workdir=None, chunk_rows=1_000_000):
+    workdir = workdir or tempfile.mkdtemp(prefix=f"suite_{rows}_")
+    os.makedirs(workdir, exist_ok=True)
+    for name in os.listdir(ROOT):
+        if name.endswith((".csv", ".pkl")) and name != "cleaned_data.csv":
+            target = os.path.join(workdir, name)
+            if not os.path.lexists(target):
+                os.symlink(os.path.join(ROOT, name), target)
+    write_cleaned(os.path.join(workdir, "cleaned_data.csv"), rows, chunk_rows)
+    return workdir
+
+
+def case_load(ctx, repeat):
+    import data_store
+    from rollup import CUBE_COLUMNS
+
+    yield "load.csv", measure(lambda: data_store.read_csv_table("cleaned_data"), repeat)
+    yield "load.store_build", measure(lambda: data_store.build_store(["cleaned_data"]), repeat)
+    yield "load.store_read_all", measure(lambda: data_store.read_table("cleaned_data"), repeat)
+    yield "load.store_read_cube", measure(lambda: data_store.read_table("cleaned_data", CUBE_COLUMNS), repeat)
+
+
+def case_overview(ctx, repeat):
+    from rollup import CUBE_COLUMNS, build_cube, rollup
+
+    df = ctx.frame()[CUBE_COLUMNS]
+    yield "overview.cube_build", measure(lambda: build_cube(df), repeat)
+    cube = build_cube(df)
+    yield "overview.totals", measure(lambda: rollup(cube), repeat)
+    yield "overview.by_category", measure(lambda: rollup(cube, by=["category"]), repeat)
+    yield "overview.trend_monthly", measure(lambda: rollup(cube, freq="M"), repeat)
+    yield "overview.trend_weekly", measure(lambda: rollup(cube, freq="W"), repeat)
+
+
+def case_explorer(ctx, repeat):
+    from query import TransactionIndex
+
+    df = ctx.frame()
+    yield "explorer.index_build", measure(lambda: TransactionIndex(df), repeat)
+    index = TransactionIndex(df)
+    start, end = index.date_bounds()
+    filters = {"category": index.values["category"], "product_name": index.values["product_name"]}
+
+    def query():
+        result = index.query(start, end, **filters)
+        result.latest(100)
+        result.totals()
+
+    yield "explorer.query_cold", measure(query, repeat, setup=index._cache.clear)
+    yield "explorer.query_warm", measure(query, repeat)
+
+
+def case_forecast(ctx, repeat):
+    import pandas as pd
+
+    import forecast_cube
+    from daily_agg import aggregate_daily
+    from forecast import forecast_product, horizon_dates, horizon_totals
+    from model_serving import load_models, predict_horizon
+
+    df = ctx.frame()
+    yield "forecast.daily_agg", measure(lambda: aggregate_daily(df), repeat)
+    daily_sales = aggregate_daily(df)
+    product_ratios = pd.read_csv("product_ratios.csv")
+    store_ratios = pd.read_csv("store_ratios.csv")
+    models = load_models()
+    dates = horizon_dates(9)
+    yield "forecast.model_baseline", measure(lambda: predict_horizon(models, daily_sales, dates), repeat)
+    baseline = predict_horizon(models, daily_sales, dates)
+
+    def product(baseline):
+        pred_df = forecast_product(product_ratios, store_ratios, daily_sales, "Camera", "Chicago, IL", 3, 1.0, baseline)
+        pred_df.groupby(pred_df["date"].dt.strftime("%B %Y"))[["predicted_quantity", "predicted_revenue"]].sum()
+
+    yield "forecast.product_trailing", measure(lambda: product(None), repeat)
+    yield "forecast.product_model", measure(lambda: product(baseline), repeat)
+    yield "forecast.monthly_rollup", measure(
+        lambda: horizon_totals(product_ratios, store_ratios, daily_sales, months=9, baseline=baseline), repeat)
+
+    yield "forecast.cube_build", measure(forecast_cube.build, repeat)
+    cube = forecast_cube.load()
+    click = ("model", "Camera", "Chicago, IL", 3, 1.0)
+    yield "forecast.cube_click", measure(lambda: (cube.forecast(*click), cube.monthly(*click)), repeat)
+
+
+def case_render(ctx, repeat):
+    from streamlit.logger import set_log_level
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, "ui.py"), default_timeout=600)
+    at.run()
+    set_log_level("error")  # deprecation notices on every rerun
+    for page in PAGES:
+        radio = [r for r in at.sidebar.radio if r.label == "Go to"][0]
+        radio.set_value(page).run()  # first visit loads the page's data
+
+        def rerun():
+            at.run()
+            if at.exception:
+                raise RuntimeError(f"{page}: {at.exception[0].value}")
+
+        yield f"render.{page.lower().replace(' ', '_')}", measure(rerun, repeat)
+
+
+CASES = {"load": case_load, "overview": case_overview, "explorer": case_explorer,
+         "forecast": case_forecast, "render": case_render}
+
+
+class Context:
+    # Loads the synthetic frame once per size, for the cases that need it.
+    def __init__(self):
+        self._frame = None
+
+    def frame(self):
+        if self._frame is None:
+            import data_store
+            self._frame = data_store.read_table("cleaned_data")
+        return self._frame
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def run_suite(rows, groups, repeat, workdir=None, chunk_rows=1_000_000):
+    # Runs in the scratch directory: the repo modules read relative paths.
+    import data_store
+
+    workdir = prepare_workdir(rows, workdir, chunk_rows)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    data_store.invalidate()
+    results = {}
+    try:
+        ctx = Context()
+        for group in groups:
+            for name, timing in CASES[group](ctx, repeat):
+                results[name] = timing
+                print(f"{rows:>11,}  {name:<34}{timing['best'] * 1000:>11.2f}{timing['median'] * 1000:>11.2f}",
+                      flush=True)
+    finally:
+        os.chdir(cwd)
+        data_store.invalidate()
+    return workdir, results
+
+
+def append_history(record, path=HISTORY_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def read_history(path=HISTORY_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def select_run(records, ref):
+    # ref: a run id (or prefix), a commit, or a negative index over runs.
+    runs = list(dict.fromkeys(r["run"] for r in records))
+    if ref.lstrip("-").isdigit():
+        run = runs[int(ref)]
+    else:
+        matches = [r["run"] for r in records if r["run"].startswith(ref) or r.get("commit") == ref]
+        if not matches:
+            raise SystemExit(f"no run matches {ref!r}")
+        run = matches[-1]
+    return {r["rows"]: r for r in records if r["run"] == run}
+
+
+def compare(old, new, threshold=THRESHOLD, min_delta=MIN_DELTA):
+    # Rows of (rows, case, old s, new s, change, flag) for cases in both
+    # runs; compares best times, which are the least noisy.
+    rows = []
+    for size in sorted(set(old) & set(new)):
+        a, b = old[size]["results"], new[size]["results"]
+        for case in a:
+            if case not in b:
+                continue
+            then, now = a[case]["best"], b[case]["best"]
+            change = now / then - 1 if then else float("inf")
+            slower = change > threshold and now - then > min_delta
+            faster = change < -threshold and then - now > min_delta
+            rows.append((size, case, then, now, change, "REGRESSION" if slower else "faster" if faster else ""))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--history", default=HISTORY_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="run the suite and append to the history")
+    run.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    run.add_argument("--cases", nargs="+", choices=GROUPS, default=GROUPS)
+    run.add_argument("--repeat", type=int, default=3)
+    run.add_argument("--chunk-rows", type=int, default=1_000_000)
+    run.add_argument("--keep", action="store_true", help="keep the scratch directories")
+    run.add_argument("--label", help="free-form note stored with the run")
+
+    cmp = sub.add_parser("compare", help="compare two runs (default: the last two)")
+    cmp.add_argument("old", nargs="?", default="-2")
+    cmp.add_argument("new", nargs="?", default="-1")
+    cmp.add_argument("--threshold", type=float, default=THRESHOLD, help="relative slowdown to flag")
+    cmp.add_argument("--min-delta", type=float, default=MIN_DELTA, help="seconds below which to ignore")
+
+    sub.add_parser("history", help="list recorded runs")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        run_id = uuid.uuid4().hex[:8]
+        commit, dirty = git_commit()
+        host = {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count()}
+        print(f"run {run_id} at {commit}{' (dirty)' if dirty else ''}, repeat {args.repeat}")
+        print(f"{'rows':>11}  {'case':<34}{'best ms':>11}{'median ms':>11}")
+        for rows in args.rows:
+            workdir, results = run_suite(rows, args.cases, args.repeat, chunk_rows=args.chunk_rows)
+            if not args.keep:
+                shutil.rmtree(workdir, ignore_errors=True)
+            append_history({
+                "run": run_id, "ts": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "commit": commit, "dirty": dirty, "label": args.label, "host": host,
+                "rows": rows, "repeat": args.repeat, "results": results
+            }, args.history)
+        print(f"appended to {args.history}")
+
+    elif args.command == "compare":
+        records = read_history(args.history)
+        old, new = select_run(records, args.old), select_run(records, args.new)
+        first = lambda run: next(iter(run.values()))
+        print(f"{first(old)['run']} ({first(old)['commit']}) -> {first(new)['run']} ({first(new)['commit']}), "
+              f"threshold {args.threshold:.0%}")
+        print(f"{'rows':>11}  {'case':<34}{'old ms':>11}{'new ms':>11}{'change':>9}")
+        rows = compare(old, new, args.threshold, args.min_delta)
+        for size, case, then, now, change, flag in rows:
+            print(f"{size:>11,}  {case:<34}{then * 1000:>11.2f}{now * 1000:>11.2f}{change:>+9.0%}  {flag}")
+        regressions = [r for r in rows if r[5] == "REGRESSION"]
+        print(f"{len(regressions)} regression(s) in {len(rows)} cases")
+        sys.exit(1 if regressions else 0)
+
+    else:
+        runs = {}
+        for r in read_history(args.history):
+            runs.setdefault(r["run"], []).append(r)
+        for run_id, records in runs.items():
+            r = records[0]
+            sizes = ", ".join(f"{x['rows']:,}" for x in records)
+            print(f"{run_id}  {r['ts']}  {r['commit']}{'+' if r['dirty'] else ' '}  rows {sizes}"
+                  + (f"  {r['label']}" if r.get("label") else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Synthetic transactions in the cleaned_data.csv schema for benchmarks.
+
+Values follow the shapes of the real extract: 40 columns, 8 products, 5
+stores, 4 loyalty levels, one year of date-sorted timestamps. Small sizes
+come back as one frame (cleaned_frame); large ones are written to disk in
+chunks (write_cleaned), each covering its own slice of the year, so 10M
+rows never have to fit in memory at once.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import joblib
+
+from features import add_features, lookup_tables
+
+PRODUCTS = ["Camera", "Fridge", "Headphones", "Laptop", "Smartphone", "TV", "Tablet", "Washing Machine"]
+CATEGORIES = ["Appliances", "Electronics"]
+STORES = ["Chicago, IL", "Dallas, TX", "Los Angeles, CA", "Miami, FL", "New York, NY"]
+LOYALTY = ["Bronze", "Gold", "Platinum", "Silver"]
+GENDERS = ["Female", "Male", "Other"]
+PAYMENTS = ["Cash", "Credit Card", "Debit Card", "Digital Wallet"]
+PROMOTIONS = ["BOGO", "Percentage Discount"]
+WEATHER = ["Cloudy", "Rainy", "Stormy", "Sunny"]
+
+
+def _frame(rng, rows, start, first_minute, last_minute, features):
+    minutes = np.sort(rng.integers(first_minute, last_minute, rows))
+    dates = pd.Timestamp(start) + pd.to_timedelta(minutes, unit="min")
+    quantity = rng.integers(1, 6, rows)
+    unit_price = np.round(rng.uniform(50, 2000, rows), 2)
+    promo = rng.random(rows) < 0.3
+    dow = dates.dayofweek
+
+    df = pd.DataFrame({
+        "product_id": rng.integers(100, 1000, rows),
+        "product_name": pd.Categorical.from_codes(rng.integers(0, len(PRODUCTS), rows), PRODUCTS),
+        "category": pd.Categorical.from_codes(rng.integers(0, len(CATEGORIES), rows), CATEGORIES),
+        "quantity_sold": quantity,
+        "unit_price": unit_price,
+        "transaction_date": dates,
+        "store_id": rng.integers(1, 21, rows),
+        "store_location": pd.Categorical.from_codes(rng.integers(0, len(STORES), rows), STORES),
+        "inventory_level": rng.integers(0, 500, rows),
+        "reorder_point": rng.integers(50, 150, rows),
+        "reorder_quantity": rng.integers(100, 250, rows),
+        "supplier_lead_time": rng.integers(1, 11, rows),
+        "customer_age": rng.integers(18, 71, rows),
+        "customer_gender": pd.Categorical.from_codes(rng.integers(0, len(GENDERS), rows), GENDERS),
+        "customer_income": np.round(rng.uniform(20_000, 150_000, rows), 2),
+        "loyalty_level": pd.Categorical.from_codes(rng.integers(0, len(LOYALTY), rows), LOYALTY),
+        "payment_method": pd.Categorical.from_codes(rng.integers(0, len(PAYMENTS), rows), PAYMENTS),
+        "promotion_applied": promo,
+        "promotion_type": pd.Categorical.from_codes(
+            np.where(promo, rng.integers(0, len(PROMOTIONS), rows), -1), PROMOTIONS
+        ),
+        "weather_conditions": pd.Categorical.from_codes(rng.integers(0, len(WEATHER), rows), WEATHER),
+        "holiday_indicator": rng.random(rows) < 0.1,
+        "stockout_indicator": rng.random(rows) < 0.5,
+        "forecasted_demand": rng.integers(50, 500, rows),
+        "actual_demand": rng.integers(50, 500, rows),
+        "year": dates.year,
+        "month": dates.month,
+        "dayofweek": dow,
+        "is_weekend": (dow >= 5).astype(int),
+        "cost_of_goods": quantity * unit_price
+    })
+    # Drawn last so the other columns stay as they were before it existed.
+    df.insert(0, "customer_id", rng.integers(1001, 1001 + max(9_000, rows), rows))
+    if features:
+        tables = lookup_tables(joblib.load(os.path.join(ROOT, "encoders.pkl")))
+        df = add_features(df, tables, pd.Timestamp(start))
+    return df
+
+
+def cleaned_frame(rows, seed=0, start="2024-01-01", days=366, features=True):
+    rng = np.random.default_rng(seed)
+    return _frame(rng, rows, start, 0, days * 24 * 60, features)
+
+
+def write_cleaned(path, rows, chunk_rows=1_000_000, seed=0, start="2024-01-01", days=366):
+    # CSV, or Arrow IPC when path ends in .arrow/.feather. days_since_start
+    # counts from `start`, the first possible timestamp.
+    import pyarrow as pa
+
+    rng = np.random.default_rng(seed)
+    n_chunks = max(1, -(-rows // chunk_rows))
+    bounds = np.linspace(0, days * 24 * 60, n_chunks + 1).astype(np.int64)
+    arrow = path.endswith((".arrow", ".feather"))
+    writer = schema = None
+    for i in range(n_chunks):
+        n = rows // n_chunks + (i < rows % n_chunks)
+        chunk = _frame(rng, n, start, bounds[i], bounds[i + 1], True)
+        if arrow:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                schema = table.schema
+                writer = pa.ipc.new_file(path, schema)
+            writer.write_table(table.cast(schema))
+        else:
+            chunk.to_csv(path, mode="a" if i else "w", header=not i, index=False)
+    if writer is not None:
+        writer.close()
+    return path
@@ -0,0 +1,117 @@
+import argparse
+import os
+import tempfile
+
+import pandas as pd
+
+from data_store import replace_file
+
+# Builds daily_sales.csv: one row per calendar day (days without sales are
+# zero-filled) with rolling windows over days, not transactions.
+TRANSACTIONS_PATH = "cleaned_data.csv"
+DAILY_SALES_PATH = "daily_sales.csv"
+
+SUM_COLUMNS = ["quantity_sold", "cost_of_goods", "transaction_count"]
+MOVING_AVERAGES = {
+    "qty_ma7": ("quantity_sold", 7),
+    "qty_ma14": ("quantity_sold", 14),
+    "qty_ma30": ("quantity_sold", 30),
+    "cog_ma7": ("cost_of_goods", 7),
+    "cog_ma14": ("cost_of_goods", 14)
+}
+MAX_WINDOW = max(w for _, w in MOVING_AVERAGES.values())
+COLUMNS = (
+    ["transaction_date"] + SUM_COLUMNS
+    + ["year", "month", "week", "day_of_week", "day_of_year", "is_weekend", "days_since_start"]
+    + list(MOVING_AVERAGES)
+)
+
+
+def sum_by_day(transactions):
+    day = pd.to_datetime(transactions["transaction_date"]).dt.normalize().rename("transaction_date")
+    return transactions.groupby(day).agg(
+        quantity_sold=("quantity_sold", "sum"),
+        cost_of_goods=("cost_of_goods", "sum"),
+        transaction_count=("quantity_sold", "size")
+    )
+
+
+def _finish(sums, start):
+    # sums: day-indexed SUM_COLUMNS frame. Adds calendar columns and the
+    # rolling windows; rows earlier than a full window use what is available.
+    daily = sums.reset_index()
+    d = daily["transaction_date"].dt
+    daily["year"] = d.year
+    daily["month"] = d.month
+    daily["week"] = d.isocalendar().week.astype(int).to_numpy()
+    daily["day_of_week"] = d.dayofweek
+    daily["day_of_year"] = d.dayofyear
+    daily["is_weekend"] = (d.dayofweek >= 5).astype(int)
+    daily["days_since_start"] = (daily["transaction_date"] - start).dt.days
+    for col, (source, window) in MOVING_AVERAGES.items():
+        daily[col] = daily[source].rolling(window, min_periods=1).mean()
+    return daily[COLUMNS]
+
+
+def aggregate_daily(transactions):
+    sums = sum_by_day(transactions)
+    days = pd.date_range(sums.index.min(), sums.index.max(), freq="D", name="transaction_date")
+    return _finish(sums.reindex(days, fill_value=0), days[0])
+
+
+def append_transactions(daily, transactions):
+    # Folds a batch of new transactions into an existing daily frame. Only
+    # rows from the first touched day onward change, and recomputing them
+    # needs MAX_WINDOW - 1 days of earlier context, so everything before that
+    # is reused as-is. Returns the new frame and the first changed row.
+    sums = sum_by_day(transactions)
+    start = daily["transaction_date"].iloc[0]
+    if sums.index.min() < start:
+        raise ValueError("transactions before the first aggregated day need a full rebuild")
+
+    end = max(daily["transaction_date"].iloc[-1], sums.index.max())
+    days = pd.date_range(start, end, freq="D", name="transaction_date")
+    first = days.get_loc(sums.index.min())
+    context = max(0, first - (MAX_WINDOW - 1))
+
+    tail = daily.set_index("transaction_date")[SUM_COLUMNS].reindex(days[context:], fill_value=0)
+    tail.loc[sums.index, SUM_COLUMNS] += sums[SUM_COLUMNS]
+    tail = _finish(tail, start).iloc[first - context:]
+
+    updated = pd.concat([daily.iloc[:first], tail], ignore_index=True)
+    return updated, first
+
+
+def write_daily(daily, path=DAILY_SALES_PATH):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    os.close(fd)
+    daily.to_csv(tmp, index=False)
+    replace_file(tmp, path)
+
+
+def update_daily_sales(transactions, path=DAILY_SALES_PATH):
+    daily = pd.read_csv(path, parse_dates=["transaction_date"])
+    n_existing = len(daily)
+    daily, first = append_transactions(daily, transactions)
+    if first >= n_existing:
+        # Only new days: the existing rows are untouched, so append them.
+        daily.iloc[first:].to_csv(path, mode="a", header=False, index=False)
+    else:
+        write_daily(daily, path)
+    return daily
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or update daily_sales.csv")
+    parser.add_argument("--transactions", default=TRANSACTIONS_PATH)
+    parser.add_argument("--output", default=DAILY_SALES_PATH)
+    parser.add_argument("--append", metavar="CSV",
+                        help="fold new transactions into an existing daily file instead of rebuilding")
+    args = parser.parse_args()
+
+    if args.append:
+        daily = update_daily_sales(pd.read_csv(args.append), args.output)
+    else:
+        daily = aggregate_daily(pd.read_csv(args.transactions))
+        write_daily(daily, args.output)
+    print(f"{args.output}: {len(daily)} days")
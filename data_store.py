@@ -0,0 +1,255 @@
+import json
+import os
+import stat
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+import schema
+from schema import BOOL_COLS, CATEGORY_COLS, DATE_COLS
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+    feather = None
+
+try:
+    import fcntl
+except ImportError:  # no cross-process file locks (Windows)
+    fcntl = None
+
+# Typed, uncompressed Arrow IPC copies of the CSV artifacts. Uncompressed
+# files can be memory-mapped, so a load only touches the columns it asks for.
+# ingest.py adds each batch as a segment file next to the table's base file
+# (store/cleaned_data.000001.arrow, ...) instead of rewriting it; a table is
+# its base plus its segments in order, and a rebuild from the CSV drops them.
+STORE_DIR = "store"
+
+SOURCES = {
+    "cleaned_data": "cleaned_data.csv",
+    "daily_sales": "daily_sales.csv",
+    "forecast_2025": "forecast_2025.csv",
+}
+
+# Declared dtypes per table (schema.py); the other tables only get their
+# dates, labels and flags typed.
+SCHEMAS = {"cleaned_data": schema.TRANSACTIONS}
+
+# ingest.py replaces several artifacts per batch. It swaps them in while
+# holding LOCK_PATH exclusively, and readers that load under snapshot() hold
+# it shared, so a reader sees every artifact of one version and never a
+# mix. VERSION_PATH counts the ingested batches.
+LOCK_PATH = os.path.join(STORE_DIR, ".lock")
+VERSION_PATH = os.path.join(STORE_DIR, "version.json")
+
+
+def apply_types(df, name=None):
+    if name in SCHEMAS:
+        return schema.apply_schema(df, SCHEMAS[name])
+    for c in DATE_COLS:
+        if c in df.columns:
+            df[c] = pd.to_datetime(df[c])
+    for c in CATEGORY_COLS:
+        if c in df.columns:
+            df[c] = df[c].astype("category")
+    for c in BOOL_COLS:
+        if c in df.columns:
+            df[c] = df[c].astype(bool)
+    return df
+
+
+def store_path(name):
+    return os.path.join(STORE_DIR, f"{name}.arrow")
+
+
+def segment_path(name, number):
+    return os.path.join(STORE_DIR, f"{name}.{number:06d}.arrow")
+
+
+def segment_paths(name):
+    # Segments appended after the base file, oldest first.
+    try:
+        files = os.listdir(STORE_DIR)
+    except FileNotFoundError:
+        return []
+    prefix = f"{name}."
+    return [os.path.join(STORE_DIR, f) for f in sorted(files)
+            if f.startswith(prefix) and f.endswith(".arrow") and f[len(prefix):-len(".arrow")].isdigit()]
+
+
+def table_paths(name):
+    return [store_path(name)] + segment_paths(name)
+
+
+def is_fresh(name):
+    # A table whose newest file is older than its CSV, or whose base is
+    # older than the declared schema, is rebuilt.
+    path = store_path(name)
+    if not os.path.exists(path):
+        return False
+    built = max(os.path.getmtime(p) for p in table_paths(name))
+    return built >= os.path.getmtime(SOURCES[name]) and os.path.getmtime(path) >= os.path.getmtime(schema.__file__)
+
+
+def build_store(names=None):
+    os.makedirs(STORE_DIR, exist_ok=True)
+    for name in names or SOURCES:
+        df = apply_types(pd.read_csv(SOURCES[name]), name)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        fd, tmp = tempfile.mkstemp(dir=STORE_DIR, suffix=".tmp")
+        os.close(fd)
+        try:
+            feather.write_feather(table, tmp, compression="uncompressed")
+            replace_file(tmp, store_path(name))
+            for path in segment_paths(name):
+                os.remove(path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+def read_csv_table(name, columns=None):
+    usecols = None if columns is None else (lambda c: c in columns)
+    return apply_types(pd.read_csv(SOURCES[name], usecols=usecols), name)
+
+
+def read_table(name, columns=None):
+    if feather is None:
+        return read_csv_table(name, columns)
+
+    if not is_fresh(name):
+        try:
+            build_store([name])
+        except OSError:
+            return read_csv_table(name, columns)
+
+    tables = [pa.ipc.open_file(pa.memory_map(path)).read_all() for path in table_paths(name)]
+    if columns is not None:
+        columns = [c for c in columns if c in tables[0].schema.names]
+        tables = [t.select(columns) for t in tables]
+    # Segments keep their own category dictionaries; to_pandas unifies them.
+    table = pa.concat_tables(tables)
+    # Arrow has no nullable flag type of its own; booleans come back as the
+    # schema's pandas "boolean".
+    types = {pa.bool_(): pd.BooleanDtype()}.get if name in SCHEMAS else None
+    return table.to_pandas(split_blocks=True, types_mapper=types)
+
+
+# Process-wide frames shared by every dashboard session. Each entry is kept
+# with the signature (mtime, size) of the file it came from and reloaded
+# when that changes. Callers get a shallow copy: under pandas copy-on-write
+# a session can add columns or modify values without touching the shared
+# data, and nothing is copied unless it does. Frames read from the store
+# wrap the memory-mapped Arrow buffers, so most columns are zero-copy.
+_shared = {}
+_shared_lock = threading.RLock()
+
+
+def replace_file(tmp, path):
+    # os.replace for a finished temporary: mkstemp creates it 0600, so it
+    # takes the mode of the file it replaces, or 0644 for a new one.
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o644
+    os.chmod(tmp, mode)
+    os.replace(tmp, path)
+
+
+def file_signature(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def table_signature(name):
+    if feather is None:
+        return file_signature(SOURCES[name])
+    if not is_fresh(name):
+        try:
+            build_store([name])
+        except OSError:
+            return file_signature(SOURCES[name])
+    return file_signature(table_paths(name)[-1])
+
+
+def table_rows(name):
+    # Row count from the file footers, without reading the columns.
+    total = 0
+    for path in table_paths(name):
+        with pa.memory_map(path) as source:
+            total += pa.ipc.open_file(source).count_rows()
+    return total
+
+
+@contextmanager
+def file_lock(path, exclusive=False):
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def snapshot(exclusive=False):
+    return file_lock(LOCK_PATH, exclusive)
+
+
+def data_version():
+    try:
+        with open(VERSION_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"version": 0}
+
+
+def shared(key, signature, load):
+    # load() runs under the lock, so concurrent sessions that miss on the
+    # same key wait for one load instead of each doing their own. The lock
+    # is re-entrant so a load can read other shared entries.
+    with _shared_lock:
+        entry = _shared.get(key)
+        if entry is None or entry[0] != signature:
+            entry = (signature, load())
+            _shared[key] = entry
+    return entry[1]
+
+
+def invalidate(key=None):
+    with _shared_lock:
+        if key is None:
+            _shared.clear()
+        else:
+            _shared.pop(key, None)
+
+
+def shared_table(name, columns=None):
+    # Shallow copies of the one cached frame: safe to hand out only under
+    # pandas 3 copy-on-write (requirements.txt pins pandas>=3), where an
+    # in-place edit by one session copies instead of writing through.
+    frame = shared(name, table_signature(name), lambda: read_table(name))
+    if columns is None:
+        return frame.copy(deep=False)
+    return frame[[c for c in columns if c in frame.columns]]
+
+
+def shared_csv(path):
+    frame = shared(path, file_signature(path), lambda: pd.read_csv(path))
+    return frame.copy(deep=False)
+
+
+if __name__ == "__main__":
+    if feather is None:
+        sys.exit("pyarrow is required to build the data store")
+    build_store()
+    for name in SOURCES:
+        print(f"{SOURCES[name]} -> {store_path(name)} ({os.path.getsize(store_path(name)):,} bytes)")
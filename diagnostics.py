@@ -0,0 +1,268 @@
+import argparse
+import contextvars
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Timing spans for dashboard reruns. ui.py opens a run per rerun, marks
+# page sections with section() (each lasts until the next one) and wraps
+# data operations in span()/timed(); finish_run() returns the record and
+# appends it to the run log as one JSON line. ui.py calls it in a
+# finally block, so a rerun cut short by st.stop(), a rerun request or an
+# exception still disables its profiler.
+#
+#   WALMART_PROFILE=cprofile|tracemalloc|cprofile,tracemalloc
+#       also profile each rerun (top functions by cumulative time, top
+#       allocation sites and peak traced memory)
+#   WALMART_DIAGNOSTICS=1
+#       show the diagnostics sidebar panel (also: ?diagnostics=1 in the URL)
+#   WALMART_DIAG_LOG=path
+#       append each rerun to this log instead of LOG_PATH; empty or 0
+#       turns the log off. A log over LOG_MAX_BYTES is moved to path.1,
+#       replacing the previous one, so at most twice that is kept
+PROFILE_ENV = "WALMART_PROFILE"
+PANEL_ENV = "WALMART_DIAGNOSTICS"
+LOG_ENV = "WALMART_DIAG_LOG"
+LOG_PATH = os.path.join("logs", "diagnostics.jsonl")
+LOG_MAX_BYTES = 10_000_000
+TOP_N = 15
+
+_current = contextvars.ContextVar("diagnostics_run", default=None)
+_log_lock = threading.Lock()
+
+
+def profile_modes():
+    value = os.environ.get(PROFILE_ENV, "")
+    return {m.strip().lower() for m in value.split(",") if m.strip()}
+
+
+class Run:
+    def __init__(self, page, modes=()):
+        self.page = page
+        self.modes = set(modes)
+        self.spans = []
+        self.depth = 0
+        self.section = None
+        self.started = time.perf_counter()
+        self.profiler = None
+        self.notes = []
+
+        if "cprofile" in self.modes:
+            self.profiler = cProfile.Profile()
+            try:
+                self.profiler.enable()
+            except ValueError as e:
+                # Another profiler is active in this process.
+                self.profiler = None
+                self.notes.append(f"cprofile skipped: {e}")
+        if "tracemalloc" in self.modes:
+            # Process-wide: with concurrent sessions the numbers include
+            # their allocations too.
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+
+    def open(self, name, kind="span"):
+        span = {"name": name, "kind": kind, "depth": self.depth,
+                "start_ms": (time.perf_counter() - self.started) * 1000, "ms": None}
+        self.spans.append(span)
+        self.depth += 1
+        return span
+
+    def close(self, span):
+        span["ms"] = (time.perf_counter() - self.started) * 1000 - span["start_ms"]
+        self.depth -= 1
+
+    def finish(self):
+        if self.section is not None:
+            self.close(self.section)
+            self.section = None
+        record = {
+            "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "page": self.page,
+            "total_ms": (time.perf_counter() - self.started) * 1000,
+            "spans": self.spans
+        }
+        if self.profiler is not None:
+            self.profiler.disable()
+            record["profile"] = top_functions(self.profiler)
+        if "tracemalloc" in self.modes and tracemalloc.is_tracing():
+            record["memory"] = top_allocations()
+        if self.notes:
+            record["notes"] = self.notes
+        return record
+
+
+def top_functions(profiler, n=TOP_N):
+    stats = pstats.Stats(profiler, stream=io.StringIO()).sort_stats("cumulative")
+    rows = []
+    for (filename, line, func), (_, calls, _, cumtime, _) in stats.stats.items():
+        rows.append({"function": f"{os.path.basename(filename)}:{line}({func})",
+                     "calls": calls, "cumulative_ms": cumtime * 1000})
+    rows.sort(key=lambda r: r["cumulative_ms"], reverse=True)
+    return rows[:n]
+
+
+def top_allocations(n=TOP_N):
+    current, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    top = snapshot.statistics("lineno")[:n]
+    return {
+        "current_mb": current / 1e6,
+        "peak_mb": peak / 1e6,
+        "top": [{"site": f"{os.path.basename(s.traceback[0].filename)}:{s.traceback[0].lineno}",
+                 "mb": s.size / 1e6, "count": s.count} for s in top]
+    }
+
+
+def start_run(page):
+    # A run still open here never reached finish_run(); its profiler stops
+    # before the next one starts.
+    previous = _current.get()
+    if previous is not None and previous.profiler is not None:
+        previous.profiler.disable()
+    run = Run(page, profile_modes())
+    _current.set(run)
+    return run
+
+
+def finish_run(log_path=None):
+    run = _current.get()
+    if run is None:
+        return None
+    _current.set(None)
+    try:
+        record = run.finish()
+    finally:
+        if run.profiler is not None:
+            run.profiler.disable()
+    write_log(record, log_path)
+    return record
+
+
+def section(name):
+    # Ends the previous section of this run and starts the next one.
+    run = _current.get()
+    if run is None:
+        return
+    if run.section is not None:
+        run.close(run.section)
+    run.section = run.open(name, kind="section")
+
+
+@contextmanager
+def span(name):
+    run = _current.get()
+    if run is None:
+        yield
+        return
+    s = run.open(name)
+    try:
+        yield
+    finally:
+        run.close(s)
+
+
+def timed(name=None):
+    def decorate(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def default_log_path():
+    path = os.environ.get(LOG_ENV, LOG_PATH)
+    return None if path in ("", "0") else path
+
+
+def write_log(record, path=None, max_bytes=LOG_MAX_BYTES):
+    path = default_log_path() if path is None else path
+    if not path:
+        return
+    line = json.dumps(record, default=str) + "\n"
+    with _log_lock:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path) + len(line) > max_bytes:
+            os.replace(path, path + ".1")
+        with open(path, "a") as f:
+            f.write(line)
+
+
+def panel_enabled(query_params=None):
+    if os.environ.get(PANEL_ENV, "") not in ("", "0"):
+        return True
+    return query_params is not None and query_params.get("diagnostics") not in (None, "", "0")
+
+
+def read_log(path=None, page=None, limit=None):
+    # Records from the log, oldest first; for regression tracking per page.
+    path = default_log_path() if path is None else path
+    if not path or not os.path.exists(path):
+        return []
+    records = []
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if page is None or record.get("page") == page:
+                records.append(record)
+    return records[-limit:] if limit else records
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return float("nan")
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def summarize(records, recent=20):
+    # Per page: p50/p95 rerun time over the last `recent` reruns against the
+    # `recent` before them, and p50 per section over the last `recent`.
+    pages = {}
+    for record in records:
+        pages.setdefault(record["page"], []).append(record)
+    lines = []
+    for page, runs in sorted(pages.items()):
+        latest, before = runs[-recent:], runs[-2 * recent:-recent]
+        now = percentile([r["total_ms"] for r in latest], 50)
+        line = (f"{page}: {len(runs)} reruns, p50 {now:.0f} ms, "
+                f"p95 {percentile([r['total_ms'] for r in latest], 95):.0f} ms")
+        if before:
+            then = percentile([r["total_ms"] for r in before], 50)
+            line += f" (previous {len(before)}: p50 {then:.0f} ms, {(now / then - 1) * 100:+.0f}%)"
+        lines.append(line)
+        sections = {}
+        for r in latest:
+            for s in r["spans"]:
+                if s["ms"] is not None:
+                    sections.setdefault((s["depth"], s["name"]), []).append(s["ms"])
+        for (depth, name), values in sections.items():
+            lines.append(f"  {'  ' * depth}{name:<{44 - 2 * depth}}{percentile(values, 50):>9.1f} ms")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize the dashboard diagnostics log")
+    parser.add_argument("log", nargs="?", default=default_log_path() or LOG_PATH)
+    parser.add_argument("--page")
+    parser.add_argument("--recent", type=int, default=20)
+    args = parser.parse_args()
+    print(summarize(read_log(args.log, args.page), args.recent) or f"No records in {args.log}")
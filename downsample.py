@@ -0,0 +1,89 @@
+import numpy as np
+
+from data_store import shared
+
+# Reduces a time series to about as many points as its chart has pixels
+# before the figure is built, so the Plotly JSON sent to the browser stays
+# the same size however long the range is. Series at or under the target
+# are returned as they are.
+#   lttb     Largest-Triangle-Three-Buckets: keeps the points that shape the
+#            line (peaks, troughs, turns); one point per bucket
+#   minmax   the lowest and highest point of each bucket; keeps every
+#            extreme, two points per bucket
+# Results are shared per (series, range, resolution) and rebuilt when the
+# source file changes.
+CHART_WIDTH = 700  # px of one of two side-by-side charts in the wide layout
+METHODS = ("lttb", "minmax")
+
+
+def target_points(width=CHART_WIDTH):
+    # One point per pixel: more can not be told apart on screen.
+    return max(int(width), 3)
+
+
+def lttb(x, y, points):
+    # Indices of the `points` kept. First and last always stay; each bucket
+    # in between keeps the point making the largest triangle with the point
+    # kept before it and the average of the next bucket.
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if points >= n or points < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    kept = np.empty(points, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    for i in range(points - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        ax, ay = x[kept[i]], y[kept[i]]
+        cx, cy = x[stop:next_stop].mean(), y[stop:next_stop].mean()
+        area = np.abs((ax - cx) * (y[start:stop] - ay) - (ax - x[start:stop]) * (cy - ay))
+        kept[i + 1] = start + int(area.argmax())
+    return kept
+
+
+def minmax(y, points):
+    # Indices of each bucket's minimum and maximum, in order.
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if points >= n or points < 2:
+        return np.arange(n)
+    starts = np.linspace(0, n, points // 2, endpoint=False).astype(np.int64)
+    lows = starts + _bucket_arg(y, starts, np.minimum)
+    highs = starts + _bucket_arg(y, starts, np.maximum)
+    return np.unique(np.concatenate([lows, highs]))
+
+
+def _bucket_arg(y, starts, ufunc):
+    # Offset of each bucket's extreme from the bucket start (first on ties).
+    extreme = ufunc.reduceat(y, starts)
+    bucket = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(y))))
+    hit = np.flatnonzero(y == extreme[bucket])
+    first = np.unique(bucket[hit], return_index=True)[1]
+    return hit[first] - starts
+
+
+def downsample(frame, x, y, points, method="lttb"):
+    # Rows of `frame` (sorted by x) to plot for column y.
+    if len(frame) <= points:
+        return frame
+    if method == "lttb":
+        values = frame[x]
+        if values.dtype.kind == "M":
+            values = values.astype("int64")
+        rows = lttb(values, frame[y], points)
+    elif method == "minmax":
+        rows = minmax(frame[y], points)
+    else:
+        raise ValueError(f"method must be one of {list(METHODS)}")
+    return frame.iloc[rows]
+
+
+def shared_downsample(key, signature, frame, x, y, points, method="lttb"):
+    # key names the series (e.g. the source table and the view); the range
+    # and resolution are part of the cache key, so zooming or another width
+    # is its own entry.
+    span = (frame[x].iloc[0], frame[x].iloc[-1]) if len(frame) else None
+    return shared(("downsample", key, y, span, points, method), signature,
+                  lambda: downsample(frame, x, y, points, method)).copy(deep=False)
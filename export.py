@@ -0,0 +1,126 @@
+import atexit
+import gzip
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# On-demand exports of a frame (or a subset of its rows) to disk. Rows are
+# written in chunks, so the full CSV text never exists in memory, and the
+# finished file is kept by signature so repeated downloads of the same
+# slice reuse it.
+CHUNK_ROWS = 50_000
+FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "CSV (gzip)": ("csv.gz", "application/gzip"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet")
+}
+GZIP_LEVEL = 6  # level 9 is ~3x slower for a few percent smaller files
+MAX_ENTRIES = 32
+MAX_BYTES = 512 * 1024 * 1024
+
+
+def iter_chunks(frame, rows=None, chunk_rows=CHUNK_ROWS):
+    n = len(frame) if rows is None else len(rows)
+    for i in range(0, n, chunk_rows):
+        if rows is None:
+            yield frame.iloc[i:i + chunk_rows]
+        else:
+            yield frame.take(rows[i:i + chunk_rows])
+
+
+def write_export(path, frame, fmt="CSV", rows=None, chunk_rows=CHUNK_ROWS):
+    if fmt == "Parquet":
+        writer = None
+        for chunk in iter_chunks(frame, rows, chunk_rows):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                schema = table.schema
+                writer = pq.ParquetWriter(path, schema)
+            writer.write_table(table.cast(schema))
+        if writer is None:
+            pq.write_table(pa.Table.from_pandas(frame.iloc[:0], preserve_index=False), path)
+        else:
+            writer.close()
+        return
+
+    if fmt == "CSV (gzip)":
+        f = gzip.open(path, "wt", compresslevel=GZIP_LEVEL, newline="", encoding="utf-8")
+    else:
+        f = open(path, "w", newline="", encoding="utf-8")
+    with f:
+        header = True
+        for chunk in iter_chunks(frame, rows, chunk_rows):
+            chunk.to_csv(f, index=False, header=header)
+            header = False
+        if header:
+            frame.iloc[:0].to_csv(f, index=False)
+
+
+def iter_file(path, block_size=1 << 20):
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                return
+            yield block
+
+
+class ExportCache:
+    # Finished export files, keyed by (signature, format), evicted least
+    # recently used once either limit is passed.
+    def __init__(self, directory=None, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        if directory is None:
+            directory = tempfile.mkdtemp(prefix="walmart_exports_")
+            atexit.register(shutil.rmtree, directory, True)
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._files = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, signature, frame, fmt="CSV", rows=None):
+        key = (signature, fmt)
+        with self._lock:
+            if key in self._files:
+                self._files.move_to_end(key)
+                return self._files[key]
+
+        ext = FORMATS[fmt][0]
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix="." + ext + ".tmp")
+        os.close(fd)
+        try:
+            write_export(tmp, frame, fmt, None if rows is None else np.asarray(rows))
+            path = tmp[:-len(".tmp")]
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+        with self._lock:
+            if key in self._files:
+                # Another session finished the same export first.
+                os.remove(path)
+                return self._files[key]
+            self._files[key] = path
+            self._evict()
+        return path
+
+    def _evict(self):
+        total = sum(os.path.getsize(p) for p in self._files.values())
+        while len(self._files) > 1 and (len(self._files) > self.max_entries or total > self.max_bytes):
+            _, path = self._files.popitem(last=False)
+            total -= os.path.getsize(path)
+            os.remove(path)
+
+    def opener(self, signature, frame, fmt="CSV", rows=None):
+        # For st.download_button(data=...): nothing runs until the click.
+        def read():
+            with open(self.get(signature, frame, fmt, rows), "rb") as f:
+                return f.read()
+        return read
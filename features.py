@@ -0,0 +1,182 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Calendar and *_encoded columns of cleaned_data.csv, built in parallel over
+# calendar months. Input must be sorted by transaction_date (pipeline.py
+# writes it that way), so every month is a contiguous row range that a worker
+# can read on its own: a zero-copy slice of an Arrow file, or a seek to the
+# month's byte offset in a CSV. Workers write part files that are joined in
+# month order, so nothing but row ranges crosses process boundaries.
+INPUT_PATH = "cleaned_data.csv"
+ENCODERS_PATH = "encoders.pkl"
+
+ENCODED = {
+    "product": "product_name",
+    "category": "category",
+    "store": "store_location",
+    "loyalty": "loyalty_level"
+}
+FEATURE_COLS = (
+    ["week", "day", "day_of_week", "day_of_year", "quarter", "days_since_start"]
+    + [f"{key}_encoded" for key in ENCODED]
+)
+
+
+def lookup_tables(encoders):
+    # LabelEncoder.classes_ is sorted and a label's code is its position, so
+    # a hash index over the classes gives the same codes without transform().
+    return {key: pd.Index(encoders[key].classes_) for key in ENCODED if key in encoders}
+
+
+def encode(values, classes):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        lookup = classes.get_indexer(values.cat.categories)
+        raw = values.cat.codes.to_numpy()
+        codes = np.where(raw >= 0, lookup[raw], -1)
+    else:
+        codes = classes.get_indexer(values)
+    if (codes < 0).any():
+        unseen = pd.unique(values[codes < 0])
+        raise ValueError(f"y contains previously unseen labels: {list(unseen)}")
+    return codes.astype(np.int64)
+
+
+def add_features(df, tables, start):
+    # start: first transaction timestamp of the whole dataset, so partitions
+    # agree on days_since_start.
+    d = df["transaction_date"].dt
+    df["week"] = d.isocalendar().week.astype(np.int64).to_numpy()
+    df["day"] = d.day
+    df["day_of_week"] = d.dayofweek
+    df["day_of_year"] = d.dayofyear
+    df["quarter"] = d.quarter
+    df["days_since_start"] = (df["transaction_date"] - start) // pd.Timedelta(days=1)
+    for key, col in ENCODED.items():
+        if key in tables and col in df.columns:
+            df[f"{key}_encoded"] = encode(df[col], tables[key])
+    return df
+
+
+def month_ranges(dates):
+    dates = pd.DatetimeIndex(dates)
+    key = dates.year * 12 + dates.month
+    if (np.diff(key) < 0).any():
+        raise ValueError("input must be sorted by transaction_date")
+    bounds = np.r_[0, np.flatnonzero(np.diff(key)) + 1, len(key)]
+    return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+
+def csv_line_offsets(path, rows):
+    # Byte offset where each 0-based data row starts. Data row r follows the
+    # r-th newline (0-based, the header ends with newline 0), found by
+    # scanning the file in large blocks with numpy.
+    rows = np.asarray(rows, dtype=np.int64)
+    offsets = np.full(len(rows), -1, dtype=np.int64)
+    seen = pos = 0
+    with open(path, "rb") as f:
+        while (offsets < 0).any():
+            block = f.read(1 << 24)
+            if not block:
+                break
+            newlines = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == 10)
+            hit = (rows >= seen) & (rows < seen + len(newlines))
+            offsets[hit] = pos + newlines[rows[hit] - seen] + 1
+            seen += len(newlines)
+            pos += len(block)
+    return offsets.tolist()
+
+
+def _read_rows(path, fmt, start, stop, offset=None, columns=None):
+    if fmt == "arrow":
+        with pa.memory_map(path) as source:
+            table = pa.ipc.open_file(source).read_all().slice(start, stop - start)
+        return table.to_pandas()
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return pd.read_csv(f, header=None, names=columns, nrows=stop - start,
+                           parse_dates=["transaction_date"])
+
+
+def _build_part(task):
+    path, fmt, start, stop, offset, columns, tables, first_date, part_path = task
+    part = add_features(_read_rows(path, fmt, start, stop, offset, columns), tables, first_date)
+    if fmt == "arrow":
+        table = pa.Table.from_pandas(part, preserve_index=False)
+        with pa.ipc.new_file(part_path, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        part.to_csv(part_path, header=False, index=False, lineterminator="\n")
+    return len(part)
+
+
+def run(input_path=INPUT_PATH, output_path=None, workers=None, encoders_path=ENCODERS_PATH, log=print):
+    output_path = output_path or input_path
+    fmt = "arrow" if input_path.endswith((".arrow", ".feather")) else "csv"
+    tables = lookup_tables(joblib.load(encoders_path))
+
+    if fmt == "arrow":
+        with pa.memory_map(input_path) as source:
+            reader = pa.ipc.open_file(source)
+            columns = reader.schema.names
+            dates = reader.read_all().column("transaction_date").to_pandas()
+    else:
+        columns = pd.read_csv(input_path, nrows=0).columns.tolist()
+        dates = pd.to_datetime(pd.read_csv(input_path, usecols=["transaction_date"])["transaction_date"])
+    ranges = month_ranges(dates)
+    first_date = dates.iloc[0]
+    offsets = csv_line_offsets(input_path, [s for s, _ in ranges]) if fmt == "csv" else [None] * len(ranges)
+
+    part_dir = tempfile.mkdtemp(prefix="walmart_features_")
+    try:
+        tasks = [
+            (input_path, fmt, s, e, off, columns, tables, first_date, os.path.join(part_dir, f"part_{i:05d}"))
+            for i, ((s, e), off) in enumerate(zip(ranges, offsets))
+        ]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rows = sum(pool.map(_build_part, tasks))
+
+        tmp_path = output_path + ".tmp"
+        if fmt == "arrow":
+            writer = None
+            for task in tasks:
+                with pa.memory_map(task[-1]) as source:
+                    table = pa.ipc.open_file(source).read_all()
+                    if writer is None:
+                        schema = table.schema
+                        writer = pa.ipc.new_file(tmp_path, schema)
+                    writer.write_table(table.cast(schema))
+            writer.close()
+        else:
+            header = columns + [c for c in FEATURE_COLS if c not in columns]
+            with open(tmp_path, "w", newline="") as out:
+                out.write(",".join(header) + "\n")
+                for task in tasks:
+                    with open(task[-1]) as part:
+                        shutil.copyfileobj(part, out)
+        os.replace(tmp_path, output_path)
+        log(f"{input_path}: {rows:,} rows in {len(ranges)} monthly partitions -> {output_path}")
+    finally:
+        shutil.rmtree(part_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add calendar and label-encoded feature columns")
+    parser.add_argument("input", nargs="?", default=INPUT_PATH,
+                        help="date-sorted CSV or Arrow file from pipeline.py")
+    parser.add_argument("-o", "--output", help="defaults to rewriting the input")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--encoders", default=ENCODERS_PATH)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        sys.exit(f"Missing file: {args.input}")
+    run(args.input, args.output, args.workers, args.encoders)
@@ -0,0 +1,135 @@
+import calendar
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Ratio-based 2025 forecast used by the Quick Prediction page, computed for a
+# whole product x store x multiplier x day grid in one broadcast.
+FORECAST_YEAR = 2025
+WEEKEND_UPLIFT = 1.2
+TRAILING_WINDOW = 30
+
+
+def trailing_average(daily_sales, window=TRAILING_WINDOW):
+    tail = daily_sales.tail(window)
+    return tail["quantity_sold"].mean(), tail["cost_of_goods"].mean()
+
+
+def horizon_dates(months, year=FORECAST_YEAR):
+    end_date = datetime(year, months, calendar.monthrange(year, months)[1])
+    return pd.date_range(start=datetime(year, 1, 1), end=end_date, freq="D")
+
+
+def _ratio_lookup(ratios, key, names, column):
+    # Missing names get a NaN ratio so they can be dropped (products) or left
+    # unscaled (stores), matching the single-forecast behaviour.
+    table = ratios.drop_duplicates(key).set_index(key)[column]
+    return table.reindex(names).to_numpy(dtype=float)
+
+
+def forecast_arrays(product_ratios, store_ratios, daily_sales, products=None, stores=None,
+                    months=9, multipliers=(1.0,), baseline=None):
+    # baseline: optional per-day aggregate forecast starting Jan 1 (e.g. from
+    # model_serving.predict_horizon) used in place of the trailing average.
+    if products is None:
+        products = product_ratios["product_name"].tolist()
+    if stores is None:
+        stores = [] if store_ratios is None else store_ratios["store_location"].tolist()
+    products = list(products)
+    stores = list(stores) or [None]
+    multipliers = np.asarray(multipliers, dtype=float)
+
+    dates = horizon_dates(months)
+    if baseline is None:
+        base_qty, base_cog = trailing_average(daily_sales)
+    else:
+        base_qty = baseline["predicted_quantity"].to_numpy()[:len(dates)]
+        base_cog = baseline["predicted_cog"].to_numpy()[:len(dates)]
+
+    qty_ratio = _ratio_lookup(product_ratios, "product_name", products, "qty_ratio")
+    cog_ratio = _ratio_lookup(product_ratios, "product_name", products, "cog_ratio")
+    if store_ratios is None:
+        store_ratio = np.full(len(stores), np.nan)
+    else:
+        store_ratio = _ratio_lookup(store_ratios, "store_location", stores, "cog_ratio")
+    store_ratio = np.where(np.isnan(store_ratio), 1.0, store_ratio)
+    weekend = np.where(dates.dayofweek.isin([5, 6]), WEEKEND_UPLIFT, 1.0)
+
+    # Same multiplication order as the per-click forecast so results match
+    # bit for bit: (baseline * product ratio * multiplier) * store ratio * weekend.
+    shape = (len(products), len(stores), len(multipliers), len(dates))
+    qty = base_qty * qty_ratio[:, None, None, None] * multipliers[None, None, :, None]
+    rev = base_cog * cog_ratio[:, None, None, None] * multipliers[None, None, :, None]
+    qty = np.broadcast_to(qty * store_ratio[None, :, None, None], shape) * weekend
+    rev = np.broadcast_to(rev * store_ratio[None, :, None, None], shape) * weekend
+
+    return {
+        "products": products,
+        "stores": stores,
+        "multipliers": multipliers,
+        "dates": dates,
+        "valid": ~np.isnan(qty_ratio),
+        "predicted_quantity": qty,
+        "predicted_revenue": rev
+    }
+
+
+def forecast_grid(product_ratios, store_ratios, daily_sales, products=None, stores=None,
+                  months=9, multipliers=(1.0,), baseline=None):
+    grid = forecast_arrays(product_ratios, store_ratios, daily_sales, products, stores,
+                           months, multipliers, baseline)
+    n_prod, n_store, n_mult, n_days = grid["predicted_quantity"].shape
+    n_rows = n_prod * n_store * n_mult * n_days
+    dates = grid["dates"]
+
+    frame = pd.DataFrame({
+        "product_name": pd.Categorical(grid["products"]).repeat(n_store * n_mult * n_days),
+        "store_location": np.tile(np.repeat(np.asarray(grid["stores"], dtype=object), n_mult * n_days), n_prod),
+        "multiplier": np.tile(np.repeat(grid["multipliers"], n_days), n_prod * n_store),
+        "date": np.tile(dates.to_numpy(), n_prod * n_store * n_mult),
+        "month": np.tile(dates.month.to_numpy(), n_prod * n_store * n_mult),
+        "predicted_quantity": grid["predicted_quantity"].reshape(n_rows),
+        "predicted_revenue": grid["predicted_revenue"].reshape(n_rows)
+    })
+    return frame[np.repeat(grid["valid"], n_store * n_mult * n_days)].reset_index(drop=True)
+
+
+def horizon_totals(product_ratios, store_ratios, daily_sales, products=None, stores=None,
+                   months=9, multipliers=(1.0,), baseline=None):
+    # Totals for every 1..months horizon: per-month sums, then a running sum
+    # over months, since a horizon of h months is the first h months of 2025.
+    grid = forecast_arrays(product_ratios, store_ratios, daily_sales, products, stores,
+                           months, multipliers, baseline)
+    month_starts = np.flatnonzero(np.r_[True, np.diff(grid["dates"].month) != 0])
+    qty = np.add.reduceat(grid["predicted_quantity"], month_starts, axis=-1).cumsum(axis=-1)
+    rev = np.add.reduceat(grid["predicted_revenue"], month_starts, axis=-1).cumsum(axis=-1)
+
+    n_prod, n_store, n_mult, n_months = qty.shape
+    n_rows = n_prod * n_store * n_mult * n_months
+    frame = pd.DataFrame({
+        "product_name": pd.Categorical(grid["products"]).repeat(n_store * n_mult * n_months),
+        "store_location": np.tile(np.repeat(np.asarray(grid["stores"], dtype=object), n_mult * n_months), n_prod),
+        "multiplier": np.tile(np.repeat(grid["multipliers"], n_months), n_prod * n_store),
+        "horizon_months": np.tile(np.arange(1, n_months + 1), n_prod * n_store * n_mult),
+        "total_quantity": qty.reshape(n_rows),
+        "total_revenue": rev.reshape(n_rows)
+    })
+    return frame[np.repeat(grid["valid"], n_store * n_mult * n_months)].reset_index(drop=True)
+
+
+def forecast_product(product_ratios, store_ratios, daily_sales, product, store=None,
+                     months=3, multiplier=1.0, baseline=None):
+    grid = forecast_arrays(product_ratios, store_ratios, daily_sales, [product], [store],
+                           months, [multiplier], baseline)
+    if not grid["valid"][0]:
+        return None
+
+    pred_df = pd.DataFrame({
+        "date": grid["dates"],
+        "predicted_quantity": grid["predicted_quantity"][0, 0, 0],
+        "predicted_revenue": grid["predicted_revenue"][0, 0, 0]
+    })
+    pred_df["day_of_week"] = pred_df["date"].dt.dayofweek
+    pred_df["is_weekend"] = pred_df["day_of_week"].isin([5, 6])
+    return pred_df
@@ -0,0 +1,192 @@
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from data_store import STORE_DIR, file_signature, read_table, replace_file
+from forecast import forecast_arrays, horizon_dates
+from model_serving import QTY_MODEL_PATH, load_models, predict_horizon
+
+# The Quick Prediction forecast materialized for all of 2025: daily units and
+# revenue per method x product x store (plus "no store") at multiplier 1.0,
+# in one uncompressed .npz next to the Arrow tables. A click then only
+# slices a row and scales it by the scenario multiplier (the forecast is
+# linear in it), and the monthly breakdown sums between precomputed month
+# offsets. The file is rebuilt when any input is newer than it.
+CUBE_PATH = os.path.join(STORE_DIR, "forecast_cube.npz")
+INPUTS = ["daily_sales.csv", "cleaned_data.csv", "product_ratios.csv", "store_ratios.csv", QTY_MODEL_PATH]
+METHODS = ["model", "trailing"]
+MONTHS = 12
+
+
+def signature():
+    # Input files as (mtime, size); missing optional inputs count as None.
+    out = []
+    for path in INPUTS:
+        try:
+            out.append(file_signature(path))
+        except FileNotFoundError:
+            out.append(None)
+    return tuple(out)
+
+
+def is_fresh(path=CUBE_PATH):
+    if not os.path.exists(path):
+        return False
+    built = os.path.getmtime(path)
+    return all(not os.path.exists(p) or os.path.getmtime(p) <= built for p in INPUTS)
+
+
+def build(path=CUBE_PATH, months=MONTHS):
+    daily_sales = read_table("daily_sales")
+    product_ratios = pd.read_csv("product_ratios.csv")
+    try:
+        store_ratios = pd.read_csv("store_ratios.csv")
+        stores = [None] + store_ratios["store_location"].tolist()
+    except FileNotFoundError:
+        store_ratios, stores = None, [None]
+    products = product_ratios["product_name"].tolist()
+    dates = horizon_dates(months)
+
+    # If the model cannot be loaded its slice is NaN and the page falls back
+    # to the trailing average, as it does when predicting per click.
+    shape = (len(METHODS), len(products), len(stores), len(dates))
+    qty, rev = np.full(shape, np.nan), np.full(shape, np.nan)
+    model_error = ""
+    for m, method in enumerate(METHODS):
+        baseline = None
+        if method == "model":
+            try:
+                baseline = predict_horizon(load_models(), daily_sales, dates)
+            except Exception as e:
+                model_error = str(e)
+                continue
+        grid = forecast_arrays(product_ratios, store_ratios, daily_sales, products, stores,
+                               months, [1.0], baseline)
+        qty[m] = grid["predicted_quantity"][:, :, 0, :]
+        rev[m] = grid["predicted_revenue"][:, :, 0, :]
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".npz")
+    os.close(fd)
+    try:
+        np.savez(
+            tmp,
+            predicted_quantity=qty,
+            predicted_revenue=rev,
+            methods=np.array(METHODS),
+            products=np.array(products),
+            stores=np.array(["" if s is None else s for s in stores]),
+            start=np.array(dates[0].strftime("%Y-%m-%d")),
+            month_offsets=np.flatnonzero(np.r_[True, np.diff(dates.month) != 0]),
+            model_error=np.array(model_error)
+        )
+        replace_file(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path
+
+
+class ForecastCube:
+    def __init__(self, arrays):
+        self.qty = arrays["predicted_quantity"]
+        self.rev = arrays["predicted_revenue"]
+        self.methods = {m: i for i, m in enumerate(arrays["methods"].tolist())}
+        self.products = {p: i for i, p in enumerate(arrays["products"].tolist())}
+        self.stores = {s or None: i for i, s in enumerate(arrays["stores"].tolist())}
+        self.month_offsets = arrays["month_offsets"]
+        self.model_error = str(arrays["model_error"]) or None
+
+        # Per-day columns of the page's table, built once.
+        dates = pd.date_range(str(arrays["start"]), periods=self.qty.shape[-1], freq="D")
+        self.days = pd.DataFrame({
+            "date": dates,
+            "day_of_week": dates.dayofweek,
+            "is_weekend": dates.dayofweek.isin([5, 6]),
+            "month": dates.month,
+            "month_name": dates.strftime("%B %Y")
+        })
+
+    def _row(self, method, product, store):
+        # (qty, revenue) views; unknown stores are unscaled, like no store.
+        if product not in self.products:
+            return None
+        m = self.methods[method]
+        if method == "model" and self.model_error:
+            m = self.methods["trailing"]
+        index = (m, self.products[product], self.stores.get(store, self.stores[None]))
+        return self.qty[index], self.rev[index]
+
+    def _days(self, months):
+        return self.month_offsets[months] if months < len(self.month_offsets) else self.qty.shape[-1]
+
+    def rows(self, method, keys, months=3):
+        # Daily (units, revenue) for many (product, store) pairs at once, one
+        # row each.
+        if method == "model" and self.model_error:
+            method = "trailing"
+        index = (self.methods[method], [self.products[p] for p, _ in keys],
+                 [self.stores.get(s, self.stores[None]) for _, s in keys])
+        days = self._days(months)
+        return self.qty[index][:, :days], self.rev[index][:, :days]
+
+    def units(self, method, keys, months=3):
+        return self.rows(method, keys, months)[0]
+
+    def forecast(self, method, product, store=None, months=3, multiplier=1.0):
+        # Same columns as forecast.forecast_product plus month and month_name.
+        # multiplier is a number or one value per day of the cube (e.g.
+        # uplift.UpliftTable.scale).
+        row = self._row(method, product, store)
+        if row is None:
+            return None
+        days = self._days(months)
+        if np.ndim(multiplier):
+            multiplier = multiplier[:days]
+        frame = self.days.iloc[:days].copy()
+        frame.insert(1, "predicted_quantity", row[0][:days] * multiplier)
+        frame.insert(2, "predicted_revenue", row[1][:days] * multiplier)
+        return frame
+
+    def monthly(self, method, product, store=None, months=3, multiplier=1.0):
+        row = self._row(method, product, store)
+        if row is None:
+            return None
+        days = self._days(months)
+        offsets = self.month_offsets[:months]
+        qty, rev = row[0][:days], row[1][:days]
+        if np.ndim(multiplier):
+            # Per-day multipliers scale the days before they are summed.
+            qty, rev, multiplier = qty * multiplier[:days], rev * multiplier[:days], 1.0
+        return pd.DataFrame({
+            "month_name": self.days["month_name"].to_numpy()[offsets],
+            "predicted_quantity": np.add.reduceat(qty, offsets) * multiplier,
+            "predicted_revenue": np.add.reduceat(rev, offsets) * multiplier
+        })
+
+
+def load(path=CUBE_PATH):
+    if not is_fresh(path):
+        build(path)
+    with np.load(path) as arrays:
+        return ForecastCube({k: arrays[k] for k in arrays.files})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Materialize the 2025 Quick Prediction forecast cube")
+    parser.add_argument("-o", "--output", default=CUBE_PATH)
+    parser.add_argument("--months", type=int, default=MONTHS)
+    args = parser.parse_args()
+
+    try:
+        path = build(args.output, args.months)
+    except FileNotFoundError as e:
+        sys.exit(f"Missing file: {e.filename}")
+    cube = load(path)
+    print(f"{path}: {cube.qty.shape[0]} methods x {cube.qty.shape[1]} products x {cube.qty.shape[2]} stores "
+          f"x {cube.qty.shape[3]} days, {os.path.getsize(path) / 1e3:.0f} kB"
+          + (f" (model unavailable: {cube.model_error})" if cube.model_error else ""))
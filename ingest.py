@@ -0,0 +1,356 @@
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import features
+import forecast_cube
+import intervals
+import monitor
+import sketches
+from daily_agg import DAILY_SALES_PATH, append_transactions
+from data_store import (BOOL_COLS, DATE_COLS, SOURCES, STORE_DIR, VERSION_PATH, apply_types, data_version, file_lock,
+                        replace_file, segment_path, segment_paths, snapshot, store_path, table_paths, table_rows,
+                        table_signature)
+from model_serving import (FEATURES, MA_COLUMNS, MA_WINDOWS, TAIL_PATH, load_models, load_tail, timestamp_tail,
+                           transaction_moving_averages)
+from schema import FLOAT_TYPES, INT_TYPES
+from uplift import UPLIFT_PATH, add_level_sums, estimate, level_sums, weekend_days
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+    feather = None
+
+# Appends a batch of new transactions (cleaned_data.csv schema) and updates
+# every derived artifact from running totals instead of rescanning history:
+#   product_ratios / store_ratios / product_ranking / loyalty_analysis
+#       already hold per-key quantity, cost and count sums; the batch's sums
+#       are added to them and the ratios, ranks and shares recomputed
+#   uplift_factors    the same with per-level sums (uplift.py)
+#   forecast_monitor  the same with per product x store x week error sums
+#                     (monitor.py)
+#   daily_sales       daily_agg.append_transactions (touched days onward)
+#   moving averages   the last timestamps' quantity sums (model_serving
+#                     TAIL_PATH) extended by the batch's
+#   forecast_2025     model features from those moving averages
+#   store/*.arrow     cleaned_data: the batch as one more segment file; every
+#                     MAX_SEGMENTS batches the segments are merged into the
+#                     base file
+#   residuals         intervals.append: the batch's days only
+#   forecast cube     rebuilt from the updated inputs; its size is products x
+#                     stores x horizon days, whatever the history
+#   customer sketches the batch's sketches merged in (sketches.py)
+# A batch is typed with schema.py, must name only catalogue products and
+# must not start before the last stored transaction, so cleaned_data.csv
+# stays sorted; its date parts and *_encoded columns are derived again as
+# pipeline.py and features.py derive them.
+# New files are written next to their targets first and swapped in under the
+# data_store snapshot lock, then store/version.json is bumped; readers that
+# load under snapshot() see the old version or the new one, never a mix.
+TRANSACTIONS_PATH = SOURCES["cleaned_data"]
+INGEST_LOCK_PATH = os.path.join(STORE_DIR, ".ingest.lock")
+PRODUCT_RATIOS_PATH = "product_ratios.csv"
+STORE_RATIOS_PATH = "store_ratios.csv"
+PRODUCT_RANKING_PATH = "product_ranking.csv"
+LOYALTY_PATH = "loyalty_analysis.csv"
+FORECAST_PATH = SOURCES["forecast_2025"]
+CSV_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+INT_FLAGS = ["is_weekend"]  # 0/1 in the CSV (pipeline.py), the other flags True/False
+MAX_SEGMENTS = 32
+
+
+def last_timestamp(path=TRANSACTIONS_PATH):
+    # transaction_date of the CSV's last row, read from the end of the file.
+    columns = pd.read_csv(path, nrows=0).columns
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(f.tell() - 65536, 0))
+        line = f.read().rstrip(b"\n").rsplit(b"\n", 1)[-1]
+    row = pd.read_csv(io.BytesIO(line), header=None, names=columns)
+    return pd.Timestamp(row["transaction_date"].iloc[0])
+
+
+def typed_batch(batch, columns, products, tables, start, after):
+    # The batch in cleaned_data.csv's columns and schema.py types, sorted by
+    # date. Rejects unknown products (products: the catalogue), values that
+    # do not fit their type and dates before `after`.
+    missing = [c for c in columns if c not in batch.columns]
+    extra = [c for c in batch.columns if c not in columns]
+    if missing or extra:
+        raise ValueError(f"batch does not match the {TRANSACTIONS_PATH} schema: "
+                         f"missing {missing}, unexpected {extra}")
+    typed = batch[list(columns)].copy()
+    for col in DATE_COLS:
+        dates = pd.to_datetime(typed[col], errors="coerce")
+        if dates.isna().any():
+            raise ValueError(f"{col}: {int(dates.isna().sum())} unparseable dates")
+        typed[col] = dates
+    for col in list(INT_TYPES) + list(FLOAT_TYPES):
+        if col in typed.columns:
+            try:
+                typed[col] = pd.to_numeric(typed[col])
+            except (TypeError, ValueError):
+                raise ValueError(f"{col}: values that are not numbers")
+    typed = apply_types(typed, "cleaned_data")
+    for col in BOOL_COLS:
+        if typed[col].isna().any():
+            raise ValueError(f"{col}: values other than True/False/1/0")
+    unknown = sorted(set(typed["product_name"].dropna().astype(str)) - set(products))
+    if unknown or typed["product_name"].isna().any():
+        raise ValueError(f"unknown products: {unknown or ['(missing)']}")
+    if typed["transaction_date"].min() < after:
+        raise ValueError(f"batch starts at {typed['transaction_date'].min()}, before the last stored transaction "
+                         f"({after}); {TRANSACTIONS_PATH} must stay sorted by date")
+
+    # Derived columns from the date and the fitted encoders, not the batch.
+    date = typed["transaction_date"].dt
+    typed["year"] = date.year
+    typed["month"] = date.month
+    typed["dayofweek"] = date.dayofweek
+    typed["is_weekend"] = date.dayofweek >= 5
+    typed = features.add_features(typed, tables, start)
+    return apply_types(typed, "cleaned_data").sort_values("transaction_date", kind="stable")
+
+
+def csv_rows(typed):
+    # The typed batch in the CSV's own representation (date format, 0/1 or
+    # True/False flags), so appended lines parse like the existing ones.
+    rows = typed.copy()
+    for col in DATE_COLS:
+        rows[col] = rows[col].dt.strftime(CSV_DATE_FORMAT)
+    for col in BOOL_COLS:
+        rows[col] = rows[col].astype(bool).astype("int64") if col in INT_FLAGS else rows[col].astype(bool)
+    return rows
+
+
+def key_sums(typed, key):
+    return typed.groupby(key, observed=True).agg(
+        quantity_sold=("quantity_sold", "sum"),
+        cost_of_goods=("cost_of_goods", "sum"),
+        transaction_count=("quantity_sold", "size")
+    )
+
+
+def add_sums(existing, sums, columns):
+    # existing: artifact indexed by key with `columns` holding the running
+    # (quantity, cost[, count]) sums; keys new to the batch start at zero.
+    totals = existing[list(columns.values())].rename(columns={v: k for k, v in columns.items()})
+    totals = totals.add(sums[list(columns)], fill_value=0)
+    for col in columns:
+        if col != "cost_of_goods":
+            totals[col] = totals[col].astype("int64")
+    return totals
+
+
+def update_ratios(existing, sums, key):
+    columns = {"quantity_sold": "quantity_sold", "cost_of_goods": "cost_of_goods"}
+    totals = add_sums(existing.set_index(key), sums, columns)
+    totals["qty_ratio"] = totals["quantity_sold"] / totals["quantity_sold"].sum()
+    totals["cog_ratio"] = totals["cost_of_goods"] / totals["cost_of_goods"].sum()
+    return totals.sort_index().rename_axis(key).reset_index()
+
+
+def update_ranking(existing, sums):
+    columns = {"quantity_sold": "total_quantity", "cost_of_goods": "total_revenue",
+               "transaction_count": "transaction_count"}
+    totals = add_sums(existing.set_index("product_name"), sums, columns)
+    totals = totals.rename(columns=columns).sort_values("total_revenue", ascending=False, kind="stable")
+    totals["rank"] = np.arange(1, len(totals) + 1)
+    return totals.rename_axis("product_name").reset_index()
+
+
+def update_loyalty(existing, sums):
+    columns = {"quantity_sold": "total_quantity", "cost_of_goods": "total_cog",
+               "transaction_count": "transaction_count"}
+    totals = add_sums(existing.set_index("loyalty_level"), sums, columns).rename(columns=columns)
+    totals["avg_transaction_value"] = totals["total_cog"] / totals["transaction_count"]
+    totals["pct_of_total"] = totals["total_cog"] / totals["total_cog"].sum() * 100
+    return totals.sort_index().rename_axis("loyalty_level").reset_index()
+
+
+def update_forecast(existing, moving_averages, first_date):
+    # forecast_2025.csv is the quantity model over the calendar of its days
+    # with the moving averages it was trained on
+    # (model_serving.transaction_moving_averages), counting days from the
+    # first transaction. Its cost per unit comes from the notebook and is
+    # kept as it is.
+    forecast = existing.copy()
+    dates = pd.to_datetime(forecast["transaction_date"])
+    forecast["days_since_start"] = (dates - first_date).dt.days
+    for w, value in zip(MA_WINDOWS, moving_averages):
+        forecast[f"qty_ma{w}"] = value
+    price = (existing["predicted_cog"] / existing["predicted_quantity"]).iloc[0]
+    forecast["predicted_quantity"] = load_models()["qty"].predict(forecast[FEATURES])
+    forecast["predicted_cog"] = forecast["predicted_quantity"] * price
+    return forecast
+
+
+def _tmp_for(path):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    os.close(fd)
+    return tmp
+
+
+def _write_csv(frame, path):
+    tmp = _tmp_for(path)
+    frame.to_csv(tmp, index=False, lineterminator="\n")
+    return tmp
+
+
+def _write_arrow(frame_or_table, path):
+    tmp = _tmp_for(path)
+    table = frame_or_table
+    if not isinstance(table, pa.Table):
+        table = pa.Table.from_pandas(apply_types(frame_or_table.copy()), preserve_index=False)
+    feather.write_feather(table, tmp, compression="uncompressed")
+    return tmp
+
+
+def batch_table(typed):
+    # The batch in the stored table's schema, for a segment of its own.
+    table_signature("cleaned_data")  # builds the store if the CSV is newer
+    with pa.memory_map(store_path("cleaned_data")) as source:
+        schema = pa.ipc.open_file(source).schema
+    return pa.Table.from_pandas(typed, preserve_index=False).select(schema.names).cast(schema)
+
+
+def compacted_table(new):
+    # The base file and every segment (memory-mapped, not parsed) plus the
+    # batch, as one base file. The IPC file format wants one dictionary per
+    # column, so the category dictionaries are unified; only the index
+    # arrays are rewritten.
+    tables = []
+    for path in table_paths("cleaned_data"):
+        with pa.memory_map(path) as source:
+            tables.append(pa.ipc.open_file(source).read_all())
+    return pa.concat_tables(tables + [new]).unify_dictionaries().combine_chunks()
+
+
+def ingest(batch, log=print):
+    with file_lock(INGEST_LOCK_PATH, exclusive=True):
+        if batch.empty:
+            raise ValueError("empty batch")
+        columns = pd.read_csv(TRANSACTIONS_PATH, nrows=0).columns
+        first_date = pd.read_csv(TRANSACTIONS_PATH, nrows=1, parse_dates=["transaction_date"])["transaction_date"][0]
+        product_ratios = pd.read_csv(PRODUCT_RATIOS_PATH)
+        tables = features.lookup_tables(joblib.load(features.ENCODERS_PATH))
+        typed = typed_batch(batch, columns, product_ratios["product_name"], tables, first_date, last_timestamp())
+        rows = csv_rows(typed)
+
+        # Everything is prepared as temporary files before anything changes.
+        daily = pd.read_csv(DAILY_SALES_PATH, parse_dates=["transaction_date"])
+        daily, _ = append_transactions(daily, typed)
+        tail = load_tail()
+        new_tail = timestamp_tail(pd.concat([tail, typed[MA_COLUMNS]], ignore_index=True))
+        moving_averages = transaction_moving_averages(new_tail)
+
+        artifacts = {
+            PRODUCT_RATIOS_PATH: update_ratios(product_ratios, key_sums(typed, "product_name"), "product_name"),
+            PRODUCT_RANKING_PATH: update_ranking(pd.read_csv(PRODUCT_RANKING_PATH), key_sums(typed, "product_name")),
+            DAILY_SALES_PATH: daily
+        }
+        try:
+            artifacts[FORECAST_PATH] = update_forecast(pd.read_csv(FORECAST_PATH), moving_averages, first_date)
+        except Exception as e:
+            log(f"{FORECAST_PATH} not updated: {e}")
+        if os.path.exists(STORE_RATIOS_PATH):
+            artifacts[STORE_RATIOS_PATH] = update_ratios(
+                pd.read_csv(STORE_RATIOS_PATH), key_sums(typed, "store_location"), "store_location")
+        if os.path.exists(LOYALTY_PATH):
+            artifacts[LOYALTY_PATH] = update_loyalty(pd.read_csv(LOYALTY_PATH), key_sums(typed, "loyalty_level"))
+        if os.path.exists(UPLIFT_PATH):
+            sums = add_level_sums(pd.read_csv(UPLIFT_PATH, keep_default_na=False), level_sums(typed))
+            artifacts[UPLIFT_PATH] = estimate(sums, weekend_days(daily["transaction_date"]))
+        if os.path.exists(monitor.MONITOR_PATH):
+            artifacts[monitor.MONITOR_PATH] = monitor.add_sums(monitor.load(), monitor.row_sums(typed))
+
+        replacements = {path: _write_csv(frame, path) for path, frame in artifacts.items()}
+        os.makedirs(STORE_DIR, exist_ok=True)
+        replacements[TAIL_PATH] = _write_csv(new_tail, TAIL_PATH)
+        if intervals.is_fresh():
+            try:
+                arrays = intervals.append(intervals.load_arrays(), typed, tail, daily)
+                replacements[intervals.RESIDUALS_PATH] = _tmp_for(intervals.RESIDUALS_PATH)
+                intervals.write(arrays, replacements[intervals.RESIDUALS_PATH])
+            except Exception as e:
+                log(f"{intervals.RESIDUALS_PATH} not updated: {e}")
+        total, merged = None, []
+        if feather is not None:
+            new = batch_table(typed)
+            total = table_rows("cleaned_data") + new.num_rows
+            merged = segment_paths("cleaned_data")
+            if len(merged) < MAX_SEGMENTS:
+                path = segment_path("cleaned_data", len(merged) + 1)
+                replacements[path], merged = _write_arrow(new, path), []
+            else:
+                table = compacted_table(new)
+                replacements[store_path("cleaned_data")] = _write_arrow(table, store_path("cleaned_data"))
+                del table
+            for name in ("daily_sales", "forecast_2025"):
+                if SOURCES[name] in artifacts:
+                    replacements[store_path(name)] = _write_arrow(artifacts[SOURCES[name]], store_path(name))
+        batch_sketches = sketches.CustomerSketches.from_transactions(typed)
+        replacements[sketches.SKETCH_PATH] = sketches.load().merge(batch_sketches).save(_tmp_for(sketches.SKETCH_PATH))
+        version = data_version().get("version", 0) + 1
+        replacements[VERSION_PATH] = _tmp_for(VERSION_PATH)
+
+        try:
+            with snapshot(exclusive=True):
+                # The CSV append is the only in-place write; it is undone if
+                # it fails part way, before anything else has changed.
+                size = os.path.getsize(TRANSACTIONS_PATH)
+                try:
+                    rows.to_csv(TRANSACTIONS_PATH, mode="a", header=False, index=False, lineterminator="\n")
+                except BaseException:
+                    os.truncate(TRANSACTIONS_PATH, size)
+                    raise
+                with open(replacements[VERSION_PATH], "w") as f:
+                    json.dump({
+                        "version": version,
+                        "ingested_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                        "rows_added": len(rows),
+                        "total_rows": total
+                    }, f)
+                # Arrow copies and sketches last: they must not be older than
+                # their CSVs, or they would be rebuilt from the CSV. A
+                # replaced file keeps its temporary's mtime, from before the
+                # append, so they are touched too.
+                for path in sorted(replacements, key=lambda p: p.startswith(STORE_DIR)):
+                    replace_file(replacements.pop(path), path)
+                    if path.startswith(STORE_DIR):
+                        os.utime(path)
+                # Segments merged into the new base file.
+                for path in merged:
+                    os.remove(path)
+                forecast_cube.build()
+        finally:
+            for tmp in replacements.values():
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+
+    log(f"{len(rows):,} transactions ingested ({rows['transaction_date'].iloc[0]} to "
+        f"{rows['transaction_date'].iloc[-1]}), data version {version}")
+    return version
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Append new transactions and update the derived artifacts")
+    parser.add_argument("batch", help=f"CSV of new transactions in the {TRANSACTIONS_PATH} schema")
+    args = parser.parse_args()
+
+    try:
+        ingest(pd.read_csv(args.batch))
+    except FileNotFoundError as e:
+        sys.exit(f"Missing file: {e.filename}")
+    except ValueError as e:
+        sys.exit(str(e))
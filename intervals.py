@@ -0,0 +1,345 @@
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from data_store import SOURCES, STORE_DIR, file_signature, read_table, replace_file
+from forecast import TRAILING_WINDOW, WEEKEND_UPLIFT, _ratio_lookup
+from model_serving import MA_COLUMNS, MA_WINDOWS, QTY_MODEL_PATH, build_features, load_models, moving_averages_before
+from train_series import SERIES_COLUMNS, daily_series
+
+# Prediction intervals for the 2025 forecast by residual bootstrap of the
+# served forecast. For every history day the served path is replayed as it
+# would have forecast that day, for both baselines: best_qty_model.pkl's
+# daily total from the moving averages of the transactions before it, or
+# the trailing average of the TRAILING_WINDOW days before it, times the
+# product and store ratios and the weekend uplift (forecast.forecast_arrays),
+# for every product x store and product over all stores. Its residuals are
+# actual - predicted, and a sample path is the point forecast plus the
+# residuals of randomly drawn history days, floored at zero. They are in
+# units (dollars for revenue), so a multiplier or condition factor moves
+# the band with the point forecast without widening it.
+# Weekend days are drawn from weekend history days and weekdays from
+# weekdays, so each day's band comes from the errors of the same weekend
+# uplift. All series, days and samples are one array: a single seeded draw
+# of history days (days x samples) indexes the (series x history) residuals,
+# and the same day is used for every series of a sample, which keeps the
+# correlation between stores and between units and revenue. Drawing days
+# first means a longer horizon extends the draw without changing the
+# earlier days, so an interval does not depend on what it was batched with.
+# The actual history (series x days) and the two baselines (days) are small
+# and kept in store/, rebuilt when cleaned_data.csv, the model or this file
+# is newer; ingest.py extends them by the batch's days (append). The ratios
+# are applied on load, so they are always the current ones.
+RATIO_PATHS = ["product_ratios.csv", "store_ratios.csv"]
+RESIDUALS_PATH = os.path.join(STORE_DIR, "forecast_residuals.npz")
+SAMPLES = 1000
+QUANTILES = (0.1, 0.5, 0.9)
+SEED = 2025
+METHODS = ["model", "trailing"]
+
+
+def residuals(actual, predicted):
+    return (actual - predicted).astype(np.float32)
+
+
+def sorted_quantiles(values, quantiles=QUANTILES):
+    # Quantiles over the last axis, interpolated like np.quantile's default.
+    # Sorts in place: a full float32 sort is several times faster than the
+    # partition np.quantile does for a few quantiles of many rows.
+    values.sort(axis=-1)
+    position = (values.shape[-1] - 1) * np.asarray(quantiles, dtype=float)
+    low = np.floor(position).astype(np.int64)
+    high = np.minimum(low + 1, values.shape[-1] - 1)
+    weight = (position - low).astype(values.dtype)
+    return np.moveaxis(values[..., low] * (1 - weight) + values[..., high] * weight, -1, 0)
+
+
+def bootstrap(point, residuals, samples=SAMPLES, quantiles=QUANTILES, seed=SEED, month_offsets=None, daily=True,
+              is_weekend=None, history_weekend=None):
+    # point: (series, days) forecasts; residuals: (series, history) of the
+    # same series. Given is_weekend (days) and history_weekend (history), each day
+    # draws from the history days of its own kind. Returns quantiles (first
+    # axis) of each day, of the horizon total and, given month_offsets into
+    # the days, of each month.
+    point = np.asarray(point, dtype=np.float32)
+    series, days = point.shape
+    history = residuals.shape[1]
+    if is_weekend is None or history_weekend is None:
+        kind, start, size = np.zeros(days, dtype=np.int64), np.array([0]), np.array([history])
+    else:
+        # History reordered weekdays first, so a kind is a contiguous range.
+        order = np.argsort(history_weekend, kind="stable")
+        residuals = residuals[:, order]
+        kind = np.asarray(is_weekend[:days], dtype=np.int64)
+        size = np.bincount(np.asarray(history_weekend, dtype=np.int64), minlength=2)
+        start = np.r_[0, size[0]]
+    draw = start[kind][:, None] + np.random.default_rng(seed).integers(0, size[kind][:, None], size=(days, samples))
+    # Every value a day can take (point + each history day's residual)
+    # first, then one gather picks the drawn ones: (series, days, history)
+    # is smaller than the paths and the gather is the only pass over them.
+    values = np.maximum(point[:, :, None] + residuals[:, None, :], 0).reshape(series, days * history)
+    paths = values[:, draw + np.arange(days)[:, None] * history]  # (series, days, samples)
+    out = {"total": sorted_quantiles(paths.sum(axis=1), quantiles)}
+    if month_offsets is not None:
+        offsets = np.asarray(month_offsets)
+        out["monthly"] = sorted_quantiles(np.add.reduceat(paths, offsets[offsets < days], axis=1), quantiles)
+    if daily:
+        out["daily"] = sorted_quantiles(paths, quantiles)
+    return out
+
+
+class Residuals:
+    def __init__(self, arrays, product_ratios, store_ratios=None):
+        # (methods, products, stores, history) residuals of the served
+        # forecast.
+        products, stores = arrays["products"].tolist(), arrays["stores"].tolist()[1:]
+        predicted_quantity, predicted_revenue = served_history(
+            arrays["dates"], arrays["baseline_quantity"], arrays["baseline_revenue"], products, stores,
+            product_ratios, store_ratios)
+        self.quantity = residuals(arrays["actual_quantity"][None], predicted_quantity)
+        self.revenue = residuals(arrays["actual_revenue"][None], predicted_revenue)
+        self.weekend = pd.DatetimeIndex(arrays["dates"]).dayofweek >= 5
+        self.methods = {m: i for i, m in enumerate(arrays["methods"].tolist())}
+        self.products = {p: i for i, p in enumerate(arrays["products"].tolist())}
+        self.stores = {s or None: i for i, s in enumerate(arrays["stores"].tolist())}
+
+    def residuals(self, keys, method="model"):
+        # (quantity, revenue) residuals for (product, store) pairs, one row
+        # each; unknown stores use the product over all stores.
+        products = [self.products[p] for p, _ in keys]
+        stores = [self.stores.get(s, self.stores[None]) for _, s in keys]
+        index = (self.methods[method], products, stores)
+        return self.quantity[index], self.revenue[index]
+
+    def intervals(self, keys, quantity, revenue, is_weekend, method="model", samples=SAMPLES, quantiles=QUANTILES,
+                  seed=SEED, month_offsets=None, daily=True):
+        # Intervals of units and revenue for many pairs from one draw:
+        # quantity and revenue are (pairs, days) point forecasts of `method`,
+        # is_weekend flags their days.
+        qty_residuals, rev_residuals = self.residuals(keys, method)
+        out = bootstrap(np.concatenate([quantity, revenue]), np.concatenate([qty_residuals, rev_residuals]),
+                        samples, quantiles, seed, month_offsets, daily, is_weekend, self.weekend)
+        n = len(keys)
+        return {
+            "quantity": {k: v[:, :n] for k, v in out.items()},
+            "revenue": {k: v[:, n:] for k, v in out.items()}
+        }
+
+
+def cells(frame, products, stores):
+    # (products, no store + stores, days) from daily_series columns.
+    frame = frame.copy()
+    frame.columns = pd.MultiIndex.from_arrays([frame.columns.get_level_values(i).astype(str) for i in (0, 1)])
+    values = frame.T.reindex(pd.MultiIndex.from_product([products, stores]), fill_value=0).to_numpy()
+    values = values.reshape(len(products), len(stores), -1)
+    return np.concatenate([values.sum(axis=1, keepdims=True), values], axis=1)
+
+
+def model_baseline(dates, moving_averages, start, unit_price, models=None):
+    # predict_horizon's (units, cost) for each of `dates` from the moving
+    # averages before it.
+    if models is None:
+        models = load_models()
+    qty = models["qty"].predict(build_features(dates, {"start": start, "moving_averages": moving_averages}))
+    return qty, qty * unit_price
+
+
+def trailing_baseline(daily_units, daily_cost, days):
+    # forecast.trailing_average of the TRAILING_WINDOW days before each of
+    # `days` (positions in the daily totals).
+    units, cost = np.r_[0.0, np.cumsum(daily_units)], np.r_[0.0, np.cumsum(daily_cost)]
+    start = np.maximum(days - TRAILING_WINDOW, 0)
+    count = np.maximum(days - start, 1)
+    return (units[days] - units[start]) / count, (cost[days] - cost[start]) / count
+
+
+def served_history(dates, baseline_quantity, baseline_revenue, products, stores, product_ratios, store_ratios=None):
+    # (quantity, revenue) the served forecast gives each of `dates` from
+    # each method's (methods, days) baselines, as (methods, products, no
+    # store + stores, days).
+    dates = pd.DatetimeIndex(dates)
+    base_qty = np.asarray(baseline_quantity)[:, None, None, :]
+    base_cog = np.asarray(baseline_revenue)[:, None, None, :]
+    if store_ratios is None:
+        store_ratio = np.full(len(stores), np.nan)
+    else:
+        store_ratio = _ratio_lookup(store_ratios, "store_location", stores, "cog_ratio")
+    store_ratio = np.r_[1.0, np.where(np.isnan(store_ratio), 1.0, store_ratio)]
+    qty_ratio = np.nan_to_num(_ratio_lookup(product_ratios, "product_name", products, "qty_ratio"))
+    cog_ratio = np.nan_to_num(_ratio_lookup(product_ratios, "product_name", products, "cog_ratio"))
+    weekend = np.where(dates.dayofweek >= 5, WEEKEND_UPLIFT, 1.0)
+    qty = base_qty * qty_ratio[:, None, None] * store_ratio[None, :, None] * weekend
+    rev = base_cog * cog_ratio[:, None, None] * store_ratio[None, :, None] * weekend
+    return qty, rev
+
+
+def build(path=RESIDUALS_PATH):
+    transactions = read_table("cleaned_data", SERIES_COLUMNS)
+    units, cost = daily_series(transactions)
+    products = sorted(units.columns.get_level_values(0).astype(str).unique())
+    stores = sorted(units.columns.get_level_values(1).astype(str).unique())
+
+    # Days from the first with a full moving-average and trailing window
+    # behind it.
+    dates = units.index
+    timestamps = transactions["transaction_date"].drop_duplicates().sort_values()
+    kept = (timestamps.searchsorted(dates) >= max(MA_WINDOWS)) & (np.arange(len(dates)) >= TRAILING_WINDOW)
+    daily_units, daily_cost = units.to_numpy().sum(axis=1), cost.to_numpy().sum(axis=1)
+    unit_price = daily_cost.sum() / daily_units.sum()
+    baselines = [
+        model_baseline(dates[kept], moving_averages_before(transactions, dates[kept]), dates[0], unit_price),
+        trailing_baseline(daily_units, daily_cost, np.flatnonzero(kept))
+    ]
+    write({
+        "actual_quantity": cells(units, products, stores)[:, :, kept],
+        "actual_revenue": cells(cost, products, stores)[:, :, kept],
+        "baseline_quantity": np.stack([b[0] for b in baselines]),
+        "baseline_revenue": np.stack([b[1] for b in baselines]),
+        "dates": np.asarray(dates[kept], dtype="datetime64[D]"),
+        "methods": np.array(METHODS),
+        "products": np.array(products),
+        "stores": np.array([""] + stores),
+        "start": np.asarray(dates[0], dtype="datetime64[D]"),
+        "unit_price": np.array(unit_price)
+    }, path)
+    return path
+
+
+def _expand(values, old_products, old_stores, products, stores, days):
+    # values (old products, no store + old stores, d) placed in a zero
+    # (products, no store + stores, days) array.
+    out = np.zeros((len(products), len(stores) + 1, days))
+    index = {p: i for i, p in enumerate(products)}, {s: i + 1 for i, s in enumerate(stores)}
+    rows = [index[0][p] for p in old_products]
+    columns = [0] + [index[1][s] for s in old_stores]
+    out[:, :, :values.shape[2]][np.ix_(rows, columns)] = values
+    return out
+
+
+def append(arrays, batch, tail, daily):
+    # build()'s arrays after `batch`, transactions from the last stored day
+    # on: its sums are added to their days, and the days after the last
+    # stored one get both baselines as of that day, from the moving averages
+    # of `tail` (model_serving.timestamp_tail before the batch) and the
+    # trailing window of `daily` (daily_sales with the batch). Stored
+    # baselines do not change, except that model revenue is repriced at the
+    # new unit price.
+    units, cost = daily_series(batch[SERIES_COLUMNS])
+    old_products, old_stores = arrays["products"].tolist(), arrays["stores"].tolist()[1:]
+    products = sorted(set(old_products) | set(units.columns.get_level_values(0).astype(str)))
+    stores = sorted(set(old_stores) | set(units.columns.get_level_values(1).astype(str)))
+    dates = pd.DatetimeIndex(arrays["dates"])
+    new_dates = pd.date_range(dates[-1] + pd.Timedelta(days=1), units.index[-1], freq="D")
+    all_dates = dates.append(new_dates)
+    days = all_dates.get_indexer(units.index)
+    if (days < 0).any():
+        raise ValueError("batch starts before the last day of the residual history")
+
+    out = dict(arrays)
+    for name, frame in (("actual_quantity", units), ("actual_revenue", cost)):
+        actual = _expand(arrays[name], old_products, old_stores, products, stores, len(all_dates))
+        actual[:, :, days] += cells(frame, products, stores)
+        out[name] = actual
+    unit_price = daily["cost_of_goods"].sum() / daily["quantity_sold"].sum()
+    baseline_quantity, baseline_revenue = arrays["baseline_quantity"], arrays["baseline_revenue"]
+    if len(new_dates):
+        moving_averages = moving_averages_before(pd.concat([tail, batch[MA_COLUMNS]], ignore_index=True), new_dates)
+        positions = daily["transaction_date"].searchsorted(new_dates)
+        new = [
+            model_baseline(new_dates, moving_averages, pd.Timestamp(str(arrays["start"])), unit_price),
+            trailing_baseline(daily["quantity_sold"].to_numpy(dtype=float),
+                              daily["cost_of_goods"].to_numpy(dtype=float), positions)
+        ]
+        baseline_quantity = np.concatenate([baseline_quantity, np.stack([b[0] for b in new])], axis=1)
+        baseline_revenue = np.concatenate([baseline_revenue, np.stack([b[1] for b in new])], axis=1)
+    model = METHODS.index("model")
+    baseline_revenue = baseline_revenue.copy()
+    baseline_revenue[model] = baseline_quantity[model] * unit_price
+    out.update({
+        "baseline_quantity": baseline_quantity,
+        "baseline_revenue": baseline_revenue,
+        "dates": np.asarray(all_dates, dtype="datetime64[D]"),
+        "products": np.array(products),
+        "stores": np.array([""] + stores),
+        "unit_price": np.array(unit_price)
+    })
+    return out
+
+
+def write(arrays, path=RESIDUALS_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".npz")
+    os.close(fd)
+    try:
+        np.savez(tmp, **arrays)
+        replace_file(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def signature():
+    out = [file_signature(SOURCES["cleaned_data"]), file_signature(QTY_MODEL_PATH)]
+    for path in RATIO_PATHS:
+        try:
+            out.append(file_signature(path))
+        except FileNotFoundError:
+            out.append(None)
+    return tuple(out)
+
+
+def is_fresh(path=RESIDUALS_PATH):
+    if not os.path.exists(path):
+        return False
+    built = os.path.getmtime(path)
+    return all(os.path.getmtime(p) <= built for p in (SOURCES["cleaned_data"], QTY_MODEL_PATH, __file__))
+
+
+def load_arrays(path=RESIDUALS_PATH):
+    if not is_fresh(path):
+        build(path)
+    with np.load(path) as arrays:
+        return {k: arrays[k] for k in arrays.files}
+
+
+def load(path=RESIDUALS_PATH):
+    arrays = load_arrays(path)
+    try:
+        store_ratios = pd.read_csv(RATIO_PATHS[1])
+    except FileNotFoundError:
+        store_ratios = None
+    return Residuals(arrays, pd.read_csv(RATIO_PATHS[0]), store_ratios)
+
+
+if __name__ == "__main__":
+    import forecast_cube
+
+    parser = argparse.ArgumentParser(description="Bootstrap prediction intervals of the 2025 forecast totals")
+    parser.add_argument("--method", choices=forecast_cube.METHODS, default="model")
+    parser.add_argument("--months", type=int, default=3)
+    parser.add_argument("--samples", type=int, default=SAMPLES)
+    parser.add_argument("--seed", type=int, default=SEED)
+    args = parser.parse_args()
+
+    try:
+        cube = forecast_cube.load()
+        residuals = load()
+    except FileNotFoundError as e:
+        sys.exit(f"Missing file: {e.filename}")
+    keys = [(p, s) for p in residuals.products for s in residuals.stores]
+    quantity, revenue = cube.rows(args.method, keys, args.months)
+    method = "trailing" if cube.model_error else args.method
+    bands = residuals.intervals(keys, quantity, revenue, cube.days["is_weekend"].to_numpy(), method, args.samples,
+                                seed=args.seed, daily=False)
+    table = pd.DataFrame(keys, columns=["product_name", "store_location"]).fillna("All stores")
+    table["units"] = quantity.sum(axis=1)
+    table["revenue"] = revenue.sum(axis=1)
+    for name, q in zip(["p10", "p50", "p90"], bands["revenue"]["total"]):
+        table[f"revenue_{name}"] = q
+    with pd.option_context("display.width", 200, "display.max_rows", None, "display.float_format", "{:,.2f}".format):
+        print(table.to_string(index=False))
+    print(f"\n{len(keys)} series x {quantity.shape[1]} days x {args.samples:,} samples")
@@ -0,0 +1,134 @@
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from data_store import read_table
+
+# Replenishment simulation for every product x store (SKU) over the 2025
+# forecast. Each SKU starts from its latest transaction: stock on hand
+# (inventory_level) and its policy (reorder_point, reorder_quantity,
+# supplier_lead_time). Every day:
+#   1. orders due that day arrive
+#   2. the forecast demand is served from stock; what stock cannot cover
+#      is lost and the day counts as a stockout day
+#   3. when stock plus open orders is at or below the reorder point, enough
+#      multiples of the reorder quantity are ordered to lift it above; they
+#      arrive after the lead time (at least one day)
+# Days are a loop, SKUs are array operations: each step updates every SKU
+# at once, so the cost grows with the horizon, not with the SKU count.
+HORIZON_MONTHS = 9
+STOCK_COLUMNS = ["transaction_date", "product_name", "store_location", "inventory_level", "reorder_point",
+                 "reorder_quantity", "supplier_lead_time"]
+STOCKOUT_EPS = 1e-9
+
+
+def sku_state(transactions):
+    # One row per (product, store): the latest transaction's stock and policy.
+    latest = transactions.sort_values("transaction_date", kind="stable").groupby(
+        ["product_name", "store_location"], observed=True).tail(1)
+    return latest.set_index(["product_name", "store_location"]).sort_index()[STOCK_COLUMNS[3:]]
+
+
+def simulate(demand, stock, reorder_point, reorder_quantity, lead_time):
+    # demand: (skus, days) units per day; the others one value per SKU.
+    # Returns per SKU and day: stock at the end of the day, units ordered,
+    # units arriving and demand lost.
+    demand = np.asarray(demand, dtype=float)
+    skus, days = demand.shape
+    reorder_point = np.asarray(reorder_point, dtype=float)
+    reorder_quantity = np.maximum(np.asarray(reorder_quantity, dtype=float), 1.0)
+    lead = np.maximum(np.asarray(lead_time, dtype=np.int64), 1)
+
+    rows = np.arange(skus)
+    due = np.zeros((skus, days + int(lead.max(initial=1)) + 1))
+    on_hand = np.asarray(stock, dtype=float).copy()
+    on_order = np.zeros(skus)
+    out = {name: np.zeros((skus, days)) for name in ["stock", "ordered", "received", "lost"]}
+    for t in range(days):
+        arriving = due[:, t]
+        on_hand += arriving
+        on_order -= arriving
+        served = np.minimum(on_hand, demand[:, t])
+        on_hand -= served
+        position = on_hand + on_order
+        batches = np.where(position <= reorder_point,
+                           np.floor((reorder_point - position) / reorder_quantity) + 1, 0)
+        ordered = batches * reorder_quantity
+        on_order += ordered
+        due[rows, t + lead] += ordered
+        out["stock"][:, t] = on_hand
+        out["ordered"][:, t] = ordered
+        out["received"][:, t] = arriving
+        out["lost"][:, t] = demand[:, t] - served
+    return out
+
+
+def summarize(state, demand, result, dates):
+    # Per-SKU projection: stockout days, lost units, orders and volume.
+    stockout = result["lost"] > STOCKOUT_EPS
+    total_demand = demand.sum(axis=1)
+    summary = state.reset_index()[["product_name", "store_location"]].copy()
+    summary["starting_stock"] = state["inventory_level"].to_numpy()
+    summary["forecast_units"] = total_demand
+    summary["stockout_days"] = stockout.sum(axis=1)
+    first = pd.Series(pd.DatetimeIndex(dates)[stockout.argmax(axis=1)])
+    summary["first_stockout"] = first.where(stockout.any(axis=1))
+    summary["lost_units"] = result["lost"].sum(axis=1)
+    summary["fill_rate"] = 1 - summary["lost_units"] / np.where(total_demand > 0, total_demand, 1.0)
+    summary["orders"] = (result["ordered"] > 0).sum(axis=1)
+    summary["units_ordered"] = result["ordered"].sum(axis=1)
+    summary["ending_stock"] = result["stock"][:, -1]
+    return summary
+
+
+def network(cube, state, method="model", months=HORIZON_MONTHS, demand_scale=1.0, extra_lead_days=0,
+            reorder_point_scale=1.0, reorder_quantity_scale=1.0):
+    # What-if over every SKU: demand from the forecast cube (daily units per
+    # product x store) and each SKU's policy scaled or delayed as given.
+    # Returns (per-SKU summary, daily network totals, raw simulation arrays).
+    demand = cube.units(method, state.index, months) * demand_scale
+    result = simulate(
+        demand,
+        state["inventory_level"].to_numpy(),
+        state["reorder_point"].to_numpy() * reorder_point_scale,
+        np.round(state["reorder_quantity"].to_numpy() * reorder_quantity_scale),
+        state["supplier_lead_time"].to_numpy() + extra_lead_days
+    )
+    dates = cube.days["date"].iloc[:demand.shape[1]].to_numpy()
+    daily = pd.DataFrame({
+        "date": dates,
+        "demand": demand.sum(axis=0),
+        "stock": result["stock"].sum(axis=0),
+        "ordered": result["ordered"].sum(axis=0),
+        "lost": result["lost"].sum(axis=0),
+        "skus_out": (result["lost"] > STOCKOUT_EPS).sum(axis=0)
+    })
+    return summarize(state, demand, result, dates), daily, result
+
+
+if __name__ == "__main__":
+    import forecast_cube
+
+    parser = argparse.ArgumentParser(description="Project stockouts and reorders for every product x store")
+    parser.add_argument("--method", choices=forecast_cube.METHODS, default="model")
+    parser.add_argument("--months", type=int, default=HORIZON_MONTHS)
+    parser.add_argument("--demand-scale", type=float, default=1.0)
+    parser.add_argument("--extra-lead-days", type=int, default=0)
+    parser.add_argument("--reorder-point-scale", type=float, default=1.0)
+    parser.add_argument("--reorder-quantity-scale", type=float, default=1.0)
+    args = parser.parse_args()
+
+    try:
+        state = sku_state(read_table("cleaned_data", STOCK_COLUMNS))
+        cube = forecast_cube.load()
+    except FileNotFoundError as e:
+        sys.exit(f"Missing file: {e.filename}")
+    summary, daily, _ = network(cube, state, args.method, args.months, args.demand_scale, args.extra_lead_days,
+                                args.reorder_point_scale, args.reorder_quantity_scale)
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(summary.sort_values(["stockout_days", "lost_units"], ascending=False).to_string(index=False))
+    print(f"\n{len(summary)} SKUs over {len(daily)} days: {int(summary['stockout_days'].sum())} stockout SKU-days, "
+          f"{summary['lost_units'].sum():,.0f} units lost, {int(summary['orders'].sum())} orders for "
+          f"{summary['units_ordered'].sum():,.0f} units")
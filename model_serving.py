@@ -0,0 +1,124 @@
+import functools
+import os
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from data_store import SOURCES, STORE_DIR, read_table, replace_file
+
+# Serving path for the regression models trained in the modelling notebook.
+# Models are unpickled once per process; a forecast builds the feature matrix
+# for the whole horizon and calls predict once.
+QTY_MODEL_PATH = "best_qty_model.pkl"
+COG_MODEL_PATH = "best_cog_model.pkl"
+ENCODERS_PATH = "encoders.pkl"
+
+FEATURES = [
+    "days_since_start", "month", "week", "day_of_week", "day_of_year",
+    "is_weekend", "qty_ma7", "qty_ma14", "qty_ma30"
+]
+MA_WINDOWS = [7, 14, 30]
+MA_COLUMNS = ["transaction_date", "quantity_sold"]
+
+# The moving averages only need the last max(MA_WINDOWS) transaction
+# timestamps, so their quantity sums are kept in store/ and extended by
+# ingest.py; the file is rebuilt from cleaned_data when that is newer.
+TAIL_PATH = os.path.join(STORE_DIR, "moving_average_tail.csv")
+
+
+@functools.lru_cache(maxsize=None)
+def load_models(qty_path=QTY_MODEL_PATH, cog_path=COG_MODEL_PATH, encoders_path=ENCODERS_PATH):
+    return {
+        "qty": joblib.load(qty_path),
+        "cog": joblib.load(cog_path),
+        "encoders": joblib.load(encoders_path)
+    }
+
+
+def transaction_moving_averages(transactions):
+    # qty_ma7/14/30 as the models were trained on them: the notebook's
+    # daily_sales had one row per transaction timestamp, so its moving
+    # averages are over the last 7/14/30 timestamps (about 3 units), not
+    # over calendar days (about 57, far outside the training range).
+    dates = transactions["transaction_date"]
+    recent = transactions[dates >= dates.drop_duplicates().nlargest(max(MA_WINDOWS)).min()]
+    qty = recent.groupby("transaction_date")["quantity_sold"].sum().to_numpy(dtype=float)
+    return [qty[-w:].mean() for w in MA_WINDOWS]
+
+
+def timestamp_tail(transactions, n=max(MA_WINDOWS)):
+    # quantity_sold summed per transaction timestamp, the last n timestamps.
+    qty = transactions.groupby("transaction_date")["quantity_sold"].sum()
+    return qty.iloc[-n:].reset_index()
+
+
+def load_tail(path=TAIL_PATH):
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(SOURCES["cleaned_data"]):
+        return pd.read_csv(path, parse_dates=["transaction_date"])
+    tail = timestamp_tail(read_table("cleaned_data", MA_COLUMNS))
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+        os.close(fd)
+        try:
+            tail.to_csv(tmp, index=False, lineterminator="\n")
+            replace_file(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    except OSError:
+        pass
+    return tail
+
+
+def moving_averages_before(transactions, days):
+    # (days, windows): transaction_moving_averages as of each day, over the
+    # transaction timestamps before it. One cumulative sum for all days.
+    qty = transactions.groupby("transaction_date")["quantity_sold"].sum()
+    cumulative = np.r_[0.0, np.cumsum(qty.to_numpy(dtype=float))]
+    end = qty.index.searchsorted(pd.DatetimeIndex(days))
+    return np.column_stack([(cumulative[end] - cumulative[np.maximum(end - w, 0)]) / np.maximum(np.minimum(end, w), 1)
+                            for w in MA_WINDOWS])
+
+
+def history_features(daily_sales, transactions=None):
+    # Start date for days_since_start and the trailing moving averages, which
+    # are held at their last observed value across the forecast horizon.
+    if transactions is None:
+        transactions = load_tail()
+    qty = daily_sales["quantity_sold"]
+    return {
+        "start": daily_sales["transaction_date"].min().normalize(),
+        "moving_averages": transaction_moving_averages(transactions),
+        "unit_price": daily_sales["cost_of_goods"].sum() / qty.sum()
+    }
+
+
+def build_features(dates, history):
+    dates = pd.DatetimeIndex(dates)
+    X = np.empty((len(dates), len(FEATURES)))
+    X[:, 0] = (dates - history["start"]).days
+    X[:, 1] = dates.month
+    X[:, 2] = dates.isocalendar().week.to_numpy()
+    X[:, 3] = dates.dayofweek
+    X[:, 4] = dates.dayofyear
+    X[:, 5] = dates.dayofweek >= 5
+    X[:, 6:] = history["moving_averages"]
+    return pd.DataFrame(X, columns=FEATURES)
+
+
+def predict_horizon(models, daily_sales, dates, history=None):
+    # Revenue is priced from predicted units at the historical unit price;
+    # the COG regressor extrapolates to negative values past the training
+    # window, so it is loaded but not used for the 2025 horizon.
+    if history is None:
+        history = history_features(daily_sales)
+    X = build_features(dates, history)
+    predicted_quantity = models["qty"].predict(X)
+    return pd.DataFrame({
+        "date": pd.DatetimeIndex(dates),
+        "predicted_quantity": predicted_quantity,
+        "predicted_cog": predicted_quantity * history["unit_price"]
+    })
@@ -0,0 +1,173 @@
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from data_store import read_table, replace_file
+
+# Accuracy of forecasted_demand against actual_demand, kept as running sums
+# per product x store x week (weeks start on Monday):
+#   rows, actual, forecast, abs_error, error, sq_error, ape, ape_rows
+# with error = forecast - actual and ape over the rows whose actual is
+# positive. MAE, MAPE, WAPE, bias and RMSE at any grain are ratios of these
+# sums, so a row adds to one cell in O(1) and an ingested batch is one
+# grouped sum added to forecast_monitor.csv; history is never rescanned.
+# Drift alarms compare each week with the series' own history before it,
+# also read from the sums: a week's MAE more than ALARM_SIGMAS standard
+# errors above the earlier mean absolute error, or its mean error that far
+# from the earlier bias either way. A series needs MIN_HISTORY earlier rows
+# before it can alarm.
+MONITOR_PATH = "forecast_monitor.csv"
+MONITOR_COLUMNS = ["transaction_date", "product_name", "store_location", "forecasted_demand", "actual_demand"]
+KEY = ["product_name", "store_location", "week"]
+SUM_COLUMNS = ["rows", "actual", "forecast", "abs_error", "error", "sq_error", "ape", "ape_rows"]
+ALARM_SIGMAS = 3.0
+MIN_HISTORY = 20
+
+
+def week_start(dates):
+    return pd.to_datetime(dates).dt.to_period("W-SUN").dt.start_time
+
+
+def row_sums(transactions):
+    # Sums per product x store x week of a set of transactions.
+    t = transactions
+    actual = t["actual_demand"].to_numpy(dtype=float)
+    forecast = t["forecasted_demand"].to_numpy(dtype=float)
+    error = forecast - actual
+    positive = actual > 0
+    frame = pd.DataFrame({
+        "product_name": t["product_name"].astype(str).to_numpy(),
+        "store_location": t["store_location"].astype(str).to_numpy(),
+        "week": week_start(t["transaction_date"]).to_numpy(),
+        "rows": 1,
+        "actual": actual,
+        "forecast": forecast,
+        "abs_error": np.abs(error),
+        "error": error,
+        "sq_error": error ** 2,
+        "ape": np.where(positive, np.abs(error) / np.where(positive, actual, 1), 0.0),
+        "ape_rows": positive.astype(np.int64)
+    })
+    return frame.groupby(KEY, as_index=False)[SUM_COLUMNS].sum()
+
+
+def add_sums(table, sums):
+    # A batch's sums added to the stored ones; new cells start at zero.
+    totals = table.set_index(KEY)[SUM_COLUMNS].add(sums.set_index(KEY)[SUM_COLUMNS], fill_value=0)
+    totals[["rows", "ape_rows"]] = totals[["rows", "ape_rows"]].astype("int64")
+    return totals.sort_index().reset_index()
+
+
+def metrics(sums):
+    out = sums.copy()
+    rows = out["rows"].where(out["rows"] > 0)
+    out["mae"] = out["abs_error"] / rows
+    out["mape"] = out["ape"] / out["ape_rows"].where(out["ape_rows"] > 0) * 100
+    out["wape"] = out["abs_error"] / out["actual"].where(out["actual"] > 0) * 100
+    out["bias"] = out["error"] / rows
+    out["rmse"] = np.sqrt(out["sq_error"] / rows)
+    return out
+
+
+def query(table, by=KEY, product=None, store=None, start=None, end=None):
+    # Metrics rolled up to `by` (any of KEY, or [] for one total row) over
+    # the matching cells; product and store take a name or a list.
+    keep = np.ones(len(table), dtype=bool)
+    for column, value in (("product_name", product), ("store_location", store)):
+        if value is not None:
+            keep &= table[column].isin([value] if isinstance(value, str) else list(value)).to_numpy()
+    if start is not None:
+        keep &= (table["week"] >= week_start(pd.Series([start]))[0]).to_numpy()
+    if end is not None:
+        keep &= (table["week"] <= pd.Timestamp(end)).to_numpy()
+    cells = table[keep]
+    if by:
+        sums = cells.groupby(list(by), as_index=False, sort=True)[SUM_COLUMNS].sum()
+    else:
+        sums = cells[SUM_COLUMNS].sum().to_frame().T.astype({"rows": "int64", "ape_rows": "int64"})
+    return metrics(sums)
+
+
+def alarms(table, sigmas=ALARM_SIGMAS, min_history=MIN_HISTORY):
+    # Weekly metrics per series with the baseline of all earlier weeks and
+    # the z-scores behind the alarms.
+    weekly = metrics(table.sort_values(KEY, kind="stable").reset_index(drop=True))
+    series = weekly.groupby(["product_name", "store_location"], sort=False)
+    prior = {c: series[c].cumsum() - weekly[c] for c in ["rows", "abs_error", "error", "sq_error"]}
+    history = prior["rows"].where(prior["rows"] > 0)
+    base_mae = prior["abs_error"] / history
+    base_bias = prior["error"] / history
+    mean_sq = prior["sq_error"] / history
+
+    # Standard error of a mean of the week's rows, from the earlier spread.
+    sd_abs = np.sqrt((mean_sq - base_mae ** 2).clip(lower=0))
+    sd_err = np.sqrt((mean_sq - base_bias ** 2).clip(lower=0))
+    root_n = np.sqrt(weekly["rows"])
+    weekly["baseline_mae"] = base_mae
+    weekly["baseline_bias"] = base_bias
+    weekly["mae_z"] = (weekly["mae"] - base_mae) / (sd_abs / root_n).where(sd_abs > 0)
+    weekly["bias_z"] = (weekly["bias"] - base_bias) / (sd_err / root_n).where(sd_err > 0)
+
+    ready = prior["rows"] >= min_history
+    mae_up = ready & (weekly["mae_z"] > sigmas)
+    bias_shift = ready & (weekly["bias_z"].abs() > sigmas)
+    weekly["alarm"] = np.select(
+        [mae_up & bias_shift, mae_up, bias_shift],
+        ["MAE up, bias shift", "MAE up", "Bias shift"],
+        ""
+    )
+    return weekly
+
+
+def build(transactions=None, path=MONITOR_PATH):
+    if transactions is None:
+        transactions = read_table("cleaned_data", MONITOR_COLUMNS)
+    table = row_sums(transactions)
+    write(table, path)
+    return table
+
+
+def write(table, path=MONITOR_PATH):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    os.close(fd)
+    try:
+        table.to_csv(tmp, index=False, lineterminator="\n")
+        replace_file(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def load(path=MONITOR_PATH):
+    return pd.read_csv(path, parse_dates=["week"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Forecast accuracy of forecasted_demand vs actual_demand")
+    parser.add_argument("--rebuild", action="store_true", help=f"recompute {MONITOR_PATH} from cleaned_data")
+    parser.add_argument("--by", nargs="*", default=["product_name", "store_location"], choices=KEY)
+    parser.add_argument("--product")
+    parser.add_argument("--store")
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--alarms", action="store_true", help="list the weeks that raised an alarm")
+    args = parser.parse_args()
+
+    try:
+        table = build() if args.rebuild or not os.path.exists(MONITOR_PATH) else load()
+    except FileNotFoundError as e:
+        sys.exit(f"Missing file: {e.filename}")
+    columns = args.by + ["rows", "mae", "mape", "wape", "bias", "rmse"]
+    with pd.option_context("display.width", 200, "display.max_rows", None, "display.float_format", "{:,.2f}".format):
+        if args.alarms:
+            weekly = alarms(table)
+            flagged = weekly[weekly["alarm"] != ""]
+            print(flagged[KEY + ["rows", "mae", "baseline_mae", "mae_z", "bias", "baseline_bias", "bias_z",
+                                 "alarm"]].to_string(index=False))
+            print(f"\n{len(flagged)} alarms in {len(weekly)} series-weeks")
+        else:
+            print(query(table, args.by, args.product, args.store, args.start, args.end)[columns].to_string(index=False))
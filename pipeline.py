@@ -0,0 +1,306 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import features
+from schema import BOOL_MAP, INT_TYPES, cast_int
+
+# Chunked version of the cleaning cells in notebooks/Capstone_EDA.ipynb.
+# Peak memory is bounded by the chunk size and the size of one week of
+# transactions, not by the size of the raw extract:
+#   pass 1  read the raw CSV in chunks, clean each chunk, feed the median
+#           histograms and spill rows to per-week Arrow files
+#   pass 2  finish the medians from the spilled numeric columns only
+#   pass 3  per week: fill medians, drop duplicates, derive columns, write
+#   then    features.py adds the calendar and *_encoded columns the
+#           dashboard reads, and only that result replaces the output, so
+#           cleaned_data.csv is never left without them
+# Exact duplicates share a transaction_date, so they always land in the
+# same weekly partition and can be dropped there.
+RAW_PATH = "data/Walmart.csv"
+OUTPUT_PATH = "cleaned_data.csv"
+CHUNK_ROWS = 250_000
+MAX_OPEN_WEEKS = 64
+
+NUM_COLS = [
+    "quantity_sold", "unit_price", "inventory_level", "reorder_point",
+    "reorder_quantity", "supplier_lead_time", "customer_age",
+    "customer_income", "forecasted_demand", "actual_demand"
+]
+ID_COLS = ["transaction_id", "customer_id", "product_id", "store_id", "supplier_id"]
+INT_COLS = [
+    "customer_id", "product_id", "store_id", "quantity_sold", "inventory_level", "reorder_point",
+    "reorder_quantity", "supplier_lead_time", "customer_age",
+    "forecasted_demand", "actual_demand"
+]
+BOOL_COLS = ["promotion_applied", "holiday_indicator", "stockout_indicator"]
+REQUIRED_COLS = ["transaction_id", "product_id", "customer_id", "quantity_sold", "unit_price", "transaction_date"]
+DROP_COLS = ["transaction_id", "supplier_id", "day", "weekday"]
+RENAME = {"customer_loyalty_level": "loyalty_level"}
+
+
+def normalize_columns(columns):
+    return (
+        pd.Index(columns).str.strip()
+        .str.lower()
+        .str.replace("[^0-9a-zA-Z]+", "_", regex=True)
+    )
+
+
+def clean_chunk(chunk, row_offset=0):
+    # Per-row steps of the notebook; anything needing the whole file
+    # (medians, duplicates) is left for later passes.
+    chunk.columns = normalize_columns(chunk.columns)
+    for c in chunk.columns:
+        chunk[c] = chunk[c].str.strip()
+
+    chunk["transaction_date"] = pd.to_datetime(chunk["transaction_date"], errors="coerce")
+    for c in BOOL_COLS:
+        if c in chunk.columns:
+            chunk[c] = chunk[c].str.lower().map(BOOL_MAP)
+    for c in NUM_COLS + ID_COLS:
+        if c in chunk.columns:
+            chunk[c] = pd.to_numeric(chunk[c], errors="coerce")
+
+    chunk["_seq"] = np.arange(row_offset, row_offset + len(chunk))
+    return chunk.dropna(subset=[c for c in REQUIRED_COLS if c in chunk.columns])
+
+
+def spill_schema(columns):
+    fields = []
+    for c in columns:
+        if c == "transaction_date":
+            fields.append(pa.field(c, pa.timestamp("us")))
+        elif c == "_seq":
+            fields.append(pa.field(c, pa.int64()))
+        elif c in NUM_COLS or c in ID_COLS:
+            fields.append(pa.field(c, pa.float64()))
+        elif c in BOOL_COLS:
+            fields.append(pa.field(c, pa.bool_()))
+        else:
+            fields.append(pa.field(c, pa.string()))
+    return pa.schema(fields)
+
+
+class StreamingMedian:
+    # Exact median in fixed memory. Pass 1 counts values into 2**16 buckets
+    # keyed on the top bits of an order-preserving encoding of the float;
+    # pass 2 keeps only values that fall in the bucket(s) holding the middle
+    # rank(s), as value counts, and selects the exact order statistics.
+    BITS = 16
+
+    def __init__(self):
+        self.counts = np.zeros(1 << self.BITS, dtype=np.int64)
+        self.n = 0
+        self.candidates = None
+
+    @classmethod
+    def _buckets(cls, values):
+        bits = values.astype(np.float64).view(np.uint64)
+        keys = np.where(bits >> np.uint64(63), ~bits, bits | np.uint64(1 << 63))
+        return (keys >> np.uint64(64 - cls.BITS)).astype(np.int64)
+
+    def add(self, values):
+        values = values[~np.isnan(values)]
+        self.counts += np.bincount(self._buckets(values), minlength=len(self.counts))
+        self.n += len(values)
+
+    def _targets(self):
+        ranks = np.array([(self.n - 1) // 2, self.n // 2])
+        cumulative = self.counts.cumsum()
+        buckets = np.searchsorted(cumulative, ranks, side="right")
+        before = np.where(buckets > 0, cumulative[buckets - 1], 0)
+        return buckets, ranks - before
+
+    def collect(self, values):
+        if self.n == 0:
+            return
+        values = values[~np.isnan(values)]
+        buckets, _ = self._targets()
+        keep = values[np.isin(self._buckets(values), buckets)]
+        counts = pd.Series(keep).value_counts()
+        self.candidates = counts if self.candidates is None else self.candidates.add(counts, fill_value=0)
+
+    def median(self):
+        if self.n == 0:
+            return np.nan
+        buckets, offsets = self._targets()
+        counts = self.candidates.sort_index()
+        picks = []
+        for bucket, offset in zip(buckets, offsets):
+            in_bucket = counts[self._buckets(counts.index.to_numpy()) == bucket]
+            position = np.searchsorted(in_bucket.cumsum().to_numpy(), offset, side="right")
+            picks.append(in_bucket.index[position])
+        return (picks[0] + picks[1]) / 2
+
+
+class WeekSpill:
+    # Arrow stream files per week. At most max_open weeks hold an open file
+    # (the least recently written is closed first); a week written again
+    # after its file was closed continues in a new segment file.
+    def __init__(self, directory, schema, max_open=MAX_OPEN_WEEKS):
+        self.directory = directory
+        self.schema = schema
+        self.max_open = max_open
+        self.segments = {}  # week -> number of segment files
+        self.writers = OrderedDict()  # week -> (sink, writer), most recent last
+
+    def path(self, week, segment):
+        return os.path.join(self.directory, f"week_{week}_{segment}.arrow")
+
+    def _writer(self, week):
+        if week in self.writers:
+            self.writers.move_to_end(week)
+        else:
+            if len(self.writers) >= self.max_open:
+                _, (sink, writer) = self.writers.popitem(last=False)
+                writer.close()
+                sink.close()
+            segment = self.segments.get(week, 0)
+            self.segments[week] = segment + 1
+            sink = pa.OSFile(self.path(week, segment), "wb")
+            self.writers[week] = (sink, pa.ipc.new_stream(sink, self.schema))
+        return self.writers[week][1]
+
+    def write(self, chunk):
+        weeks = chunk["transaction_date"].to_numpy().astype("datetime64[D]").astype(np.int64) // 7
+        order = np.argsort(weeks, kind="stable")
+        chunk, weeks = chunk.iloc[order], weeks[order]
+        bounds = np.flatnonzero(np.diff(weeks)) + 1
+        for part in np.split(np.arange(len(chunk)), bounds):
+            if len(part) == 0:
+                continue
+            table = pa.Table.from_pandas(chunk.iloc[part], schema=self.schema, preserve_index=False)
+            self._writer(int(weeks[part[0]])).write_table(table)
+
+    def close(self):
+        for sink, writer in self.writers.values():
+            writer.close()
+            sink.close()
+        self.writers.clear()
+
+    def weeks(self):
+        return sorted(self.segments)
+
+    def read(self, week, columns=None):
+        tables = []
+        for segment in range(self.segments[week]):
+            with pa.memory_map(self.path(week, segment)) as source:
+                tables.append(pa.ipc.open_stream(source).read_all())
+        table = pa.concat_tables(tables)
+        if columns is not None:
+            table = table.select(columns)
+        return table.to_pandas()
+
+
+def finish_partition(part, medians):
+    for c, m in medians.items():
+        part[c] = part[c].fillna(m)
+    part = part.sort_values("_seq").drop_duplicates(subset=[c for c in part.columns if c != "_seq"])
+
+    date = part["transaction_date"].dt
+    part["year"] = date.year
+    part["month"] = date.month
+    part["dayofweek"] = date.dayofweek
+    part["is_weekend"] = (date.dayofweek >= 5).astype(int)
+    part["cost_of_goods"] = part["quantity_sold"] * part["unit_price"]
+
+    for c in INT_COLS:
+        if c in part.columns and (part[c] % 1 == 0).all():
+            part[c] = cast_int(part[c], INT_TYPES[c], c)
+
+    part = part.sort_values(["transaction_date", "_seq"], kind="stable")
+    part = part.drop(columns=[c for c in DROP_COLS + ["_seq"] if c in part.columns])
+    return part.rename(columns=RENAME)
+
+
+def run(raw_path=RAW_PATH, output_path=OUTPUT_PATH, chunk_rows=CHUNK_ROWS, output_format="csv",
+        spill_dir=None, log=print, add_features=True, encoders_path=features.ENCODERS_PATH, workers=None):
+    # The temporary keeps the output's extension: features.py picks the
+    # format from it.
+    base, ext = os.path.splitext(output_path)
+    tmp_path = f"{base}.tmp{ext}"
+    spill = None
+    spill_root = tempfile.mkdtemp(prefix="walmart_spill_", dir=spill_dir)
+    try:
+        # Pass 1: clean chunks, start the medians, spill by week.
+        medians = {}
+        rows_in = 0
+        for chunk in pd.read_csv(raw_path, dtype=str, chunksize=chunk_rows):
+            n_raw = len(chunk)
+            chunk = clean_chunk(chunk, rows_in)
+            rows_in += n_raw
+            if spill is None:
+                spill = WeekSpill(spill_root, spill_schema(chunk.columns))
+                medians = {c: StreamingMedian() for c in NUM_COLS if c in chunk.columns}
+            for c, m in medians.items():
+                m.add(chunk[c].to_numpy(dtype=float))
+            spill.write(chunk)
+        if spill is None:
+            raise ValueError(f"{raw_path} has no rows")
+        spill.close()
+
+        # Pass 2: only the numeric columns, only values near the middle.
+        for week in spill.weeks():
+            part = spill.read(week, list(medians))
+            for c, m in medians.items():
+                m.collect(part[c].to_numpy(dtype=float))
+        fill_values = {c: m.median() for c, m in medians.items()}
+
+        # Pass 3: finish and write one week at a time, in date order.
+        writer = schema = None
+        rows_out = 0
+        for i, week in enumerate(spill.weeks()):
+            part = finish_partition(spill.read(week), fill_values)
+            rows_out += len(part)
+            if output_format == "arrow":
+                table = pa.Table.from_pandas(part, preserve_index=False)
+                if writer is None:
+                    schema = table.schema
+                    writer = pa.ipc.new_file(tmp_path, schema)
+                writer.write_table(table.cast(schema))
+            else:
+                part.to_csv(tmp_path, mode="a" if i else "w", header=not i, index=False)
+        if writer is not None:
+            writer.close()
+        if add_features:
+            features.run(tmp_path, output_path, workers, encoders_path, log=lambda *a: None)
+        else:
+            os.replace(tmp_path, output_path)
+
+        log(f"{raw_path}: {rows_in:,} rows read, {rows_out:,} rows written to {output_path}"
+            + ("" if add_features else " (without feature columns)"))
+        return fill_values
+    finally:
+        if spill is not None:
+            spill.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        shutil.rmtree(spill_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean a raw Walmart transaction extract in bounded memory")
+    parser.add_argument("raw", nargs="?", default=RAW_PATH)
+    parser.add_argument("-o", "--output", default=OUTPUT_PATH)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--format", choices=["csv", "arrow"], default="csv")
+    parser.add_argument("--spill-dir", help="directory for temporary weekly partitions")
+    parser.add_argument("--no-features", action="store_true",
+                        help="skip features.py; the output then lacks the columns the dashboard reads")
+    parser.add_argument("--encoders", default=features.ENCODERS_PATH)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    for path in [args.raw] + ([] if args.no_features else [args.encoders]):
+        if not os.path.exists(path):
+            sys.exit(f"Missing file: {path}")
+    run(args.raw, args.output, args.chunk_rows, args.format, args.spill_dir,
+        add_features=not args.no_features, encoders_path=args.encoders, workers=args.workers)
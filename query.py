@@ -0,0 +1,114 @@
+import threading
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Filter engine for the Data Explorer transactions tab. Built once per
+# frame: rows are put in transaction_date order, so a date range is a
+# searchsorted slice, and every category/product value gets a row bitmap in
+# that same order. A query slices the bitmaps to the date range and ORs the
+# selected values, so its cost follows the rows in range, not the frame.
+# Results are memoized by filter signature, so widget reruns with the same
+# filters cost a dict lookup.
+INDEXED_COLUMNS = ["category", "product_name"]
+CACHE_SIZE = 64
+
+
+class FilterResult:
+    def __init__(self, frame, rows, signature=None):
+        self.frame = frame
+        self.rows = rows  # positions into frame, in transaction_date order
+        self.signature = signature
+        self._totals = None
+
+    def __len__(self):
+        return len(self.rows)
+
+    def latest(self, n=100, columns=None):
+        # Newest first, straight off the date order: no sort of the result.
+        frame = self.frame if columns is None else self.frame[columns]
+        return frame.take(self.rows[::-1][:n])
+
+    def totals(self):
+        if self._totals is None:
+            self._totals = {
+                col: self.frame[col].to_numpy().take(self.rows).sum()
+                for col in ["cost_of_goods", "quantity_sold"]
+            }
+        return self._totals
+
+    def to_frame(self):
+        return self.frame.take(self.rows)
+
+
+class TransactionIndex:
+    def __init__(self, frame, cache_size=CACHE_SIZE):
+        self.frame = frame
+        self.version = uuid.uuid4().hex  # tells results of different builds apart
+        dates = frame["transaction_date"].to_numpy()
+        if (np.diff(dates.view(np.int64)) >= 0).all():
+            self.order = np.arange(len(frame))
+        else:
+            self.order = np.argsort(dates, kind="stable")
+        self.dates = dates[self.order]
+
+        # value -> bool array over date-ordered rows; values keep their order
+        # of first appearance for the widgets.
+        self.bitmaps = {}
+        self.values = {}
+        for col in INDEXED_COLUMNS:
+            codes, uniques = pd.factorize(frame[col].to_numpy()[self.order])
+            self.values[col] = list(uniques)
+            self.bitmaps[col] = {value: codes == i for i, value in enumerate(uniques)}
+
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def date_bounds(self):
+        return pd.Timestamp(self.dates[0]), pd.Timestamp(self.dates[-1])
+
+    def _mask(self, col, selected, lo, hi):
+        # None when the selection keeps every row of the column.
+        bitmaps = self.bitmaps[col]
+        if all(value in selected for value in bitmaps):
+            return None
+        mask = np.zeros(hi - lo, dtype=bool)
+        for value in selected:
+            if value in bitmaps:
+                mask |= bitmaps[value][lo:hi]
+        return mask
+
+    def query(self, start=None, end=None, **filters):
+        # filters: column -> selected values, for columns in INDEXED_COLUMNS.
+        # start/end are inclusive timestamps.
+        start = None if start is None else pd.Timestamp(start)
+        end = None if end is None else pd.Timestamp(end)
+        selections = {col: frozenset(filters[col]) for col in INDEXED_COLUMNS if col in filters}
+        key = (start, end, tuple(sorted((col, tuple(sorted(map(str, sel)))) for col, sel in selections.items())))
+
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        lo = 0 if start is None else np.searchsorted(self.dates, start.to_datetime64(), side="left")
+        hi = len(self.dates) if end is None else np.searchsorted(self.dates, end.to_datetime64(), side="right")
+        hi = max(lo, hi)
+        mask = None
+        for col, selected in selections.items():
+            m = self._mask(col, selected, lo, hi)
+            if m is not None:
+                mask = m if mask is None else mask & m
+        rows = self.order[lo:hi]
+        if mask is not None:
+            rows = rows[mask]
+        result = FilterResult(self.frame, rows, (self.version,) + key)
+
+        with self._lock:
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
@@ -0,0 +1,43 @@
+import pandas as pd
+
+# Day-level cube over the transaction frame. Pages roll this up instead of
+# grouping raw transactions, so aggregation cost follows the number of
+# distinct keys rather than the number of transactions.
+CUBE_KEYS = ["product_name", "store_location", "category", "loyalty_level"]
+MEASURES = ["quantity_sold", "cost_of_goods", "transaction_count"]
+CUBE_COLUMNS = ["transaction_date"] + CUBE_KEYS + ["quantity_sold", "cost_of_goods"]
+
+
+def build_cube(df):
+    keys = [k for k in CUBE_KEYS if k in df.columns]
+    day = df["transaction_date"].dt.normalize().rename("day")
+    cube = df.groupby([day] + keys, observed=True, sort=True).agg(
+        quantity_sold=("quantity_sold", "sum"),
+        cost_of_goods=("cost_of_goods", "sum"),
+        transaction_count=("quantity_sold", "size")
+    ).reset_index()
+    return cube
+
+
+def rollup(cube, by=(), freq=None, **filters):
+    # freq: None for no time bucket, "D"/"M" for calendar periods, "W" for
+    # Sunday-ending weeks (same bins as pd.Grouper(freq='W') on raw rows).
+    # filters: equality filters on cube keys, e.g. product_name="TV".
+    for col, value in filters.items():
+        cube = cube[cube[col] == value]
+
+    keys = list(by)
+    if freq == "W":
+        keys = [pd.Grouper(key="day", freq="W")] + keys
+    elif freq is not None:
+        keys = [cube["day"].dt.to_period(freq)] + keys
+
+    if not keys:
+        return {m: cube[m].sum() for m in MEASURES}
+
+    out = cube.groupby(keys, observed=True)[MEASURES].sum().reset_index()
+    if freq is not None:
+        out = out.rename(columns={"day": "transaction_date"})
+        if freq != "W":
+            out["transaction_date"] = out["transaction_date"].dt.to_timestamp()
+    return out
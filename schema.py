@@ -0,0 +1,127 @@
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Declared in-memory dtypes of the transaction frame (cleaned_data.csv).
+# Every loader gets them through data_store.apply_types; pd.read_csv alone
+# gives int64/float64 for every number and strings for every label.
+#   labels      category: one code byte per row instead of a string
+#   integers    ids, codes and date parts: the narrowest int holding their
+#               domain with headroom. Quantities, stock levels and demand
+#               have no such bound and are int32. A value outside the type
+#               raises instead of wrapping around
+#   prices      unit_price is float32: two decimals below 131,072 survive
+#               the round trip to the cent. customer_income and
+#               cost_of_goods go past that and stay float64
+#   flags       nullable booleans, so a missing flag stays missing
+# The date parts (year, month, dayofweek, day_of_week, ...) are kept for
+# the models and cost a byte or two each.
+DATE_COLS = ["transaction_date"]
+CATEGORY_COLS = [
+    "product_name", "category", "store_location", "loyalty_level",
+    "customer_gender", "payment_method", "promotion_type", "weather_conditions"
+]
+BOOL_COLS = ["promotion_applied", "holiday_indicator", "stockout_indicator", "is_weekend"]
+BOOL_MAP = {"true": True, "false": False, "1": True, "0": False}
+INT_TYPES = {
+    "customer_id": "int32",
+    "product_id": "int16",
+    "quantity_sold": "int32",
+    "store_id": "int16",
+    "inventory_level": "int32",
+    "reorder_point": "int32",
+    "reorder_quantity": "int32",
+    "supplier_lead_time": "int32",
+    "customer_age": "int8",
+    "forecasted_demand": "int32",
+    "actual_demand": "int32",
+    "year": "int16",
+    "month": "int8",
+    "dayofweek": "int8",
+    "week": "int8",
+    "day": "int8",
+    "day_of_week": "int8",
+    "day_of_year": "int16",
+    "quarter": "int8",
+    "days_since_start": "int16",
+    "product_encoded": "int16",
+    "category_encoded": "int16",
+    "store_encoded": "int16",
+    "loyalty_encoded": "int8"
+}
+FLOAT_TYPES = {
+    "unit_price": "float32",
+    "customer_income": "float64",
+    "cost_of_goods": "float64"
+}
+TRANSACTIONS = {
+    **{c: "datetime64[us]" for c in DATE_COLS},
+    **{c: "category" for c in CATEGORY_COLS},
+    **{c: "boolean" for c in BOOL_COLS},
+    **INT_TYPES,
+    **FLOAT_TYPES
+}
+
+
+def cast_int(values, dtype, column):
+    info = np.iinfo(dtype)
+    if len(values) and (values.min() < info.min or values.max() > info.max):
+        raise ValueError(f"{column}: values between {values.min()} and {values.max()} do not fit {dtype}")
+    return values.astype(dtype)
+
+
+def apply_schema(df, schema=TRANSACTIONS):
+    # Casts the columns of `df` that the schema declares, in place; columns
+    # it does not know keep their dtype.
+    for c, dtype in schema.items():
+        if c not in df.columns or df[c].dtype == dtype:
+            continue
+        if c in DATE_COLS:
+            if not pd.api.types.is_datetime64_any_dtype(df[c]):
+                df[c] = pd.to_datetime(df[c])
+        elif dtype == "boolean" and df[c].dtype.kind not in "biu":
+            df[c] = df[c].astype(str).str.strip().str.lower().map(BOOL_MAP).astype(dtype)
+        elif dtype.startswith("int"):
+            df[c] = cast_int(df[c], dtype, c)
+        else:
+            df[c] = df[c].astype(dtype)
+    return df
+
+
+def memory_report(frames):
+    # frames: {label: DataFrame}. Bytes per column (strings and categories
+    # counted deeply) and per row for each frame, side by side.
+    columns = {}
+    for label, frame in frames.items():
+        usage = frame.memory_usage(index=False, deep=True)
+        columns[f"{label} dtype"] = frame.dtypes.astype(str)
+        columns[f"{label} B/row"] = usage / max(len(frame), 1)
+    report = pd.DataFrame(columns)
+    total = {f"{label} B/row": frame.memory_usage(index=False, deep=True).sum() / max(len(frame), 1)
+             for label, frame in frames.items()}
+    return pd.concat([report, pd.DataFrame(total, index=["total"])])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-column memory of the transaction frame, raw vs declared schema")
+    parser.add_argument("path", nargs="?", default="cleaned_data.csv")
+    args = parser.parse_args()
+
+    try:
+        raw = pd.read_csv(args.path)
+    except FileNotFoundError as e:
+        sys.exit(f"Missing file: {e.filename}")
+    frames = {
+        "object": raw.astype({c: object for c in raw.columns if raw[c].dtype == "str"}),
+        "read_csv": raw,
+        "schema": apply_schema(raw.copy())
+    }
+    report = memory_report(frames)
+    with pd.option_context("display.max_rows", None, "display.max_columns", None, "display.width", 200,
+                           "display.float_format", "{:.1f}".format):
+        print(report.fillna(""))
+    totals = report.loc["total"]
+    print(f"\n{len(raw):,} rows; schema is {totals['object B/row'] / totals['schema B/row']:.1f}x smaller per row "
+          f"than object strings, {totals['read_csv B/row'] / totals['schema B/row']:.1f}x than pd.read_csv")
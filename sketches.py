@@ -0,0 +1,292 @@
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from data_store import SOURCES, STORE_DIR, file_signature, read_table, replace_file
+
+# Mergeable per-customer sketches for Customer Analytics, one cell per
+# loyalty level x store x month:
+#   HyperLogLog  distinct customer_id; 2^precision one-byte registers.
+#                Merging is an element-wise max, so any split of the
+#                transactions (partitions, ingested batches) merges to
+#                exactly the registers of one pass
+#   t-digest     transaction value (cost_of_goods) quantiles; centroids
+#                sorted by mean, sized by the arcsine scale function so
+#                the tails stay fine-grained. Merging re-compresses the
+#                union of centroids; results agree within the digest error
+# Both have a fixed size whatever the number of transactions, so the page
+# answers "members" and "median/p90 spend" for any mix of cells from the
+# small file alone. The file is rebuilt when cleaned_data.csv is newer; an
+# ingested batch is merged into it (ingest.py).
+SKETCH_PATH = os.path.join(STORE_DIR, "customer_sketches.npz")
+CELL_KEYS = ["loyalty_level", "store_location", "month"]
+SKETCH_COLUMNS = ["customer_id", "loyalty_level", "store_location", "transaction_date", "cost_of_goods"]
+HLL_PRECISION = 12  # 4,096 registers: about 1.6% standard error
+COMPRESSION = 200  # about 100 centroids per digest
+
+
+def hash64(values):
+    # splitmix64 finalizer: the same id hashes the same in every process.
+    x = np.asarray(values).astype(np.uint64)
+    with np.errstate(over="ignore"):
+        x = (x + np.uint64(0x9E3779B97F4A7C15))
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _bit_length(x):
+    n = np.zeros(x.shape, dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = x >= (np.uint64(1) << np.uint64(shift))
+        n += high.astype(np.uint8) * shift
+        x = np.where(high, x >> np.uint64(shift), x)
+    return n + (x > 0)
+
+
+def hll_registers(hashes, cells, n_cells, precision=HLL_PRECISION):
+    # (n_cells, 2^precision) registers: the top bits pick the register, the
+    # position of the first 1 bit in the rest is the rank kept at its max.
+    m = 1 << precision
+    registers = np.zeros((n_cells, m), dtype=np.uint8)
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    rest = hashes & np.uint64((1 << (64 - precision)) - 1)
+    rank = (64 - precision + 1 - _bit_length(rest)).astype(np.uint8)
+    np.maximum.at(registers.reshape(-1), np.asarray(cells, dtype=np.int64) * m + index, rank)
+    return registers
+
+
+def hll_count(registers):
+    # Estimate per row of registers, with linear counting for small sets.
+    registers = np.atleast_2d(registers)
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.exp2(-registers.astype(float)).sum(axis=-1)
+    zeros = (registers == 0).sum(axis=-1)
+    small = (raw <= 2.5 * m) & (zeros > 0)
+    linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where(small, linear, raw)
+
+
+def compress(cells, means, weights, compression=COMPRESSION):
+    # t-digest compression of every cell's centroids at once: sort by
+    # (cell, mean), place each centroid at its quantile within the cell and
+    # merge those falling in the same unit of the scale function
+    # k(q) = compression / (2 pi) * asin(2q - 1).
+    order = np.lexsort((means, cells))
+    cells, means, weights = cells[order], means[order], weights[order]
+    if not len(cells):
+        return cells, means, weights
+    starts = np.flatnonzero(np.r_[True, cells[1:] != cells[:-1]])
+    sizes = np.diff(np.r_[starts, len(cells)])
+    totals = np.add.reduceat(weights, starts)
+    before = np.cumsum(weights) - np.repeat(np.cumsum(weights)[starts] - weights[starts], sizes)
+    q = (before - weights / 2) / np.repeat(totals, sizes)
+    k = np.floor(compression / (2 * np.pi) * np.arcsin(np.clip(2 * q - 1, -1, 1))).astype(np.int64)
+    new = np.flatnonzero(np.r_[True, (cells[1:] != cells[:-1]) | (k[1:] != k[:-1])])
+    merged = np.add.reduceat(weights, new)
+    return cells[new], np.add.reduceat(means * weights, new) / merged, merged
+
+
+def quantiles(means, weights, low, high, qs):
+    # Quantiles of one digest, interpolating between centroid centres and
+    # the observed min and max.
+    if not len(means):
+        return np.full(len(qs), np.nan)
+    total = weights.sum()
+    centres = np.cumsum(weights) - weights / 2
+    return np.interp(np.asarray(qs) * total, np.r_[0, centres, total], np.r_[low, means, high])
+
+
+class CustomerSketches:
+    def __init__(self, cells, registers, centroid_cell, centroid_mean, centroid_weight, low, high,
+                 compression=COMPRESSION):
+        # cells: one row per cell with CELL_KEYS, transactions and revenue;
+        # registers, low and high are in the same order.
+        self.cells = cells.reset_index(drop=True)
+        self.registers = registers
+        self.centroid_cell = centroid_cell
+        self.centroid_mean = centroid_mean
+        self.centroid_weight = centroid_weight
+        self.low = low
+        self.high = high
+        self.compression = compression
+
+    @classmethod
+    def from_transactions(cls, transactions, precision=HLL_PRECISION, compression=COMPRESSION):
+        if "customer_id" not in transactions.columns:
+            raise ValueError("transactions have no customer_id column")
+        keys = pd.DataFrame({
+            "loyalty_level": transactions["loyalty_level"].astype(str),
+            "store_location": transactions["store_location"].astype(str),
+            "month": pd.to_datetime(transactions["transaction_date"]).dt.strftime("%Y-%m")
+        })
+        cell = keys.groupby(CELL_KEYS, sort=True).ngroup().to_numpy()
+        value = transactions["cost_of_goods"].to_numpy(dtype=float)
+        cells = keys.drop_duplicates().sort_values(CELL_KEYS).reset_index(drop=True)
+        cells["transactions"] = np.bincount(cell, minlength=len(cells))
+        cells["revenue"] = np.bincount(cell, weights=value, minlength=len(cells))
+
+        low = np.full(len(cells), np.inf)
+        high = np.full(len(cells), -np.inf)
+        np.minimum.at(low, cell, value)
+        np.maximum.at(high, cell, value)
+        registers = hll_registers(hash64(transactions["customer_id"].to_numpy()), cell, len(cells), precision)
+        digest = compress(cell, value, np.ones(len(value)), compression)
+        return cls(cells, registers, *digest, low, high, compression)
+
+    def merge(self, other):
+        # Union of two sketch sets, e.g. history and an ingested batch.
+        both = pd.concat([self.cells, other.cells], ignore_index=True)
+        cell = both.groupby(CELL_KEYS, sort=True).ngroup().to_numpy()
+        cells = both.groupby(CELL_KEYS, sort=True, as_index=False)[["transactions", "revenue"]].sum()
+
+        registers = np.zeros((len(cells), self.registers.shape[1]), dtype=np.uint8)
+        np.maximum.at(registers, cell, np.concatenate([self.registers, other.registers]))
+        low = np.full(len(cells), np.inf)
+        high = np.full(len(cells), -np.inf)
+        np.minimum.at(low, cell, np.concatenate([self.low, other.low]))
+        np.maximum.at(high, cell, np.concatenate([self.high, other.high]))
+        digest = compress(
+            cell[np.concatenate([self.centroid_cell, other.centroid_cell + len(self.cells)])],
+            np.concatenate([self.centroid_mean, other.centroid_mean]),
+            np.concatenate([self.centroid_weight, other.centroid_weight]),
+            self.compression
+        )
+        return CustomerSketches(cells, registers, *digest, low, high, self.compression)
+
+    def summary(self, by="loyalty_level", qs=(0.5, 0.9), **filters):
+        # One row per value of `by` (None: a single total row) over the
+        # cells matching filters, e.g. store_location="Miami, FL" or
+        # month=["2024-01", "2024-02"]: transactions, revenue, distinct
+        # customers and transaction value quantiles.
+        keep = np.ones(len(self.cells), dtype=bool)
+        for key, value in filters.items():
+            if value is not None:
+                values = [value] if isinstance(value, str) else list(value)
+                keep &= self.cells[key].isin(values).to_numpy()
+        cells = self.cells[keep]
+        if by is None:
+            group = np.zeros(len(cells), dtype=np.int64)
+            labels = pd.DataFrame(index=[0])
+        else:
+            group, uniques = pd.factorize(cells[by], sort=True)
+            labels = pd.DataFrame({by: uniques})
+
+        n = len(labels) if len(cells) else 0
+        registers = np.zeros((n, self.registers.shape[1]), dtype=np.uint8)
+        np.maximum.at(registers, group, self.registers[keep])
+        group_of_cell = np.full(len(self.cells), -1)
+        group_of_cell[keep] = group
+        selected = group_of_cell[self.centroid_cell] >= 0
+        digest = compress(group_of_cell[self.centroid_cell][selected], self.centroid_mean[selected],
+                          self.centroid_weight[selected], self.compression)
+
+        out = labels.iloc[:n].copy()
+        out["transactions"] = np.bincount(group, weights=cells["transactions"], minlength=n).astype(np.int64)
+        out["revenue"] = np.bincount(group, weights=cells["revenue"], minlength=n)
+        # A cell cannot have more customers than transactions; small sets
+        # can estimate a little over.
+        out["customers"] = np.minimum(np.round(hll_count(registers)), out["transactions"]).astype(np.int64) if n else []
+        low = np.full(n, np.inf)
+        high = np.full(n, -np.inf)
+        np.minimum.at(low, group, self.low[keep])
+        np.maximum.at(high, group, self.high[keep])
+        for q in qs:
+            out[f"p{round(q * 100)}"] = np.nan
+        for g in range(n):
+            rows = digest[0] == g
+            out.iloc[g, -len(qs):] = quantiles(digest[1][rows], digest[2][rows], low[g], high[g], qs)
+        return out.reset_index(drop=True)
+
+    def save(self, path=SKETCH_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".npz")
+        os.close(fd)
+        try:
+            # Compressed: most registers of a small cell are still zero.
+            np.savez_compressed(
+                tmp,
+                **{key: self.cells[key].to_numpy(dtype=str) for key in CELL_KEYS},
+                transactions=self.cells["transactions"].to_numpy(),
+                revenue=self.cells["revenue"].to_numpy(),
+                registers=self.registers,
+                centroid_cell=self.centroid_cell,
+                centroid_mean=self.centroid_mean,
+                centroid_weight=self.centroid_weight,
+                low=self.low,
+                high=self.high,
+                compression=np.array(self.compression)
+            )
+            replace_file(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return path
+
+
+def signature():
+    return file_signature(SOURCES["cleaned_data"])
+
+
+def is_fresh(path=SKETCH_PATH):
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(SOURCES["cleaned_data"])
+
+
+def build(path=SKETCH_PATH):
+    sketches = CustomerSketches.from_transactions(read_table("cleaned_data", SKETCH_COLUMNS))
+    sketches.save(path)
+    return sketches
+
+
+def load(path=SKETCH_PATH):
+    if not is_fresh(path):
+        return build(path)
+    with np.load(path) as arrays:
+        cells = pd.DataFrame({key: arrays[key].astype(object) for key in CELL_KEYS})
+        cells["transactions"] = arrays["transactions"]
+        cells["revenue"] = arrays["revenue"]
+        return CustomerSketches(cells, arrays["registers"], arrays["centroid_cell"], arrays["centroid_mean"],
+                                arrays["centroid_weight"], arrays["low"], arrays["high"],
+                                int(arrays["compression"]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the Customer Analytics sketches and check them against "
+                                                 "exact figures")
+    parser.add_argument("--partitions", type=int, default=1,
+                        help="build from this many slices of the transactions and merge them")
+    args = parser.parse_args()
+
+    try:
+        transactions = read_table("cleaned_data", SKETCH_COLUMNS)
+    except FileNotFoundError as e:
+        sys.exit(f"Missing file: {e.filename}")
+    except KeyError:
+        sys.exit(f"{SOURCES['cleaned_data']} has no customer_id column; rerun pipeline.py")
+    parts = np.array_split(np.arange(len(transactions)), args.partitions)
+    sketches = CustomerSketches.from_transactions(transactions.iloc[parts[0]])
+    for rows in parts[1:]:
+        sketches = sketches.merge(CustomerSketches.from_transactions(transactions.iloc[rows]))
+    sketches.save()
+
+    exact = transactions.groupby("loyalty_level", observed=True).agg(
+        exact_customers=("customer_id", "nunique"),
+        exact_p50=("cost_of_goods", "median"),
+        exact_p90=("cost_of_goods", lambda v: v.quantile(0.9))
+    ).reset_index().astype({"loyalty_level": str})
+    report = sketches.summary().merge(exact, on="loyalty_level")
+    total = sketches.summary(by=None)
+    print(f"{SKETCH_PATH}: {len(sketches.cells)} cells, {len(sketches.centroid_mean):,} centroids, "
+          f"{os.path.getsize(SKETCH_PATH) / 1e3:.0f} kB, from {args.partitions} partition(s)")
+    with pd.option_context("display.width", 200, "display.float_format", "{:,.2f}".format):
+        print(report[["loyalty_level", "transactions", "customers", "exact_customers", "p50", "exact_p50", "p90",
+                      "exact_p90"]].to_string(index=False))
+    print(f"all levels: {int(total['customers'][0]):,} customers (exact "
+          f"{transactions['customer_id'].nunique():,}), median ${total['p50'][0]:,.2f} (exact "
+          f"${transactions['cost_of_goods'].median():,.2f}), p90 ${total['p90'][0]:,.2f} (exact "
+          f"${transactions['cost_of_goods'].quantile(0.9):,.2f})")
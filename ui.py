@@ -1,13 +1,18 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
 import warnings
 import calendar
 
+from data_store import file_signature, shared, shared_csv, shared_table, snapshot, table_signature
+from rollup import CUBE_COLUMNS, build_cube, rollup
+from diagnostics import finish_run, panel_enabled, section, start_run, timed
+
+# plotly and the page-specific modules (forecast_cube, query, export) are
+# imported where a page first needs them, after its first elements have
+# been sent; a page that does not use them never imports them.
+
 warnings.filterwarnings("ignore")
 
 st.set_page_config(
@@ -54,42 +59,135 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data
-def load_data():
+# Not st.cache_data: that hands every rerun its own unpickled copy. The
+# shared layer in data_store keeps one read-only copy per process and
+# reloads it when the file changes. Each page loads only the artifacts it
+# reads (see "Load data" below).
+@timed("load_table")
+def load_table(name):
     try:
-        df = pd.read_csv("cleaned_data.csv")
-        df["transaction_date"] = pd.to_datetime(df["transaction_date"])
-        
-        daily_sales = pd.read_csv("daily_sales.csv")
-        daily_sales["transaction_date"] = pd.to_datetime(daily_sales["transaction_date"])
-        
-        forecast = pd.read_csv("forecast_2025.csv")
-        forecast["transaction_date"] = pd.to_datetime(forecast["transaction_date"])
-        
-        product_ranking = pd.read_csv("product_ranking.csv")
-        model_comparison = pd.read_csv("model_comparison.csv")
-        product_ratios = pd.read_csv("product_ratios.csv")
-        
-        try:
-            store_ratios = pd.read_csv("store_ratios.csv")
-        except:
-            store_ratios = None
-            
-        try:
-            loyalty_analysis = pd.read_csv("loyalty_analysis.csv")
-        except:
-            loyalty_analysis = None
-        
-        return df, daily_sales, forecast, product_ranking, model_comparison, product_ratios, store_ratios, loyalty_analysis
+        return shared_table(name)
+    except FileNotFoundError as e:
+        st.error(f"Missing file: {e}")
+        st.stop()
+
+@timed("load_csv")
+def load_csv(path, optional=False):
+    try:
+        return shared_csv(path)
+    except FileNotFoundError as e:
+        if optional:
+            return None
+        st.error(f"Missing file: {e}")
+        st.stop()
+
+@timed("load_summary")
+def load_summary():
+    # Sidebar figures from the two small daily and product files, so pages
+    # that do not read transactions never load them.
+    daily = load_table("daily_sales")
+    sold = daily.loc[daily["transaction_count"] > 0, "transaction_date"]
+    return {
+        "first_day": sold.min(),
+        "last_day": sold.max(),
+        "products": len(load_csv("product_ratios.csv")),
+        "transactions": int(daily["transaction_count"].sum())
+    }
+
+@timed("load_forecast_cube")
+def load_forecast_cube():
+    # Precomputed 2025 forecast (forecast_cube.py), rebuilt when an input
+    # file changes; one copy per process.
+    import forecast_cube
+    
+    try:
+        return shared(("forecast_cube",), forecast_cube.signature(), forecast_cube.load)
+    except FileNotFoundError as e:
+        st.error(f"Missing file: {e}")
+        st.stop()
+
+@timed("load_uplift")
+def load_uplift():
+    # Promotion/holiday/weather/weekend factors (uplift.py); optional.
+    import uplift
+    
+    try:
+        return shared(("uplift",), file_signature(uplift.UPLIFT_PATH), uplift.load)
+    except FileNotFoundError:
+        return None
+
+@timed("load_residuals")
+def load_residuals():
+    # Residuals of the served forecast behind its prediction intervals
+    # (intervals.py); optional.
+    import intervals
+    
+    try:
+        return shared(("forecast_residuals",), intervals.signature(), intervals.load)
+    except (FileNotFoundError, KeyError):
+        return None
+
+@timed("load_customer_sketches")
+def load_customer_sketches():
+    # Distinct customers and spend quantiles per loyalty level x store x
+    # month (sketches.py); None when transactions carry no customer_id.
+    import sketches
+    
+    try:
+        return shared(("customer_sketches",), sketches.signature(), sketches.load)
+    except (FileNotFoundError, KeyError, ValueError):
+        return None
+
+@timed("load_monitor")
+def load_monitor():
+    # Running forecast-error sums per product x store x week (monitor.py);
+    # optional.
+    import monitor
     
+    try:
+        return shared(("forecast_monitor",), file_signature(monitor.MONITOR_PATH), monitor.load)
+    except FileNotFoundError:
+        return None
+
+@timed("load_transaction_index")
+def load_transaction_index():
+    # Full transaction frame plus its filter indexes, shared by all sessions.
+    from query import TransactionIndex
+    
+    try:
+        return shared(("index", "cleaned_data"), table_signature("cleaned_data"),
+                      lambda: TransactionIndex(shared_table("cleaned_data")))
     except FileNotFoundError as e:
         st.error(f"Missing file: {e}")
         st.stop()
 
-df, daily_sales, forecast, product_ranking, model_comparison, product_ratios, store_ratios, loyalty_analysis = load_data()
+@timed("load_stock_state")
+def load_stock_state():
+    # Latest stock and reorder policy per product x store (inventory.py).
+    from inventory import STOCK_COLUMNS, sku_state
+    
+    try:
+        return shared(("stock_state", "cleaned_data"), table_signature("cleaned_data"),
+                      lambda: sku_state(shared_table("cleaned_data", STOCK_COLUMNS)))
+    except FileNotFoundError as e:
+        st.error(f"Missing file: {e}")
+        st.stop()
 
-has_store = 'store_location' in df.columns and store_ratios is not None
-has_loyalty = loyalty_analysis is not None
+@st.cache_resource
+def load_export_cache():
+    from export import ExportCache
+    
+    return ExportCache()
+
+@timed("load_rollup")
+def load_rollup():
+    try:
+        cube = shared(("rollup", "cleaned_data"), table_signature("cleaned_data"),
+                      lambda: build_cube(shared_table("cleaned_data", CUBE_COLUMNS)))
+        return cube.copy(deep=False)
+    except FileNotFoundError as e:
+        st.error(f"Missing file: {e}")
+        st.stop()
 
 st.sidebar.image("https://upload.wikimedia.org/wikipedia/commons/b/b1/Walmart_logo_%282008%29.svg", width=200)
 st.sidebar.title("Navigation")
@@ -100,426 +198,567 @@ page = st.sidebar.radio(
      "Overview",
      "Customer Analytics",
      "Model Performance",
-     "Data Explorer"]
+     "Data Explorer",
+     "Inventory Planning"]
 )
 
-st.sidebar.markdown("---")
-st.sidebar.info(f"""
+start_run(page)
+# The page runs in try/finally so that finish_run() ends this rerun's
+# timing and profiling even when st.stop(), a rerun request or an
+# exception cuts it short.
+try:
+    section("Load data")
+    # Only the artifacts this page reads, all from one data version (see
+    # ingest.py). Model Performance and Customer Analytics never touch the
+    # transaction table.
+    with snapshot():
+        summary = load_summary()
+        if page == "Quick Prediction":
+            cube = load_rollup()
+            prediction_cube = load_forecast_cube()
+            store_ratios = load_csv("store_ratios.csv", optional=True)
+            uplift_table = load_uplift()
+            residuals = load_residuals()
+        elif page == "Overview":
+            cube = load_rollup()
+            daily_sales = load_table("daily_sales")
+            product_ranking = load_csv("product_ranking.csv")
+        elif page == "Customer Analytics":
+            loyalty_analysis = load_csv("loyalty_analysis.csv", optional=True)
+            customer_sketches = load_customer_sketches()
+        elif page == "Model Performance":
+            model_comparison = load_csv("model_comparison.csv")
+            forecast_monitor = load_monitor()
+        elif page == "Data Explorer":
+            index = load_transaction_index()
+            forecast = load_table("forecast_2025")
+            product_ranking = load_csv("product_ranking.csv")
+            store_ratios = load_csv("store_ratios.csv", optional=True)
+        elif page == "Inventory Planning":
+            prediction_cube = load_forecast_cube()
+            stock_state = load_stock_state()
+
+    section("Sidebar")
+    st.sidebar.markdown("---")
+    st.sidebar.info(f"""
 **Data Period**  
-{df['transaction_date'].min().strftime('%b %d, %Y')} to  
-{df['transaction_date'].max().strftime('%b %d, %Y')}
+{summary['first_day'].strftime('%b %d, %Y')} to  
+{summary['last_day'].strftime('%b %d, %Y')}
 
-**Products:** {df['product_name'].nunique()}  
-**Transactions:** {len(df):,}
+**Products:** {summary['products']}  
+**Transactions:** {summary['transactions']:,}
 """)
 
-if page == "Quick Prediction":
-    st.markdown('<h1 class="main-header">Sales Prediction Tool</h1>', unsafe_allow_html=True)
-    
-    st.markdown("""
+    if page == "Quick Prediction":
+        section("Quick Prediction: configuration")
+        st.markdown('<h1 class="main-header">Sales Prediction Tool</h1>', unsafe_allow_html=True)
+        
+        st.markdown("""
     <div class="prediction-box">
     <h3>Generate Custom Sales Forecast</h3>
     <p>Select product, location, and forecast period (Jan-Sep 2025)</p>
     </div>
     """, unsafe_allow_html=True)
-    
-    if 'show_prediction' not in st.session_state:
-        st.session_state.show_prediction = False
-    if 'last_product' not in st.session_state:
-        st.session_state.last_product = None
-    if 'last_store' not in st.session_state:
-        st.session_state.last_store = None
-    if 'last_months' not in st.session_state:
-        st.session_state.last_months = 3
-    
-    col1, col2 = st.columns([1, 1])
-    
-    with col1:
-        st.subheader("Configuration")
-        
-        selected_product = st.selectbox(
-            "Select Product:",
-            options=sorted(df['product_name'].unique()),
-            key='product_select'
-        )
-        
-        if has_store:
-            selected_store = st.selectbox(
-                "Select Store Location:",
-                options=sorted(df['store_location'].unique()),
-                key='store_select'
-            )
-        else:
-            selected_store = None
-            st.info("Store location not available")
-        
-        st.write("**Forecast Period (2025):**")
-        
-        month_options = {
-            "January only (1 month)": 1,
-            "January - February (2 months)": 2,
-            "January - March (Q1 - 3 months)": 3,
-            "January - April (4 months)": 4,
-            "January - May (5 months)": 5,
-            "January - June (H1 - 6 months)": 6,
-            "January - July (7 months)": 7,
-            "January - August (8 months)": 8,
-            "January - September (Full 9 months)": 9
-        }
-        
-        selected_period = st.selectbox(
-            "Select forecast period:",
-            options=list(month_options.keys()),
-            index=2,
-            key='period_select'
-        )
-        
-        forecast_months = month_options[selected_period]
-        
-        st.markdown("---")
-        st.write("**Scenario Adjustment (Promotion Period):**")
-        demand_multiplier = st.slider(
-            "Adjust forecast by percentage:",
-            min_value=50,
-            max_value=200,
-            value=100,
-            step=10,
-            help="100% = baseline forecast, 150% = optimistic scenario"
-        ) / 100.0
-        
-        if demand_multiplier != 1.0:
-            st.caption(f"Showing {demand_multiplier*100:.0f}% scenario")
-        
-        if st.button("Generate Prediction", type="primary", use_container_width=True):
-            st.session_state.show_prediction = True
-            st.session_state.last_product = selected_product
-            st.session_state.last_store = selected_store
-            st.session_state.last_months = forecast_months
-            st.session_state.last_multiplier = demand_multiplier
-    
-    with col2:
-        st.subheader("Historical Performance")
-        product_hist = df[df['product_name'] == selected_product]
-        
-        col_a, col_b = st.columns(2)
-        col_a.metric("Total Sales", f"${product_hist['cost_of_goods'].sum():,.0f}")
-        col_b.metric("Units Sold", f"{product_hist['quantity_sold'].sum():,}")
-        
-        col_c, col_d = st.columns(2)
-        col_c.metric("Avg Price", f"${product_hist['cost_of_goods'].mean():.2f}")
-        col_d.metric("Transactions", f"{len(product_hist):,}")
-        
-        monthly_hist = product_hist.groupby(
-            product_hist['transaction_date'].dt.to_period('M')
-        )['cost_of_goods'].sum().reset_index()
-        monthly_hist['transaction_date'] = monthly_hist['transaction_date'].dt.to_timestamp()
-        
-        if len(monthly_hist) > 0:
-            fig = px.line(monthly_hist, x='transaction_date', y='cost_of_goods',
-                         title=f'Historical Trend - {selected_product}')
-            fig.update_traces(line_color='#0071ce', line_width=2)
-            fig.update_layout(height=250, showlegend=False)
-            st.plotly_chart(fig, use_container_width=True)
-    
-    if st.session_state.show_prediction:
-        st.markdown("---")
-        
-        pred_product = st.session_state.last_product
-        pred_store = st.session_state.last_store
-        pred_months = st.session_state.last_months
-        pred_multiplier = st.session_state.last_multiplier
-        
-        st.subheader(f"Forecast: {pred_product}")
         
-        caption_parts = [f"{calendar.month_name[1]} - {calendar.month_name[pred_months]} 2025"]
-        if pred_store:
-            caption_parts.append(f"Store: {pred_store}")
-        if pred_multiplier != 1.0:
-            caption_parts.append(f"{pred_multiplier*100:.0f}% scenario")
+        if 'show_prediction' not in st.session_state:
+            st.session_state.show_prediction = False
+        if 'last_product' not in st.session_state:
+            st.session_state.last_product = None
+        if 'last_store' not in st.session_state:
+            st.session_state.last_store = None
+        if 'last_months' not in st.session_state:
+            st.session_state.last_months = 3
+        if 'last_method' not in st.session_state:
+            st.session_state.last_method = "Regression model"
+        if 'last_scenario' not in st.session_state:
+            st.session_state.last_scenario = {}
+        if 'last_calibrated_weekend' not in st.session_state:
+            st.session_state.last_calibrated_weekend = False
         
-        st.caption(" | ".join(caption_parts))
+        col1, col2 = st.columns([1, 1])
         
-        product_ratio_row = product_ratios[product_ratios['product_name'] == pred_product]
-        
-        if len(product_ratio_row) > 0:
-            qty_ratio = product_ratio_row['qty_ratio'].values[0]
-            cog_ratio = product_ratio_row['cog_ratio'].values[0]
+        with col1:
+            st.subheader("Configuration")
             
-            start_date = datetime(2025, 1, 1)
+            selected_product = st.selectbox(
+                "Select Product:",
+                options=sorted(cube['product_name'].unique()),
+                key='product_select'
+            )
             
-            if pred_months == 12:
-                end_date = datetime(2025, 12, 31)
+            if store_ratios is not None:
+                selected_store = st.selectbox(
+                    "Select Store Location:",
+                    options=sorted(cube['store_location'].unique()),
+                    key='store_select'
+                )
             else:
-                year = 2025
-                month = pred_months
-                last_day = calendar.monthrange(year, month)[1]
-                end_date = datetime(year, month, last_day)
-            
-            future_dates = pd.date_range(start=start_date, end=end_date, freq='D')
-            
-            daily_avg_qty = daily_sales['quantity_sold'].tail(30).mean()
-            daily_avg_cog = daily_sales['cost_of_goods'].tail(30).mean()
-            
-            pred_df = pd.DataFrame({
-                'date': future_dates,
-                'predicted_quantity': daily_avg_qty * qty_ratio * pred_multiplier,
-                'predicted_revenue': daily_avg_cog * cog_ratio * pred_multiplier
-            })
-            
-            if pred_store and store_ratios is not None:
-                store_ratio_row = store_ratios[store_ratios['store_location'] == pred_store]
-                if len(store_ratio_row) > 0:
-                    store_ratio = store_ratio_row['cog_ratio'].values[0]
-                    pred_df['predicted_revenue'] *= store_ratio
-                    pred_df['predicted_quantity'] *= store_ratio
-            
-            pred_df['day_of_week'] = pred_df['date'].dt.dayofweek
-            pred_df['is_weekend'] = pred_df['day_of_week'].isin([5, 6])
-            pred_df.loc[pred_df['is_weekend'], 'predicted_revenue'] *= 1.2
-            pred_df.loc[pred_df['is_weekend'], 'predicted_quantity'] *= 1.2
+                selected_store = None
+                st.info("Store location not available")
             
-            col1, col2, col3 = st.columns(3)
-            col1.metric("Total Units", f"{pred_df['predicted_quantity'].sum():,.0f}")
-            col2.metric("Total Revenue", f"${pred_df['predicted_revenue'].sum():,.2f}")
-            col3.metric("Daily Avg", f"${pred_df['predicted_revenue'].mean():.2f}")
+            st.write("**Forecast Period (2025):**")
             
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(
-                x=pred_df['date'],
-                y=pred_df['predicted_revenue'],
-                mode='lines',
-                name='Revenue',
-                line=dict(color='#0071ce', width=2),
-                fill='tozeroy',
-                fillcolor='rgba(0, 113, 206, 0.2)'
-            ))
-            fig.update_layout(
-                title=f"Daily Revenue Forecast ({pred_months} months)",
-                xaxis_title="Date",
-                yaxis_title="Revenue ($)",
-                height=400,
-                hovermode='x unified'
+            month_options = {
+                "January only (1 month)": 1,
+                "January - February (2 months)": 2,
+                "January - March (Q1 - 3 months)": 3,
+                "January - April (4 months)": 4,
+                "January - May (5 months)": 5,
+                "January - June (H1 - 6 months)": 6,
+                "January - July (7 months)": 7,
+                "January - August (8 months)": 8,
+                "January - September (Full 9 months)": 9
+            }
+            
+            selected_period = st.selectbox(
+                "Select forecast period:",
+                options=list(month_options.keys()),
+                index=2,
+                key='period_select'
             )
-            st.plotly_chart(fig, use_container_width=True)
             
-            pred_df['month'] = pred_df['date'].dt.month
-            pred_df['month_name'] = pred_df['date'].dt.strftime('%B %Y')
-            monthly_summary = pred_df.groupby('month_name').agg({
-                'predicted_quantity': 'sum',
-                'predicted_revenue': 'sum'
-            }).reset_index()
+            forecast_months = month_options[selected_period]
             
-            st.subheader("Monthly Breakdown")
-            st.dataframe(
-                monthly_summary.style.format({
-                    'predicted_quantity': '{:,.0f}',
-                    'predicted_revenue': '${:,.2f}'
-                }),
-                column_config={
-                    'month_name': 'Month',
-                    'predicted_quantity': 'Units',
-                    'predicted_revenue': 'Revenue'
-                },
-                hide_index=True,
-                use_container_width=True
+            forecast_method = st.radio(
+                "Forecast baseline:",
+                ["Regression model", "Trailing 30-day average"],
+                horizontal=True,
+                help="Regression model = best_qty_model.pkl, scored as Served Model in Model Performance"
             )
             
-            csv = pred_df.to_csv(index=False).encode('utf-8')
-            st.download_button(
-                label="Download Forecast",
-                data=csv,
-                file_name=f"forecast_{pred_product}_{pred_months}months_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv"
-            )
+            st.markdown("---")
+            st.write("**Scenario Adjustment (Promotion Period):**")
+            demand_multiplier = st.slider(
+                "Adjust forecast by percentage:",
+                min_value=50,
+                max_value=200,
+                value=100,
+                step=10,
+                help="100% = baseline forecast, 150% = optimistic scenario"
+            ) / 100.0
+            
+            if demand_multiplier != 1.0:
+                st.caption(f"Showing {demand_multiplier*100:.0f}% scenario")
+            
+            scenario = {}
+            calibrated_weekend = False
+            if uplift_table is not None:
+                from forecast import WEEKEND_UPLIFT
+                
+                with st.expander("Conditions (factors from sales history)"):
+                    for effect, label in [("promotion", "Promotion:"), ("holiday", "Holiday:"), ("weather", "Weather:")]:
+                        choice = st.selectbox(label, ["Typical mix"] + uplift_table.levels[effect], key=f'uplift_{effect}')
+                        scenario[effect] = None if choice == "Typical mix" else choice
+                    weekend_effect = st.radio(
+                        "Weekend effect:",
+                        [f"Fixed +{(WEEKEND_UPLIFT - 1) * 100:.0f}%", "From sales history"],
+                        horizontal=True,
+                        help="From sales history = each product and store's own weekday and weekend demand"
+                    )
+                    calibrated_weekend = weekend_effect == "From sales history"
+            
+            if st.button("Generate Prediction", type="primary", use_container_width=True):
+                st.session_state.show_prediction = True
+                st.session_state.last_product = selected_product
+                st.session_state.last_store = selected_store
+                st.session_state.last_months = forecast_months
+                st.session_state.last_multiplier = demand_multiplier
+                st.session_state.last_method = forecast_method
+                st.session_state.last_scenario = scenario
+                st.session_state.last_calibrated_weekend = calibrated_weekend
+        
+        with col2:
+            section("Quick Prediction: history")
+            st.subheader("Historical Performance")
+            product_hist = rollup(cube, product_name=selected_product)
+            
+            col_a, col_b = st.columns(2)
+            col_a.metric("Total Sales", f"${product_hist['cost_of_goods']:,.0f}")
+            col_b.metric("Units Sold", f"{product_hist['quantity_sold']:,}")
+            
+            col_c, col_d = st.columns(2)
+            col_c.metric("Avg Price", f"${product_hist['cost_of_goods'] / product_hist['transaction_count']:.2f}")
+            col_d.metric("Transactions", f"{product_hist['transaction_count']:,}")
+            
+            monthly_hist = rollup(cube, freq="M", product_name=selected_product)
+            
+            if len(monthly_hist) > 0:
+                import plotly.express as px
+                
+                fig = px.line(monthly_hist, x='transaction_date', y='cost_of_goods',
+                             title=f'Historical Trend - {selected_product}')
+                fig.update_traces(line_color='#0071ce', line_width=2)
+                fig.update_layout(height=250, showlegend=False)
+                st.plotly_chart(fig, use_container_width=True)
+        
+        if st.session_state.show_prediction:
+            st.markdown("---")
+            
+            pred_product = st.session_state.last_product
+            pred_store = st.session_state.last_store
+            pred_months = st.session_state.last_months
+            pred_multiplier = st.session_state.last_multiplier
+            pred_method = st.session_state.last_method
+            pred_scenario = st.session_state.last_scenario
+            pred_calibrated_weekend = st.session_state.last_calibrated_weekend
+            
+            section("Quick Prediction: forecast")
+            st.subheader(f"Forecast: {pred_product}")
+            
+            caption_parts = [f"{calendar.month_name[1]} - {calendar.month_name[pred_months]} 2025"]
+            if pred_store:
+                caption_parts.append(f"Store: {pred_store}")
+            if pred_multiplier != 1.0:
+                caption_parts.append(f"{pred_multiplier*100:.0f}% scenario")
+            caption_parts.extend(level for level in pred_scenario.values() if level is not None)
+            if pred_calibrated_weekend:
+                caption_parts.append("Weekend effect from sales history")
+            caption_parts.append(pred_method)
+            
+            st.caption(" | ".join(caption_parts))
+            
+            method = "model" if pred_method == "Regression model" else "trailing"
+            if method == "model" and prediction_cube.model_error:
+                st.warning(f"Model unavailable, using trailing average: {prediction_cube.model_error}")
+            
+            # Condition factors are looked up for this product and store and
+            # folded into the multiplier (per day for the weekend effect).
+            multiplier = pred_multiplier
+            if uplift_table is not None and (any(pred_scenario.values()) or pred_calibrated_weekend):
+                multiplier = pred_multiplier * uplift_table.scale(
+                    pred_product, pred_store, pred_scenario,
+                    prediction_cube.days['is_weekend'].to_numpy(), pred_calibrated_weekend
+                )
+            selection = (method, pred_product, pred_store, pred_months, multiplier)
+            pred_df = prediction_cube.forecast(*selection)
+            
+            if pred_df is not None:
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Total Units", f"{pred_df['predicted_quantity'].sum():,.0f}")
+                col2.metric("Total Revenue", f"${pred_df['predicted_revenue'].sum():,.2f}")
+                col3.metric("Daily Avg", f"${pred_df['predicted_revenue'].mean():.2f}")
+                
+                # P10/P50/P90 from 1,000 bootstrap paths of this forecast
+                # (intervals.py), one vectorized draw for every day and month.
+                bands = None
+                if residuals is not None and pred_product in residuals.products:
+                    bands = residuals.intervals(
+                        [(pred_product, pred_store)],
+                        pred_df['predicted_quantity'].to_numpy()[None, :],
+                        pred_df['predicted_revenue'].to_numpy()[None, :],
+                        pred_df['is_weekend'].to_numpy(),
+                        "trailing" if prediction_cube.model_error else method,
+                        month_offsets=prediction_cube.month_offsets
+                    )["revenue"]
+                    col1, col2, col3 = st.columns(3)
+                    col1.metric("Revenue P10", f"${bands['total'][0, 0]:,.2f}")
+                    col2.metric("Revenue P50", f"${bands['total'][1, 0]:,.2f}")
+                    col3.metric("Revenue P90", f"${bands['total'][2, 0]:,.2f}")
+                
+                import plotly.graph_objects as go
+                
+                fig = go.Figure()
+                fig.add_trace(go.Scatter(
+                    x=pred_df['date'],
+                    y=pred_df['predicted_revenue'],
+                    mode='lines',
+                    name='Revenue',
+                    line=dict(color='#0071ce', width=2),
+                    fill='tozeroy',
+                    fillcolor='rgba(0, 113, 206, 0.2)'
+                ))
+                if bands is not None:
+                    fig.add_trace(go.Scatter(
+                        x=pred_df['date'],
+                        y=bands['daily'][0, 0],
+                        mode='lines',
+                        name='P10',
+                        line=dict(width=0),
+                        showlegend=False
+                    ))
+                    fig.add_trace(go.Scatter(
+                        x=pred_df['date'],
+                        y=bands['daily'][2, 0],
+                        mode='lines',
+                        name='P10-P90',
+                        line=dict(width=0),
+                        fill='tonexty',
+                        fillcolor='rgba(255, 194, 32, 0.3)'
+                    ))
+                fig.update_layout(
+                    title=f"Daily Revenue Forecast ({pred_months} months)",
+                    xaxis_title="Date",
+                    yaxis_title="Revenue ($)",
+                    height=400,
+                    hovermode='x unified'
+                )
+                st.plotly_chart(fig, use_container_width=True)
+                
+                monthly_summary = prediction_cube.monthly(*selection)
+                if bands is not None:
+                    monthly_summary['revenue_p10'] = bands['monthly'][0, 0]
+                    monthly_summary['revenue_p90'] = bands['monthly'][2, 0]
+                
+                section("Quick Prediction: monthly breakdown")
+                st.subheader("Monthly Breakdown")
+                st.dataframe(
+                    monthly_summary.style.format({
+                        'predicted_quantity': '{:,.0f}',
+                        'predicted_revenue': '${:,.2f}',
+                        'revenue_p10': '${:,.2f}',
+                        'revenue_p90': '${:,.2f}'
+                    }),
+                    column_config={
+                        'month_name': 'Month',
+                        'predicted_quantity': 'Units',
+                        'predicted_revenue': 'Revenue',
+                        'revenue_p10': 'Revenue P10',
+                        'revenue_p90': 'Revenue P90'
+                    },
+                    hide_index=True,
+                    use_container_width=True
+                )
+                
+                # Keyed by the cube's and the factors' inputs too: the export
+                # cache outlives an ingest.
+                import forecast_cube
+                import uplift
+                
+                factors_version = None if uplift_table is None else file_signature(uplift.UPLIFT_PATH)
+                export_key = ("prediction", forecast_cube.signature(), factors_version, pred_product, pred_store,
+                              pred_months, pred_multiplier, pred_method, tuple(sorted(pred_scenario.items())),
+                              pred_calibrated_weekend)
+                st.download_button(
+                    label="Download Forecast",
+                    data=load_export_cache().opener(export_key, pred_df),
+                    file_name=f"forecast_{pred_product}_{pred_months}months_{datetime.now().strftime('%Y%m%d')}.csv",
+                    mime="text/csv"
+                )
 
-elif page == "Overview":
-    st.markdown('<h1 class="main-header">Business Overview</h1>', unsafe_allow_html=True)
-    
-    col1, col2, col3, col4 = st.columns(4)
-    
-    total_sales = df["cost_of_goods"].sum()
-    total_qty = df["quantity_sold"].sum()
-    total_txn = len(df)
-    avg_txn = df["cost_of_goods"].mean()
-    
-    with col1:
-        st.metric("Total Revenue", f"${total_sales:,.0f}")
-    with col2:
-        st.metric("Units Sold", f"{total_qty:,}")
-    with col3:
-        st.metric("Transactions", f"{total_txn:,}")
-    with col4:
-        st.metric("Avg Transaction", f"${avg_txn:.2f}")
-    
-    st.markdown("---")
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.subheader("Revenue by Category")
-        category_sales = df.groupby("category")["cost_of_goods"].sum().reset_index()
-        fig = px.pie(
-            category_sales,
-            values="cost_of_goods",
-            names="category",
-            color_discrete_sequence=['#0071ce', '#ffc220'],
-            hole=0.4
-        )
-        fig.update_traces(textposition='inside', textinfo='percent+label')
-        fig.update_layout(height=350, showlegend=True)
-        st.plotly_chart(fig, use_container_width=True)
-    
-    with col2:
-        st.subheader("Top Products")
-        top5 = product_ranking.head(5)
-        fig = px.bar(
-            top5,
-            x="total_revenue",
-            y="product_name",
-            orientation="h",
-            color="total_revenue",
-            color_continuous_scale="Blues",
-            text="total_revenue"
-        )
-        fig.update_traces(texttemplate="$%{text:,.0f}", textposition="outside")
-        fig.update_yaxes(categoryorder="total ascending")
-        fig.update_layout(height=350, showlegend=False)
-        st.plotly_chart(fig, use_container_width=True)
-    
-    st.markdown("---")
-    
-    st.subheader("Sales Trend")
-    
-    trend_view = st.radio("View by:", ["Monthly", "Weekly", "Daily"], horizontal=True)
-    
-    if trend_view == "Monthly":
-        trend_data = df.groupby(df["transaction_date"].dt.to_period("M")).agg({
-            "cost_of_goods": "sum",
-            "quantity_sold": "sum"
-        }).reset_index()
-        trend_data["transaction_date"] = trend_data["transaction_date"].dt.to_timestamp()
-        x_label = "Month"
-    elif trend_view == "Weekly":
-        trend_data = df.groupby(pd.Grouper(key='transaction_date', freq='W')).agg({
-            "cost_of_goods": "sum",
-            "quantity_sold": "sum"
-        }).reset_index()
-        x_label = "Week"
-    else:
-        trend_data = daily_sales[['transaction_date', 'cost_of_goods', 'quantity_sold']].copy()
-        x_label = "Date"
-    
-    fig = make_subplots(rows=1, cols=2, subplot_titles=("Revenue ($)", "Units Sold"))
-    
-    fig.add_trace(
-        go.Scatter(
-            x=trend_data["transaction_date"],
-            y=trend_data["cost_of_goods"],
-            mode="lines+markers",
-            name="Revenue",
-            line=dict(color="#0071ce", width=2),
-            marker=dict(size=6)
-        ),
-        row=1, col=1
-    )
-    
-    fig.add_trace(
-        go.Scatter(
-            x=trend_data["transaction_date"],
-            y=trend_data["quantity_sold"],
-            mode="lines+markers",
-            name="Units",
-            line=dict(color="#ffc220", width=2),
-            marker=dict(size=6)
-        ),
-        row=1, col=2
-    )
-    
-    fig.update_xaxes(title_text=x_label, row=1, col=1)
-    fig.update_xaxes(title_text=x_label, row=1, col=2)
-    fig.update_layout(height=400, showlegend=False)
-    
-    st.plotly_chart(fig, use_container_width=True)
-    
-    st.markdown("---")
-    st.subheader("Complete Product Rankings")
-    
-    st.dataframe(
-        product_ranking.style.format({
-            'total_quantity': '{:,}',
-            'total_revenue': '${:,.2f}',
-            'transaction_count': '{:,}'
-        }),
-        column_config={
-            'rank': 'Rank',
-            'product_name': 'Product',
-            'total_quantity': 'Units',
-            'total_revenue': 'Revenue',
-            'transaction_count': 'Transactions'
-        },
-        hide_index=True,
-        use_container_width=True
-    )
-
-elif page == "Customer Analytics":
-    st.markdown('<h1 class="main-header">Customer Loyalty Analysis</h1>', unsafe_allow_html=True)
-    
-    if has_loyalty:
-        # -------------------------------------------
-        # Loyalty Program Overview
-        # -------------------------------------------
-        st.subheader("Loyalty Program Overview")
+    elif page == "Overview":
+        section("Overview: KPIs")
+        st.markdown('<h1 class="main-header">Business Overview</h1>', unsafe_allow_html=True)
+        
+        col1, col2, col3, col4 = st.columns(4)
         
-        total_customers = loyalty_analysis['transaction_count'].sum()
-        total_loyalty_revenue = loyalty_analysis['total_cog'].sum()
+        totals = rollup(cube)
+        total_sales = totals["cost_of_goods"]
+        total_qty = totals["quantity_sold"]
+        total_txn = totals["transaction_count"]
+        avg_txn = total_sales / total_txn
         
-        col1, col2, col3 = st.columns(3)
-        col1.metric("Total Loyalty Members", f"{total_customers:,}")
-        col2.metric("Loyalty Revenue", f"${total_loyalty_revenue:,.2f}")
-        col3.metric("Loyalty Levels", f"{len(loyalty_analysis)}")
+        with col1:
+            st.metric("Total Revenue", f"${total_sales:,.0f}")
+        with col2:
+            st.metric("Units Sold", f"{total_qty:,}")
+        with col3:
+            st.metric("Transactions", f"{total_txn:,}")
+        with col4:
+            st.metric("Avg Transaction", f"${avg_txn:.2f}")
         
         st.markdown("---")
         
-        # -------------------------------------------
-        # Revenue by Loyalty Level
-        # -------------------------------------------
-        col1, col2 = st.columns([2, 1])
+        col1, col2 = st.columns(2)
         
         with col1:
-            st.subheader("Revenue by Loyalty Level")
+            section("Overview: category revenue")
+            st.subheader("Revenue by Category")
+            category_sales = rollup(cube, by=["category"])
+            import plotly.express as px
             
-            fig = px.bar(
-                loyalty_analysis.sort_values('total_cog', ascending=False),
-                x='loyalty_level',
-                y='total_cog',
-                color='loyalty_level',
-                text='total_cog',
-                color_discrete_sequence=px.colors.sequential.Blues_r
+            fig = px.pie(
+                category_sales,
+                values="cost_of_goods",
+                names="category",
+                color_discrete_sequence=['#0071ce', '#ffc220'],
+                hole=0.4
             )
-            fig.update_traces(texttemplate='$%{text:,.0f}', textposition='outside')
-            fig.update_layout(
-                showlegend=False,
-                height=400,
-                xaxis_title="Loyalty Level",
-                yaxis_title="Revenue ($)"
+            fig.update_traces(textposition='inside', textinfo='percent+label')
+            fig.update_layout(height=350, showlegend=True)
+            st.plotly_chart(fig, use_container_width=True)
+        
+        with col2:
+            section("Overview: top products")
+            st.subheader("Top Products")
+            top5 = product_ranking.head(5)
+            fig = px.bar(
+                top5,
+                x="total_revenue",
+                y="product_name",
+                orientation="h",
+                color="total_revenue",
+                color_continuous_scale="Blues",
+                text="total_revenue"
             )
+            fig.update_traces(texttemplate="$%{text:,.0f}", textposition="outside")
+            fig.update_yaxes(categoryorder="total ascending")
+            fig.update_layout(height=350, showlegend=False)
             st.plotly_chart(fig, use_container_width=True)
         
         st.markdown("---")
+        
+        section("Overview: sales trend")
+        st.subheader("Sales Trend")
+        
+        trend_view = st.radio("View by:", ["Monthly", "Weekly", "Daily"], horizontal=True)
+        
+        if trend_view == "Monthly":
+            trend_data = rollup(cube, freq="M")
+            x_label = "Month"
+        elif trend_view == "Weekly":
+            trend_data = rollup(cube, freq="W")
+            x_label = "Week"
+        else:
+            trend_data = daily_sales[['transaction_date', 'cost_of_goods', 'quantity_sold']].copy()
+            x_label = "Date"
+        
+        # At most one point per pixel of each chart before the figure is built
+        # (downsample.py); the monthly and weekly views pass through unchanged.
+        from downsample import shared_downsample, target_points
+        
+        source = table_signature("daily_sales" if trend_view == "Daily" else "cleaned_data")
+        revenue_points, unit_points = (
+            shared_downsample(("trend", trend_view), source, trend_data, "transaction_date", col, target_points())
+            for col in ["cost_of_goods", "quantity_sold"]
+        )
+        
+        import plotly.graph_objects as go
+        from plotly.subplots import make_subplots
+        
+        fig = make_subplots(rows=1, cols=2, subplot_titles=("Revenue ($)", "Units Sold"))
+        
+        fig.add_trace(
+            go.Scatter(
+                x=revenue_points["transaction_date"],
+                y=revenue_points["cost_of_goods"],
+                mode="lines+markers",
+                name="Revenue",
+                line=dict(color="#0071ce", width=2),
+                marker=dict(size=6)
+            ),
+            row=1, col=1
+        )
+        
+        fig.add_trace(
+            go.Scatter(
+                x=unit_points["transaction_date"],
+                y=unit_points["quantity_sold"],
+                mode="lines+markers",
+                name="Units",
+                line=dict(color="#ffc220", width=2),
+                marker=dict(size=6)
+            ),
+            row=1, col=2
+        )
+        
+        fig.update_xaxes(title_text=x_label, row=1, col=1)
+        fig.update_xaxes(title_text=x_label, row=1, col=2)
+        fig.update_layout(height=400, showlegend=False)
+        
+        st.plotly_chart(fig, use_container_width=True)
+        
+        st.markdown("---")
+        section("Overview: product rankings")
+        st.subheader("Complete Product Rankings")
+        
+        st.dataframe(
+            product_ranking.style.format({
+                'total_quantity': '{:,}',
+                'total_revenue': '${:,.2f}',
+                'transaction_count': '{:,}'
+            }),
+            column_config={
+                'rank': 'Rank',
+                'product_name': 'Product',
+                'total_quantity': 'Units',
+                'total_revenue': 'Revenue',
+                'transaction_count': 'Transactions'
+            },
+            hide_index=True,
+            use_container_width=True
+        )
 
-        # -------------------------------------------
-        # Horizontal Key Metrics Layout
-        # -------------------------------------------
-        st.subheader("Key Metrics by Loyalty Level")
+    elif page == "Customer Analytics":
+        section("Customer Analytics: header")
+        st.markdown('<h1 class="main-header">Customer Loyalty Analysis</h1>', unsafe_allow_html=True)
+        
+        if loyalty_analysis is not None:
+            # -------------------------------------------
+            # Loyalty Program Overview
+            # -------------------------------------------
+            section("Customer Analytics: loyalty overview")
+            st.subheader("Loyalty Program Overview")
+            
+            total_loyalty_revenue = loyalty_analysis['total_cog'].sum()
+            
+            # Members are distinct customer_ids (HyperLogLog), spend quantiles
+            # per transaction (t-digest); without sketches only transactions.
+            if customer_sketches is not None:
+                loyalty_analysis = loyalty_analysis.merge(
+                    customer_sketches.summary()[['loyalty_level', 'customers', 'p50', 'p90']],
+                    on='loyalty_level', how='left'
+                )
+                members_label = "Total Loyalty Members"
+                total_customers = int(customer_sketches.summary(by=None)['customers'].iloc[0])
+            else:
+                members_label = "Loyalty Transactions"
+                total_customers = loyalty_analysis['transaction_count'].sum()
+            
+            col1, col2, col3 = st.columns(3)
+            col1.metric(members_label, f"{total_customers:,}")
+            col2.metric("Loyalty Revenue", f"${total_loyalty_revenue:,.2f}")
+            col3.metric("Loyalty Levels", f"{len(loyalty_analysis)}")
+            
+            st.markdown("---")
+            
+            # -------------------------------------------
+            # Revenue by Loyalty Level
+            # -------------------------------------------
+            col1, col2 = st.columns([2, 1])
+            
+            with col1:
+                st.subheader("Revenue by Loyalty Level")
+                import plotly.express as px
+                
+                fig = px.bar(
+                    loyalty_analysis.sort_values('total_cog', ascending=False),
+                    x='loyalty_level',
+                    y='total_cog',
+                    color='loyalty_level',
+                    text='total_cog',
+                    color_discrete_sequence=px.colors.sequential.Blues_r
+                )
+                fig.update_traces(texttemplate='$%{text:,.0f}', textposition='outside')
+                fig.update_layout(
+                    showlegend=False,
+                    height=400,
+                    xaxis_title="Loyalty Level",
+                    yaxis_title="Revenue ($)"
+                )
+                st.plotly_chart(fig, use_container_width=True)
+            
+            st.markdown("---")
 
-        # Create horizontal columns dynamically for each loyalty level
-        cols = st.columns(len(loyalty_analysis))
+            # -------------------------------------------
+            # Horizontal Key Metrics Layout
+            # -------------------------------------------
+            section("Customer Analytics: metrics by level")
+            st.subheader("Key Metrics by Loyalty Level")
 
-        for idx, (_, row) in enumerate(loyalty_analysis.sort_values('total_cog', ascending=False).iterrows()):
-            pct = (row['total_cog'] / total_loyalty_revenue) * 100
-            
-            with cols[idx]:
-                st.markdown(f"""
+            # Create horizontal columns dynamically for each loyalty level
+            cols = st.columns(len(loyalty_analysis))
+
+            for idx, (_, row) in enumerate(loyalty_analysis.sort_values('total_cog', ascending=False).iterrows()):
+                pct = (row['total_cog'] / total_loyalty_revenue) * 100
+                if customer_sketches is not None:
+                    members_line = f"<p><strong>Members:</strong> {row['customers']:,}</p>"
+                    spend_line = f"<p><strong>Median / P90:</strong> ${row['p50']:,.0f} / ${row['p90']:,.0f}</p>"
+                else:
+                    members_line = f"<p><strong>Transactions:</strong> {row['transaction_count']:,}</p>"
+                    spend_line = ""
+                
+                with cols[idx]:
+                    st.markdown(f"""
                 <div class="loyalty-card" style="
                     background-color:#f9f9f9;
                     padding:15px;
@@ -529,57 +768,116 @@ elif page == "Customer Analytics":
                     margin-bottom:10px;">
                     <h4 style="color:#004b87;">{row['loyalty_level']}</h4>
                     <p><strong>Revenue:</strong> ${row['total_cog']:,.0f} ({pct:.1f}%)</p>
-                    <p><strong>Members:</strong> {row['transaction_count']:,}</p>
-                    <p><strong>Avg/Member:</strong> ${row['avg_transaction_value']:.2f}</p>
+                    {members_line}
+                    <p><strong>Avg Transaction:</strong> ${row['avg_transaction_value']:.2f}</p>
+                    {spend_line}
                 </div>
                 """, unsafe_allow_html=True)
-        
-        # -------------------------------------------
-        # Distribution Visuals
-        # -------------------------------------------
-        st.markdown("---")
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.subheader("Transaction Distribution")
-            fig = px.pie(
-                loyalty_analysis,
-                values='transaction_count',
-                names='loyalty_level',
-                title='Transactions by Loyalty Level',
-                color_discrete_sequence=px.colors.sequential.Teal
-            )
-            fig.update_traces(textposition='inside', textinfo='percent+label')
-            st.plotly_chart(fig, use_container_width=True)
-        
-        with col2:
-            st.subheader("Average Transaction Value")
-            fig = px.bar(
-                loyalty_analysis.sort_values('avg_transaction_value', ascending=False),
-                x='loyalty_level',
-                y='avg_transaction_value',
-                color='avg_transaction_value',
-                color_continuous_scale='Greens',
-                text='avg_transaction_value'
-            )
-            fig.update_traces(texttemplate='$%{text:.2f}', textposition='outside')
-            fig.update_layout(showlegend=False)
-            st.plotly_chart(fig, use_container_width=True)
-        
-        # -------------------------------------------
-        # Actionable Insights
-        # -------------------------------------------
-        st.markdown("---")
-        st.subheader("Actionable Insights")
-        
-        lowest_loyalty = loyalty_analysis.loc[loyalty_analysis['total_cog'].idxmin()]
-        highest_loyalty = loyalty_analysis.loc[loyalty_analysis['total_cog'].idxmax()]
-        lowest_avg = loyalty_analysis.loc[loyalty_analysis['avg_transaction_value'].idxmin()]
-        
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            st.error(f"""
+            
+            # -------------------------------------------
+            # Spend Distribution (sketches)
+            # -------------------------------------------
+            if customer_sketches is not None:
+                st.markdown("---")
+                section("Customer Analytics: spend distribution")
+                st.subheader("Members and Spend by Store and Month")
+                
+                sketch_cells = customer_sketches.cells
+                months = sorted(sketch_cells['month'].unique())
+                col1, col2 = st.columns(2)
+                with col1:
+                    sketch_store = st.selectbox("Store:", ["All stores"] + sorted(sketch_cells['store_location'].unique()))
+                with col2:
+                    sketch_months = st.select_slider("Months:", options=months, value=(months[0], months[-1]))
+                
+                spend = customer_sketches.summary(
+                    store_location=None if sketch_store == "All stores" else sketch_store,
+                    month=[m for m in months if sketch_months[0] <= m <= sketch_months[1]]
+                )
+                
+                col1, col2 = st.columns([1, 1])
+                with col1:
+                    st.dataframe(
+                        spend[['loyalty_level', 'customers', 'transactions', 'p50', 'p90']].style.format({
+                            'customers': '{:,}',
+                            'transactions': '{:,}',
+                            'p50': '${:,.2f}',
+                            'p90': '${:,.2f}'
+                        }),
+                        column_config={
+                            'loyalty_level': 'Loyalty Level',
+                            'customers': 'Members',
+                            'transactions': 'Transactions',
+                            'p50': 'Median Spend',
+                            'p90': 'P90 Spend'
+                        },
+                        hide_index=True,
+                        use_container_width=True
+                    )
+                    st.caption("Members are distinct customers (HyperLogLog, about 2% error); spend is per "
+                               "transaction (t-digest)")
+                with col2:
+                    fig = px.bar(
+                        spend.melt(id_vars='loyalty_level', value_vars=['p50', 'p90'], var_name='quantile',
+                                   value_name='spend').replace({'quantile': {'p50': 'Median', 'p90': 'P90'}}),
+                        x='loyalty_level',
+                        y='spend',
+                        color='quantile',
+                        barmode='group',
+                        color_discrete_sequence=['#0071ce', '#ffc220']
+                    )
+                    fig.update_layout(height=300, xaxis_title="Loyalty Level", yaxis_title="Spend per Transaction ($)",
+                                      legend_title=None)
+                    st.plotly_chart(fig, use_container_width=True)
+            
+            # -------------------------------------------
+            # Distribution Visuals
+            # -------------------------------------------
+            st.markdown("---")
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                section("Customer Analytics: distributions")
+                st.subheader("Transaction Distribution")
+                fig = px.pie(
+                    loyalty_analysis,
+                    values='transaction_count',
+                    names='loyalty_level',
+                    title='Transactions by Loyalty Level',
+                    color_discrete_sequence=px.colors.sequential.Teal
+                )
+                fig.update_traces(textposition='inside', textinfo='percent+label')
+                st.plotly_chart(fig, use_container_width=True)
+            
+            with col2:
+                st.subheader("Average Transaction Value")
+                fig = px.bar(
+                    loyalty_analysis.sort_values('avg_transaction_value', ascending=False),
+                    x='loyalty_level',
+                    y='avg_transaction_value',
+                    color='avg_transaction_value',
+                    color_continuous_scale='Greens',
+                    text='avg_transaction_value'
+                )
+                fig.update_traces(texttemplate='$%{text:.2f}', textposition='outside')
+                fig.update_layout(showlegend=False)
+                st.plotly_chart(fig, use_container_width=True)
+            
+            # -------------------------------------------
+            # Actionable Insights
+            # -------------------------------------------
+            st.markdown("---")
+            section("Customer Analytics: insights")
+            st.subheader("Actionable Insights")
+            
+            lowest_loyalty = loyalty_analysis.loc[loyalty_analysis['total_cog'].idxmin()]
+            highest_loyalty = loyalty_analysis.loc[loyalty_analysis['total_cog'].idxmax()]
+            lowest_avg = loyalty_analysis.loc[loyalty_analysis['avg_transaction_value'].idxmin()]
+            
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                st.error(f"""
             **Growth Opportunity**
             
             **{lowest_loyalty['loyalty_level']}**
@@ -592,9 +890,9 @@ elif page == "Customer Analytics":
             - Personalized product bundles  
             - Limited-time promotions
             """)
-        
-        with col2:
-            st.success(f"""
+            
+            with col2:
+                st.success(f"""
             **Top Performers**
             
             **{highest_loyalty['loyalty_level']}**
@@ -607,9 +905,9 @@ elif page == "Customer Analytics":
             - Dedicated support line  
             - Special anniversary rewards
             """)
-        
-        with col3:
-            st.warning(f"""
+            
+            with col3:
+                st.warning(f"""
             **Engagement Focus**
             
             **{lowest_avg['loyalty_level']}**
@@ -622,102 +920,145 @@ elif page == "Customer Analytics":
             - Loyalty points multiplier  
             - Free shipping threshold
             """)
-        
-        # -------------------------------------------
-        # Detailed Comparison Table
-        # -------------------------------------------
-        st.subheader("Detailed Comparison")
-        
-        comparison_df = loyalty_analysis.copy().sort_values('total_cog', ascending=False)
-        
-        st.dataframe(
-            comparison_df.style.format({
+            
+            # -------------------------------------------
+            # Detailed Comparison Table
+            # -------------------------------------------
+            section("Customer Analytics: detailed comparison")
+            st.subheader("Detailed Comparison")
+            
+            comparison_df = loyalty_analysis.copy().sort_values('total_cog', ascending=False)
+            formats = {
                 'total_quantity': '{:,}',
                 'total_cog': '${:,.2f}',
                 'transaction_count': '{:,}',
                 'avg_transaction_value': '${:.2f}',
                 'pct_of_total': '{:.1f}%'
-            }).background_gradient(subset=['total_cog'], cmap='RdYlGn'),
-            column_config={
-                'loyalty_level': 'Loyalty Level',
-                'total_quantity': 'Total Units',
-                'total_cog': 'Total Revenue',
-                'transaction_count': 'Transactions',
-                'avg_transaction_value': 'Avg Value',
-                'pct_of_total': '% of Total'
-            },
-            hide_index=True,
-            use_container_width=True
-        )
-    
-    else:
-        st.warning("Customer loyalty data not available in your dataset.")
+            }
+            if customer_sketches is not None:
+                formats.update({'customers': '{:,}', 'p50': '${:,.2f}', 'p90': '${:,.2f}'})
+            
+            st.dataframe(
+                comparison_df.style.format(formats).background_gradient(subset=['total_cog'], cmap='RdYlGn'),
+                column_config={
+                    'loyalty_level': 'Loyalty Level',
+                    'total_quantity': 'Total Units',
+                    'total_cog': 'Total Revenue',
+                    'transaction_count': 'Transactions',
+                    'avg_transaction_value': 'Avg Value',
+                    'pct_of_total': '% of Total',
+                    'customers': 'Members',
+                    'p50': 'Median Spend',
+                    'p90': 'P90 Spend'
+                },
+                hide_index=True,
+                use_container_width=True
+            )
+        
+        else:
+            st.warning("Customer loyalty data not available in your dataset.")
 
 
-elif page == "Model Performance":
-    st.markdown('<h1 class="main-header">Model Performance Analysis</h1>', unsafe_allow_html=True)
+    elif page == "Model Performance":
+        section("Model Performance: header")
+        st.markdown('<h1 class="main-header">Model Performance Analysis</h1>', unsafe_allow_html=True)
+            
+        st.markdown("---")
         
-    st.markdown("---")
-    
-    st.subheader("Model Comparison Results")
-    
-    display_df = model_comparison.copy()
-    
-    st.dataframe(
-        display_df.style.format({
-            'MAE_Quantity': '{:.4f}',
-            'MAPE_Quantity': '{:.2f}%',
-            'R2_Quantity': '{:.4f}',
-            'MAE_COG': '{:.2f}',
-            'MAPE_COG': '{:.2f}%',
-            'R2_COG': '{:.4f}'
-        }).background_gradient(subset=['MAE_COG'], cmap='RdYlGn_r'),
-        use_container_width=True
-    )
-    
-    st.markdown("---")
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.subheader("MAE Comparison")
-        fig = px.bar(
-            model_comparison,
-            x='Model',
-            y='MAE_COG',
-            color='MAE_COG',
-            color_continuous_scale='RdYlGn_r',
-            text='MAE_COG',
-            title='Mean Absolute Error - Cost of Goods'
-        )
-        fig.update_traces(texttemplate='$%{text:.2f}', textposition='outside')
-        fig.update_layout(showlegend=False, height=400)
-        st.plotly_chart(fig, use_container_width=True)
-    
-    with col2:
-        st.subheader("MAPE Comparison")
-        
-        mape_df = model_comparison[model_comparison['MAPE_COG'].notna()].copy()
-        
-        fig = px.bar(
-            mape_df,
-            x='Model',
-            y='MAPE_COG',
-            color='MAPE_COG',
-            color_continuous_scale='Reds_r',
-            text='MAPE_COG',
-            title='Mean Absolute Percentage Error'
+        section("Model Performance: comparison table")
+        st.subheader("Model Comparison Results")
+        
+        metric_cols = ['Model', 'MAE_Quantity', 'MAPE_Quantity', 'R2_Quantity', 'MAE_COG', 'MAPE_COG', 'R2_COG']
+        display_df = model_comparison[metric_cols].copy()
+        if 'Folds' in model_comparison.columns:
+            st.caption(
+                f"Rolling-origin backtest (backtest.py): means over {model_comparison['Folds'].iloc[0]} folds, "
+                f"each forecasting {model_comparison['Horizon_Days'].iloc[0]} days of the daily product x store series"
+            )
+        
+        st.dataframe(
+            display_df.style.format({
+                'MAE_Quantity': '{:.4f}',
+                'MAPE_Quantity': '{:.2f}%',
+                'R2_Quantity': '{:.4f}',
+                'MAE_COG': '{:.2f}',
+                'MAPE_COG': '{:.2f}%',
+                'R2_COG': '{:.4f}'
+            }).background_gradient(subset=['MAE_COG'], cmap='RdYlGn_r'),
+            use_container_width=True
         )
-        fig.update_traces(texttemplate='%{text:.2f}%', textposition='outside')
-        fig.update_layout(showlegend=False, height=400)
-        st.plotly_chart(fig, use_container_width=True)
-    
-    st.markdown("---")
-    
-    best_model_idx = model_comparison['MAE_COG'].idxmin()
-    best_model = model_comparison.loc[best_model_idx]
-    
-    st.success(f"""
+        
+        st.markdown("---")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            section("Model Performance: charts")
+            st.subheader("MAE Comparison")
+            import plotly.express as px
+            
+            fig = px.bar(
+                model_comparison,
+                x='Model',
+                y='MAE_COG',
+                color='MAE_COG',
+                color_continuous_scale='RdYlGn_r',
+                text='MAE_COG',
+                title='Mean Absolute Error - Cost of Goods'
+            )
+            fig.update_traces(texttemplate='$%{text:.2f}', textposition='outside')
+            fig.update_layout(showlegend=False, height=400)
+            st.plotly_chart(fig, use_container_width=True)
+        
+        with col2:
+            st.subheader("MAPE Comparison")
+            
+            mape_df = model_comparison[model_comparison['MAPE_COG'].notna()].copy()
+            
+            fig = px.bar(
+                mape_df,
+                x='Model',
+                y='MAPE_COG',
+                color='MAPE_COG',
+                color_continuous_scale='Reds_r',
+                text='MAPE_COG',
+                title='Mean Absolute Percentage Error'
+            )
+            fig.update_traces(texttemplate='%{text:.2f}%', textposition='outside')
+            fig.update_layout(showlegend=False, height=400)
+            st.plotly_chart(fig, use_container_width=True)
+        
+        try:
+            backtest_folds = shared_csv("model_backtest.csv")
+        except FileNotFoundError:
+            backtest_folds = None
+        
+        if backtest_folds is not None:
+            section("Model Performance: fold distribution")
+            st.subheader("Error Across Backtest Folds")
+            fig = px.box(
+                backtest_folds,
+                x='Model',
+                y='MAE_COG',
+                color='Model',
+                points='all',
+                hover_data=['origin'],
+                title='MAE per Fold - Cost of Goods'
+            )
+            fig.update_layout(showlegend=False, height=400, yaxis_title='MAE ($)')
+            st.plotly_chart(fig, use_container_width=True)
+        
+        st.markdown("---")
+        
+        best_model_idx = model_comparison['MAE_COG'].idxmin()
+        best_model = model_comparison.loc[best_model_idx]
+        if best_model['Model'] == "Served Model":
+            serving_note = "This is the model the prediction tool serves (best_qty_model.pkl)."
+        else:
+            serving_note = ("The prediction tool serves best_qty_model.pkl, backtested above as Served Model; "
+                            "this model is not what it uses.")
+        
+        st.success(f"""
     ### Best Performing Model: {best_model['Model']}
     
     **Performance Metrics:**
@@ -725,124 +1066,385 @@ elif page == "Model Performance":
     - **MAPE:** {best_model['MAPE_COG']:.2f}% (Percentage error)
     - **R-Squared:** {best_model['R2_COG']:.4f} (Variance)
     
-    This model is used for all forecasts in the prediction tool.
+    {serving_note}
     """)
-    
-    st.markdown("---")
-elif page == "Data Explorer":
-    st.markdown('<h1 class="main-header">Data Explorer</h1>', unsafe_allow_html=True)
-    
-    tab1, tab2, tab3 = st.tabs(["Transactions", "Forecast Data", "Product Rankings"])
-    
-    with tab1:
-        st.subheader("Transaction Data")
         
-        col1, col2, col3 = st.columns(3)
+        st.markdown("---")
         
-        with col1:
-            category_filter = st.multiselect(
-                "Category:",
-                df['category'].unique().tolist(),
-                default=df['category'].unique().tolist()
+        if forecast_monitor is not None:
+            import monitor
+            
+            section("Model Performance: accuracy monitor")
+            st.subheader("Demand Forecast Accuracy Monitor")
+            st.caption("forecasted_demand vs actual_demand of every transaction, from running error sums per "
+                       "product x store x week (monitor.py); updated as transactions are ingested")
+            
+            weekly_alarms = monitor.alarms(forecast_monitor)
+            overall = monitor.query(forecast_monitor, by=[]).iloc[0]
+            latest_week = forecast_monitor['week'].max()
+            recent_alarms = weekly_alarms[(weekly_alarms['alarm'] != '')
+                                          & (weekly_alarms['week'] > latest_week - pd.Timedelta(weeks=4))]
+            
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("MAE (units)", f"{overall['mae']:.1f}")
+            col2.metric("MAPE", f"{overall['mape']:.1f}%")
+            col3.metric("Bias (units)", f"{overall['bias']:+.1f}", help="Mean of forecast - actual")
+            col4.metric("Alarms, Last 4 Weeks", f"{len(recent_alarms)}")
+            
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                monitor_product = st.selectbox(
+                    "Product:", ["All products"] + sorted(forecast_monitor['product_name'].unique()),
+                    key='monitor_product'
+                )
+            with col2:
+                monitor_store = st.selectbox(
+                    "Store:", ["All stores"] + sorted(forecast_monitor['store_location'].unique()),
+                    key='monitor_store'
+                )
+            with col3:
+                grains = {
+                    "Week": ['week'],
+                    "Product": ['product_name'],
+                    "Store": ['store_location'],
+                    "Product x Store": ['product_name', 'store_location'],
+                    "Product x Store x Week": ['product_name', 'store_location', 'week']
+                }
+                monitor_grain = st.selectbox("Group by:", list(grains), key='monitor_grain')
+            
+            selection = {
+                'product': None if monitor_product == "All products" else monitor_product,
+                'store': None if monitor_store == "All stores" else monitor_store
+            }
+            accuracy = monitor.query(forecast_monitor, by=grains[monitor_grain], **selection)
+            st.dataframe(
+                accuracy[grains[monitor_grain] + ['rows', 'mae', 'mape', 'wape', 'bias', 'rmse']].style.format({
+                    'week': lambda d: d.strftime('%b %d, %Y'),
+                    'rows': '{:,}',
+                    'mae': '{:.1f}',
+                    'mape': '{:.1f}%',
+                    'wape': '{:.1f}%',
+                    'bias': '{:+.1f}',
+                    'rmse': '{:.1f}'
+                }),
+                column_config={
+                    'week': 'Week of',
+                    'product_name': 'Product',
+                    'store_location': 'Store',
+                    'rows': 'Transactions',
+                    'mae': 'MAE',
+                    'mape': 'MAPE',
+                    'wape': 'WAPE',
+                    'bias': 'Bias',
+                    'rmse': 'RMSE'
+                },
+                hide_index=True,
+                use_container_width=True
             )
+            
+            section("Model Performance: accuracy trend")
+            trend = monitor.query(forecast_monitor, by=['week'], **selection)
+            flagged = weekly_alarms[weekly_alarms['alarm'] != '']
+            if selection['product'] is not None:
+                flagged = flagged[flagged['product_name'] == selection['product']]
+            if selection['store'] is not None:
+                flagged = flagged[flagged['store_location'] == selection['store']]
+            flagged_weeks = trend[trend['week'].isin(flagged['week'])]
+            
+            import plotly.graph_objects as go
+            
+            fig = go.Figure()
+            fig.add_trace(go.Scatter(x=trend['week'], y=trend['mae'], mode='lines+markers', name='MAE',
+                                     line=dict(color='#0071ce', width=2)))
+            fig.add_trace(go.Scatter(x=trend['week'], y=trend['bias'], mode='lines', name='Bias',
+                                     line=dict(color='#ffc220', width=2)))
+            fig.add_trace(go.Scatter(x=flagged_weeks['week'], y=flagged_weeks['mae'], mode='markers', name='Alarm',
+                                     marker=dict(color='#d62728', size=12, symbol='x')))
+            fig.update_layout(height=350, xaxis_title='Week', yaxis_title='Units', hovermode='x unified',
+                              title='Weekly Forecast Error')
+            st.plotly_chart(fig, use_container_width=True)
+            
+            st.write(f"**Drift alarms** (week error more than {monitor.ALARM_SIGMAS:.0f} standard errors from the "
+                     f"series' earlier weeks)")
+            if len(flagged):
+                st.dataframe(
+                    flagged.sort_values('week', ascending=False)[
+                        ['week', 'product_name', 'store_location', 'rows', 'mae', 'baseline_mae', 'bias',
+                         'baseline_bias', 'alarm']
+                    ].style.format({
+                        'week': lambda d: d.strftime('%b %d, %Y'),
+                        'mae': '{:.1f}',
+                        'baseline_mae': '{:.1f}',
+                        'bias': '{:+.1f}',
+                        'baseline_bias': '{:+.1f}'
+                    }),
+                    column_config={
+                        'week': 'Week of',
+                        'product_name': 'Product',
+                        'store_location': 'Store',
+                        'rows': 'Transactions',
+                        'mae': 'MAE',
+                        'baseline_mae': 'Earlier MAE',
+                        'bias': 'Bias',
+                        'baseline_bias': 'Earlier Bias',
+                        'alarm': 'Alarm'
+                    },
+                    hide_index=True,
+                    use_container_width=True
+                )
+            else:
+                st.info("No alarms for this selection.")
+    elif page == "Data Explorer":
+        section("Data Explorer: header")
+        st.markdown('<h1 class="main-header">Data Explorer</h1>', unsafe_allow_html=True)
         
-        with col2:
-            product_filter = st.multiselect(
-                "Product:",
-                df['product_name'].unique().tolist(),
-                default=df['product_name'].unique().tolist()
+        tab1, tab2, tab3 = st.tabs(["Transactions", "Forecast Data", "Product Rankings"])
+        
+        with tab1:
+            section("Data Explorer: transactions")
+            st.subheader("Transaction Data")
+            
+            first_date, last_date = index.date_bounds()
+            
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                category_filter = st.multiselect(
+                    "Category:",
+                    index.values['category'],
+                    default=index.values['category']
+                )
+            
+            with col2:
+                product_filter = st.multiselect(
+                    "Product:",
+                    index.values['product_name'],
+                    default=index.values['product_name']
+                )
+            
+            with col3:
+                date_range = st.date_input(
+                    "Date Range:",
+                    value=(first_date.date(), last_date.date())
+                )
+            
+            result = index.query(
+                start=date_range[0],
+                end=date_range[1],
+                category=category_filter,
+                product_name=product_filter
+            )
+            totals = result.totals()
+            
+            st.write(f"Showing {len(result):,} of {len(index.frame):,} transactions")
+            
+            display_cols = ['transaction_date', 'product_name', 'category', 'quantity_sold', 'cost_of_goods']
+            if store_ratios is not None:
+                display_cols.insert(3, 'store_location')
+            
+            st.dataframe(
+                result.latest(100, display_cols),
+                use_container_width=True
+            )
+            
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Total Revenue", f"${totals['cost_of_goods']:,.2f}")
+            col2.metric("Total Units", f"{totals['quantity_sold']:,}")
+            col3.metric("Transactions", f"{len(result):,}")
+            
+            from export import FORMATS
+            
+            export_format = st.radio("Export format:", list(FORMATS), horizontal=True)
+            extension, mime = FORMATS[export_format]
+            st.download_button(
+                label=f"Download {export_format}",
+                data=load_export_cache().opener(result.signature, index.frame, export_format, result.rows),
+                file_name=f"transactions_{datetime.now().strftime('%Y%m%d')}.{extension}",
+                mime=mime
             )
         
-        with col3:
-            date_range = st.date_input(
-                "Date Range:",
-                value=(df['transaction_date'].min().date(), df['transaction_date'].max().date())
+        with tab2:
+            section("Data Explorer: forecast data")
+            st.subheader("2025 Forecast Data")
+            
+            view_type = st.radio("View:", ["Daily", "Monthly"], horizontal=True)
+            
+            if view_type == "Daily":
+                st.dataframe(
+                    forecast[['transaction_date', 'predicted_quantity', 'predicted_cog']].head(100),
+                    use_container_width=True
+                )
+                st.caption(f"Showing first 100 of {len(forecast)} days")
+            else:
+                monthly_forecast = forecast.groupby(
+                    forecast['transaction_date'].dt.to_period('M')
+                ).agg({
+                    'predicted_quantity': 'sum',
+                    'predicted_cog': 'sum'
+                }).reset_index()
+                monthly_forecast['Month'] = monthly_forecast['transaction_date'].dt.strftime('%B %Y')
+                
+                st.dataframe(
+                    monthly_forecast[['Month', 'predicted_quantity', 'predicted_cog']],
+                    use_container_width=True
+                )
+            
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Total Units", f"{forecast['predicted_quantity'].sum():,.0f}")
+            col2.metric("Total Revenue", f"${forecast['predicted_cog'].sum():,.2f}")
+            col3.metric("Daily Avg", f"${forecast['predicted_cog'].mean():.2f}")
+            
+            st.download_button(
+                label="Download Forecast",
+                data=load_export_cache().opener(("forecast_2025", table_signature("forecast_2025")), forecast),
+                file_name=f"forecast_2025.csv",
+                mime="text/csv"
             )
         
-        filtered_df = df[
-            (df['category'].isin(category_filter)) &
-            (df['product_name'].isin(product_filter)) &
-            (df['transaction_date'] >= pd.Timestamp(date_range[0])) &
-            (df['transaction_date'] <= pd.Timestamp(date_range[1]))
-        ].copy()
+        with tab3:
+            section("Data Explorer: product rankings")
+            st.subheader("Product Rankings")
+            import plotly.express as px
+            
+            st.dataframe(product_ranking, use_container_width=True)
+            
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                fig = px.bar(product_ranking, x='product_name', y='total_revenue',
+                            title='Revenue by Product')
+                fig.update_xaxes(tickangle=45)
+                st.plotly_chart(fig, use_container_width=True)
+            
+            with col2:
+                fig = px.bar(product_ranking, x='product_name', y='total_quantity',
+                            title='Units by Product')
+                fig.update_xaxes(tickangle=45)
+                st.plotly_chart(fig, use_container_width=True)
+
+    elif page == "Inventory Planning":
+        section("Inventory Planning: header")
+        st.markdown('<h1 class="main-header">Inventory Planning</h1>', unsafe_allow_html=True)
+        st.write("Projected stock for every product and store over the 2025 forecast, starting from each one's "
+                 "latest inventory level and reorder policy")
+        
+        from inventory import HORIZON_MONTHS, network
         
-        st.write(f"Showing {len(filtered_df):,} of {len(df):,} transactions")
+        col1, col2, col3, col4, col5 = st.columns(5)
+        with col1:
+            inventory_method = st.selectbox("Demand forecast:", ["Regression model", "Trailing 30-day average"])
+        with col2:
+            inventory_months = st.slider("Months:", min_value=1, max_value=12, value=HORIZON_MONTHS)
+        with col3:
+            demand_scale = st.slider("Demand (%):", min_value=50, max_value=300, value=100, step=10) / 100.0
+        with col4:
+            extra_lead_days = st.slider("Extra lead time (days):", min_value=0, max_value=30, value=0)
+        with col5:
+            reorder_point_scale = st.slider("Reorder point (%):", min_value=50, max_value=200, value=100,
+                                            step=10) / 100.0
         
-        display_cols = ['transaction_date', 'product_name', 'category', 'quantity_sold', 'cost_of_goods']
-        if has_store:
-            display_cols.insert(3, 'store_location')
+        section("Inventory Planning: simulate")
+        sku_summary, network_daily, _ = network(
+            prediction_cube, stock_state,
+            method="model" if inventory_method == "Regression model" else "trailing",
+            months=inventory_months,
+            demand_scale=demand_scale,
+            extra_lead_days=extra_lead_days,
+            reorder_point_scale=reorder_point_scale
+        )
+        
+        section("Inventory Planning: summary")
+        at_risk = sku_summary[sku_summary['stockout_days'] > 0]
+        total_forecast = sku_summary['forecast_units'].sum()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("SKUs at Risk", f"{len(at_risk)} of {len(sku_summary)}")
+        col2.metric("Stockout Days", f"{int(sku_summary['stockout_days'].sum()):,}")
+        col3.metric("Fill Rate", f"{1 - sku_summary['lost_units'].sum() / max(total_forecast, 1e-9):.1%}")
+        col4.metric("Orders Placed", f"{int(sku_summary['orders'].sum()):,}")
         
+        st.markdown("---")
+        st.subheader("Stockout Risk by Product and Store")
+        risk_table = sku_summary.sort_values(['stockout_days', 'lost_units'], ascending=False)
         st.dataframe(
-            filtered_df[display_cols].sort_values('transaction_date', ascending=False).head(100),
+            risk_table.style.format({
+                'forecast_units': '{:,.0f}',
+                'first_stockout': lambda d: '' if pd.isna(d) else d.strftime('%b %d, %Y'),
+                'lost_units': '{:,.0f}',
+                'fill_rate': '{:.1%}',
+                'units_ordered': '{:,.0f}',
+                'ending_stock': '{:,.0f}'
+            }),
+            hide_index=True,
             use_container_width=True
         )
         
-        col1, col2, col3 = st.columns(3)
-        col1.metric("Total Revenue", f"${filtered_df['cost_of_goods'].sum():,.2f}")
-        col2.metric("Total Units", f"{filtered_df['quantity_sold'].sum():,}")
-        col3.metric("Transactions", f"{len(filtered_df):,}")
-        
-        csv = filtered_df.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            label="Download CSV",
-            data=csv,
-            file_name=f"transactions_{datetime.now().strftime('%Y%m%d')}.csv",
-            mime="text/csv"
-        )
-    
-    with tab2:
-        st.subheader("2025 Forecast Data")
-        
-        view_type = st.radio("View:", ["Daily", "Monthly"], horizontal=True)
+        st.markdown("---")
+        section("Inventory Planning: stock chart")
+        st.subheader("Projected Stock")
+        import plotly.graph_objects as go
         
-        if view_type == "Daily":
-            st.dataframe(
-                forecast[['transaction_date', 'predicted_quantity', 'predicted_cog']].head(100),
-                use_container_width=True
-            )
-            st.caption(f"Showing first 100 of {len(forecast)} days")
-        else:
-            monthly_forecast = forecast.groupby(
-                forecast['transaction_date'].dt.to_period('M')
-            ).agg({
-                'predicted_quantity': 'sum',
-                'predicted_cog': 'sum'
-            }).reset_index()
-            monthly_forecast['Month'] = monthly_forecast['transaction_date'].dt.strftime('%B %Y')
-            
-            st.dataframe(
-                monthly_forecast[['Month', 'predicted_quantity', 'predicted_cog']],
-                use_container_width=True
+        col1, col2 = st.columns(2)
+        with col1:
+            inventory_product = st.selectbox("Product:", list(stock_state.index.levels[0]), key='inventory_product')
+        with col2:
+            inventory_store = st.selectbox(
+                "Store:",
+                list(stock_state.loc[inventory_product].index),
+                key='inventory_store'
             )
         
-        col1, col2, col3 = st.columns(3)
-        col1.metric("Total Units", f"{forecast['predicted_quantity'].sum():,.0f}")
-        col2.metric("Total Revenue", f"${forecast['predicted_cog'].sum():,.2f}")
-        col3.metric("Daily Avg", f"${forecast['predicted_cog'].mean():.2f}")
-        
-        csv = forecast.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            label="Download Forecast",
-            data=csv,
-            file_name=f"forecast_2025.csv",
-            mime="text/csv"
+        _, sku_daily, _ = network(
+            prediction_cube, stock_state.loc[[(inventory_product, inventory_store)]],
+            method="model" if inventory_method == "Regression model" else "trailing",
+            months=inventory_months,
+            demand_scale=demand_scale,
+            extra_lead_days=extra_lead_days,
+            reorder_point_scale=reorder_point_scale
         )
-    
-    with tab3:
-        st.subheader("Product Rankings")
-        
-        st.dataframe(product_ranking, use_container_width=True)
+        reorder_level = stock_state.loc[(inventory_product, inventory_store), 'reorder_point'] * reorder_point_scale
         
-        col1, col2 = st.columns(2)
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(x=sku_daily['date'], y=sku_daily['stock'], mode='lines', name='Stock on hand',
+                                 line=dict(color='#0071ce', width=2)))
+        fig.add_trace(go.Bar(x=sku_daily['date'], y=sku_daily['ordered'], name='Ordered',
+                             marker_color='#ffc220', opacity=0.6))
+        fig.add_trace(go.Scatter(x=sku_daily['date'], y=sku_daily['lost'], mode='lines', name='Lost demand',
+                                 line=dict(color='#d62728', width=1)))
+        fig.add_hline(y=reorder_level, line_dash='dash', line_color='gray', annotation_text='Reorder point')
+        fig.update_layout(height=400, xaxis_title='Date', yaxis_title='Units')
+        st.plotly_chart(fig, use_container_width=True)
         
-        with col1:
-            fig = px.bar(product_ranking, x='product_name', y='total_revenue',
-                        title='Revenue by Product')
-            fig.update_xaxes(tickangle=45)
-            st.plotly_chart(fig, use_container_width=True)
+        st.markdown("---")
+        st.subheader("Network Totals")
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(x=network_daily['date'], y=network_daily['skus_out'], mode='lines',
+                                 name='SKUs out of stock', line=dict(color='#d62728', width=2)))
+        fig.update_layout(height=300, xaxis_title='Date', yaxis_title='SKUs out of stock')
+        st.plotly_chart(fig, use_container_width=True)
+finally:
+    record = finish_run()
+
+
+# Diagnostics: spans of this rerun, shown with ?diagnostics=1
+if record is not None and panel_enabled(st.query_params):
+    history = st.session_state.setdefault("diagnostics_history", {}).setdefault(page, [])
+    history.append(record["total_ms"])
+    del history[:-50]
+    
+    with st.sidebar.expander("Diagnostics"):
+        st.caption(
+            f"This rerun: {record['total_ms']:.0f} ms | last {len(history)} on {page}: "
+            f"median {np.median(history):.0f} ms, max {max(history):.0f} ms"
+        )
+        spans = pd.DataFrame({
+            'span': ["  " * s['depth'] + s['name'] for s in record['spans']],
+            'ms': [s['ms'] for s in record['spans']]
+        })
+        st.dataframe(spans.style.format({'ms': '{:.1f}'}), hide_index=True, use_container_width=True)
         
-        with col2:
-            fig = px.bar(product_ranking, x='product_name', y='total_quantity',
-                        title='Units by Product')
-            fig.update_xaxes(tickangle=45)
-            st.plotly_chart(fig, use_container_width=True)
+        if 'profile' in record:
+            st.write("**Top functions (cumulative)**")
+            st.dataframe(pd.DataFrame(record['profile']), hide_index=True, use_container_width=True)
+        if 'memory' in record:
+            st.write(f"**Traced memory:** peak {record['memory']['peak_mb']:.1f} MB")
+            st.dataframe(pd.DataFrame(record['memory']['top']), hide_index=True, use_container_width=True)
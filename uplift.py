@@ -0,0 +1,207 @@
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from data_store import read_table, replace_file
+from forecast import WEEKEND_UPLIFT
+
+# Multiplicative demand uplift per product x store for the conditions
+# recorded on every transaction, estimated offline in one grouped pass:
+#   promotion  promotion_type when promotion_applied is set, else "None"
+#   holiday    holiday_indicator
+#   weather    weather_conditions
+#   weekend    is_weekend
+# A level's factor is its mean quantity per transaction over the mean of all
+# the product x store's transactions, so 1.0 is the mix of conditions the
+# baseline forecast was fit on. The weekend is a property of the day and
+# also changes how many transactions there are, so its factors compare
+# quantity per calendar day instead. Sparse cells are shrunk toward the same
+# level's factor over all products and stores, with the weight of
+# PRIOR_TRANSACTIONS transactions. Rows with an empty store are the product
+# over all stores (the page's "no store").
+# uplift_factors.csv keeps the quantity and count sums behind each factor,
+# so ingest.py adds a batch to them like the ratio files. UpliftTable holds
+# the factors as one (effect level x product x store) array; a scenario is
+# read by indexing and costs the same as the constant multiplier.
+UPLIFT_PATH = "uplift_factors.csv"
+EFFECTS = ["promotion", "holiday", "weather", "weekend"]
+CONDITION_COLUMNS = ["transaction_date", "product_name", "store_location", "quantity_sold", "promotion_applied", "promotion_type",
+                     "holiday_indicator", "weather_conditions", "is_weekend"]
+PRIOR_TRANSACTIONS = 50
+KEY = ["product_name", "store_location", "effect", "level"]
+
+
+def conditions(transactions):
+    # One label per effect and transaction.
+    t = transactions
+    applied = t["promotion_applied"].astype(bool).to_numpy()
+    promo_type = t["promotion_type"].astype(object).where(t["promotion_type"].notna(), "Unspecified")
+    return pd.DataFrame({
+        "promotion": np.where(applied, promo_type.to_numpy(), "None"),
+        "holiday": np.where(t["holiday_indicator"].astype(bool), "Holiday", "Regular day"),
+        "weather": t["weather_conditions"].astype(object).fillna("Unknown").to_numpy(),
+        "weekend": np.where(t["is_weekend"].astype(bool), "Weekend", "Weekday")
+    }, index=t.index)
+
+
+def level_sums(transactions):
+    # Quantity and transaction count per product x store x effect level.
+    # The transactions are grouped once by every condition together; each
+    # effect's sums are then marginals of that small table.
+    frame = conditions(transactions)
+    frame["product_name"] = transactions["product_name"].astype(object)
+    frame["store_location"] = transactions["store_location"].astype(object).fillna("")
+    frame["quantity_sold"] = transactions["quantity_sold"].astype("int64")
+    cells = frame.groupby(["product_name", "store_location"] + EFFECTS).agg(
+        quantity_sold=("quantity_sold", "sum"), transaction_count=("quantity_sold", "size")).reset_index()
+
+    parts = []
+    for effect in EFFECTS:
+        for keys in (["product_name", "store_location"], ["product_name"]):
+            part = cells.groupby(keys + [effect])[["quantity_sold", "transaction_count"]].sum().reset_index()
+            if "store_location" not in keys:
+                part["store_location"] = ""
+            parts.append(part.rename(columns={effect: "level"}).assign(effect=effect))
+    return pd.concat(parts, ignore_index=True)[KEY + ["quantity_sold", "transaction_count"]]
+
+
+def add_level_sums(existing, sums):
+    # Running sums of ingest.py: a batch's sums added to the stored ones.
+    columns = ["quantity_sold", "transaction_count"]
+    totals = existing.set_index(KEY)[columns].add(sums.set_index(KEY)[columns], fill_value=0)
+    return totals.astype("int64").reset_index()
+
+
+def weekend_days(dates):
+    # Calendar days of each weekend level between the first and last date.
+    days = pd.date_range(dates.min().normalize(), dates.max().normalize(), freq="D")
+    return pd.Series(np.where(days.dayofweek >= 5, "Weekend", "Weekday")).value_counts()
+
+
+def _raw_factors(frame, keys):
+    # Quantity per unit of exposure of each level over that of all levels.
+    totals = frame.groupby(keys + ["effect"])[["quantity_sold", "exposure"]].transform("sum")
+    rate = frame["quantity_sold"] / frame["exposure"]
+    overall = totals["quantity_sold"] / totals["exposure"]
+    return (rate / overall.where(overall > 0)).fillna(1.0).to_numpy()
+
+
+def estimate(sums, days, prior=PRIOR_TRANSACTIONS):
+    # Factors from level sums, shrunk toward each level's overall factor.
+    # days: weekend_days() of the data's date range.
+    sums = sums.sort_values(KEY, kind="stable").reset_index(drop=True)
+    weekend = sums["effect"] == "weekend"
+    exposure = sums["transaction_count"].astype(float)
+    exposure[weekend] = sums.loc[weekend, "level"].map(days).astype(float)
+    frame = sums.assign(exposure=exposure)
+    raw = _raw_factors(frame, ["product_name", "store_location"])
+
+    stores = frame[frame["store_location"] != ""]
+    overall = stores.groupby(["effect", "level"], as_index=False).agg(
+        quantity_sold=("quantity_sold", "sum"), exposure=("exposure", "sum"))
+    overall["exposure"] = np.where(overall["effect"] == "weekend", overall["level"].map(days), overall["exposure"])
+    overall["factor"] = _raw_factors(overall, [])
+    prior_raw = sums.merge(overall, on=["effect", "level"], how="left")["factor"].fillna(1.0).to_numpy()
+
+    count = sums["transaction_count"].to_numpy(dtype=float)
+    sums["factor"] = (count * raw + prior * prior_raw) / (count + prior)
+    return sums
+
+
+def build(transactions=None, path=UPLIFT_PATH, prior=PRIOR_TRANSACTIONS):
+    if transactions is None:
+        transactions = read_table("cleaned_data", CONDITION_COLUMNS)
+    table = estimate(level_sums(transactions), weekend_days(transactions["transaction_date"]), prior)
+    write(table, path)
+    return table
+
+
+def write(table, path=UPLIFT_PATH):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    os.close(fd)
+    try:
+        table.to_csv(tmp, index=False, lineterminator="\n")
+        replace_file(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+class UpliftTable:
+    def __init__(self, table):
+        products = sorted(table["product_name"].unique())
+        stores = sorted(table["store_location"].unique())
+        pairs = table[["effect", "level"]].drop_duplicates()
+        self.levels = {effect: group["level"].tolist() for effect, group in pairs.groupby("effect", sort=False)}
+        self.index = {(e, l): i for i, (e, l) in enumerate(pairs.itertuples(index=False))}
+        self.products = {p: i for i, p in enumerate(products)}
+        self.stores = {(s or None): i for i, s in enumerate(stores)}
+
+        # Cells without data (a store that never sold a product) stay 1.0.
+        self.factor = np.ones((len(self.index), len(products), len(stores)))
+        self.factor[
+            [self.index[k] for k in zip(table["effect"], table["level"])],
+            table["product_name"].map(self.products).to_numpy(),
+            table["store_location"].map(lambda s: self.stores[s or None]).to_numpy()
+        ] = table["factor"].to_numpy()
+
+    def _cells(self, keys):
+        products = np.array([self.products.get(p, -1) for p, _ in keys])
+        stores = np.array([self.stores.get(s, self.stores.get(None, 0)) for _, s in keys])
+        return products, stores, products >= 0
+
+    def factors(self, keys, scenario):
+        # Combined factor for many (product, store) pairs: scenario maps
+        # effect -> level, None for the usual mix. Unknown products get 1.0.
+        products, stores, known = self._cells(keys)
+        levels = np.array([self.index[(effect, level)] for effect, level in scenario.items()
+                           if level is not None and effect != "weekend"], dtype=np.int64)
+        out = self.factor[levels[:, None], np.where(known, products, 0)[None, :], stores[None, :]].prod(axis=0)
+        return np.where(known, out, 1.0)
+
+    def day_profile(self, keys, is_weekend):
+        # Per-day factors replacing the forecast's fixed WEEKEND_UPLIFT with
+        # each pair's own weekday and weekend factors: (pairs, days).
+        products, stores, known = self._cells(keys)
+        products = np.where(known, products, 0)
+        weekday = self.factor[self.index[("weekend", "Weekday")], products, stores]
+        weekend = self.factor[self.index[("weekend", "Weekend")], products, stores] / WEEKEND_UPLIFT
+        profile = np.where(np.asarray(is_weekend)[None, :], weekend[:, None], weekday[:, None])
+        return np.where(known[:, None], profile, 1.0)
+
+    def scale(self, product, store, scenario, is_weekend, calibrated_weekend=False):
+        # Multiplier for one forecast row: a number, or per day when the
+        # weekend effect comes from the data.
+        keys = [(product, store)]
+        factor = self.factors(keys, scenario)[0]
+        if calibrated_weekend:
+            return factor * self.day_profile(keys, is_weekend)[0]
+        return factor
+
+
+def load(path=UPLIFT_PATH):
+    # Levels such as "None" and the empty store are labels, not missing.
+    return UpliftTable(pd.read_csv(path, keep_default_na=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estimate promotion, holiday, weather and weekend uplift factors")
+    parser.add_argument("-o", "--output", default=UPLIFT_PATH)
+    parser.add_argument("--prior", type=int, default=PRIOR_TRANSACTIONS,
+                        help="transactions of weight given to the overall factor")
+    args = parser.parse_args()
+
+    try:
+        table = build(path=args.output, prior=args.prior)
+    except FileNotFoundError as e:
+        sys.exit(f"Missing file: {e.filename}")
+    stores = table[table["store_location"] != ""]
+    print(f"{args.output}: {len(table)} factors, {stores['product_name'].nunique()} products x "
+          f"{stores['store_location'].nunique()} stores")
+    spread = stores.groupby(["effect", "level"])["factor"].describe()[["min", "50%", "max"]]
+    with pd.option_context("display.width", 200):
+        print(spread.round(3).to_string())